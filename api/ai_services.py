@@ -1,11 +1,11 @@
-import openai
 import os
 import time
-from typing import Dict, List, Optional, Tuple
+from typing import Callable, Dict, List, Optional, Tuple
 from datetime import datetime
 import json
-import requests
 from dataclasses import dataclass
+from metrics import llm_seconds
+from profiling import record
 
 @dataclass
 class AIProvider:
@@ -19,6 +19,7 @@ class AIProvider:
 class AIServiceManager:
     def __init__(self):
         self.providers = {}
+        self._clients = {}
         self.setup_providers()
     
     def setup_providers(self):
@@ -28,6 +29,7 @@ class AIServiceManager:
             self.providers["openai"] = AIProvider(
                 name="OpenAI",
                 api_key=os.getenv("OPENAI_API_KEY"),
+                base_url=os.getenv("OPENAI_BASE_URL"),
                 model=os.getenv("OPENAI_MODEL", "gpt-4"),
                 max_tokens=int(os.getenv("OPENAI_MAX_TOKENS", "100")),
                 temperature=float(os.getenv("OPENAI_TEMPERATURE", "0.7"))
@@ -38,6 +40,7 @@ class AIServiceManager:
             self.providers["anthropic"] = AIProvider(
                 name="Anthropic",
                 api_key=os.getenv("ANTHROPIC_API_KEY"),
+                base_url=os.getenv("ANTHROPIC_BASE_URL"),
                 model=os.getenv("ANTHROPIC_MODEL", "claude-3-sonnet-20240229"),
                 max_tokens=int(os.getenv("ANTHROPIC_MAX_TOKENS", "100"))
             )
@@ -52,21 +55,22 @@ class AIServiceManager:
                 max_tokens=int(os.getenv("OLLAMA_MAX_TOKENS", "100"))
             )
     
-    def generate_wisdom(self, text: str, style: str = "classic", provider: str = "openai") -> Tuple[str, float, str]:
+    def generate_wisdom(self, text: str, style: str = "classic", provider: str = "openai",
+                        context: Optional[Dict] = None) -> Tuple[str, float, str]:
         """Generate wisdom response using specified provider"""
         start_time = time.time()
         
         try:
             if provider == "openai" and "openai" in self.providers:
-                return self._generate_with_openai(text, style)
+                return self._timed("openai", self._generate_with_openai, text, style)
             elif provider == "anthropic" and "anthropic" in self.providers:
-                return self._generate_with_anthropic(text, style)
+                return self._timed("anthropic", self._generate_with_anthropic, text, style)
             elif provider == "ollama" and "ollama" in self.providers:
-                return self._generate_with_ollama(text, style)
+                return self._timed("ollama", self._generate_with_ollama, text, style)
             else:
                 # Fallback to OpenAI or first available provider
                 if "openai" in self.providers:
-                    return self._generate_with_openai(text, style)
+                    return self._timed("openai", self._generate_with_openai, text, style)
                 else:
                     return self._get_fallback_wisdom(text, style)
         except Exception as e:
@@ -75,20 +79,38 @@ class AIServiceManager:
         finally:
             processing_time = time.time() - start_time
     
+    def _timed(self, provider: str, generate: Callable[[str, str], Tuple[str, float, str]],
+               text: str, style: str) -> Tuple[str, float, str]:
+        """Call a model provider, recording its latency by provider, model and outcome"""
+        start = time.perf_counter()
+        outcome = "error"
+        try:
+            result = generate(text, style)
+            outcome = "ok"
+            return result
+        finally:
+            seconds = time.perf_counter() - start
+            model = self.providers[provider].model
+            llm_seconds.observe(seconds, provider, model, outcome)
+            record(f"llm.{provider}", seconds, model if outcome == "ok" else f"{model} {outcome}")
+    
     def _generate_with_openai(self, text: str, style: str) -> Tuple[str, float, str]:
         """Generate wisdom using OpenAI"""
-        openai.api_key = self.providers["openai"].api_key
+        provider = self.providers["openai"]
+        if "openai" not in self._clients:
+            import openai
+            self._clients["openai"] = openai.OpenAI(api_key=provider.api_key, base_url=provider.base_url)
         
         prompt = self._build_prompt(text, style)
         
-        response = openai.ChatCompletion.create(
-            model=self.providers["openai"].model,
+        response = self._clients["openai"].chat.completions.create(
+            model=provider.model,
             messages=[
                 {"role": "system", "content": "You are WitMirror, a wise AI that turns negativity into enlightenment through elegant proverbs."},
                 {"role": "user", "content": prompt}
             ],
-            max_tokens=self.providers["openai"].max_tokens,
-            temperature=self.providers["openai"].temperature
+            max_tokens=provider.max_tokens,
+            temperature=provider.temperature
         )
         
         wisdom = response.choices[0].message.content.strip()
@@ -96,14 +118,16 @@ class AIServiceManager:
     
     def _generate_with_anthropic(self, text: str, style: str) -> Tuple[str, float, str]:
         """Generate wisdom using Anthropic Claude"""
-        import anthropic
+        provider = self.providers["anthropic"]
+        if "anthropic" not in self._clients:
+            import anthropic
+            self._clients["anthropic"] = anthropic.Anthropic(api_key=provider.api_key, base_url=provider.base_url)
         
-        client = anthropic.Anthropic(api_key=self.providers["anthropic"].api_key)
         prompt = self._build_prompt(text, style)
         
-        response = client.messages.create(
-            model=self.providers["anthropic"].model,
-            max_tokens=self.providers["anthropic"].max_tokens,
+        response = self._clients["anthropic"].messages.create(
+            model=provider.model,
+            max_tokens=provider.max_tokens,
             messages=[{"role": "user", "content": prompt}]
         )
         
@@ -112,6 +136,8 @@ class AIServiceManager:
     
     def _generate_with_ollama(self, text: str, style: str) -> Tuple[str, float, str]:
         """Generate wisdom using local Ollama"""
+        import requests
+        
         url = f"{self.providers['ollama'].base_url}/api/generate"
         prompt = self._build_prompt(text, style)
         
@@ -210,6 +236,15 @@ class AIServiceManager:
         wisdom = random.choice(wisdom_list)
         return wisdom, 0.5, "fallback"
     
+    def warm_up(self):
+        """Import the client libraries of configured providers ahead of the first request"""
+        modules = {"openai": "openai", "anthropic": "anthropic", "ollama": "requests"}
+        for provider in self.providers:
+            try:
+                __import__(modules[provider])
+            except ImportError as e:
+                print(f"Could not preload {provider} client: {e}")
+    
     def get_available_providers(self) -> List[str]:
         """Get list of available AI providers"""
         return list(self.providers.keys())
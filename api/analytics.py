@@ -1,9 +1,16 @@
 from sqlalchemy.orm import Session
 from sqlalchemy import func, desc
 from models import Analysis, Analytics, User
+from hyperloglog import HyperLogLog
+from response_cache import analytics_cache
+from metrics import stage_seconds
+from timeseries import TimeSeriesStore
+from emotion_window import emotion_window, MAX_WINDOW_DAYS
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional
+import base64
 import json
+import time
 
 class AnalyticsService:
     def __init__(self, db: Session):
@@ -11,6 +18,8 @@ class AnalyticsService:
     
     def track_request(self, analysis_data: Dict, processing_time: float, success: bool = True):
         """Track API request for analytics"""
+        started = time.perf_counter()
+        
         # Update daily analytics
         today = datetime.utcnow().date()
         analytics = self.db.query(Analytics).filter(
@@ -30,6 +39,11 @@ class AnalyticsService:
             )
             self.db.add(analytics)
         
+        # Update distinct visitor sketches (user id or IP)
+        visitor = analysis_data.get('visitor')
+        if visitor:
+            self._record_visitor(analytics, visitor, analysis_data.get('platform', 'general'))
+        
         analytics.total_requests += 1
         if success:
             analytics.successful_requests += 1
@@ -57,12 +71,58 @@ class AnalyticsService:
         else:
             analytics.platform_usage[platform] = 1
         
+        # Update minute/hour/day buckets for downsampled charts
+        TimeSeriesStore(self.db).record(analysis_data, processing_time, success)
+        
         self.db.commit()
+        analytics_cache.mark_dirty()
+        emotion_window.add(emotions)
+        
+        # Runs as a background task after the response is sent, so only /metrics sees it
+        stage_seconds.observe(time.perf_counter() - started, "analytics")
+    
+    def _record_visitor(self, analytics: Analytics, visitor: str, platform: str):
+        sketch = HyperLogLog.from_bytes(analytics.unique_users_sketch)
+        sketch.add(visitor)
+        analytics.unique_users_sketch = sketch.to_bytes()
+        analytics.unique_users = sketch.count()
+        
+        platform_sketches = dict(analytics.platform_user_sketches or {})
+        platform_sketch = HyperLogLog.from_bytes(base64.b64decode(platform_sketches.get(platform, "")))
+        platform_sketch.add(visitor)
+        platform_sketches[platform] = base64.b64encode(platform_sketch.to_bytes()).decode()
+        analytics.platform_user_sketches = platform_sketches
+    
+    def get_unique_users(self, days: int = 30, platform: Optional[str] = None) -> Dict:
+        """Estimate distinct users over the last N days by merging daily sketches"""
+        start_date = datetime.utcnow() - timedelta(days=days)
+        
+        rows = self.db.query(Analytics.unique_users_sketch, Analytics.platform_user_sketches).filter(
+            Analytics.date >= start_date
+        ).all()
+        
+        merged = HyperLogLog()
+        for row in rows:
+            if platform:
+                encoded = (row.platform_user_sketches or {}).get(platform)
+                if encoded:
+                    merged.merge(HyperLogLog.from_bytes(base64.b64decode(encoded)))
+            elif row.unique_users_sketch:
+                merged.merge(HyperLogLog.from_bytes(row.unique_users_sketch))
+        
+        return {
+            "days": days,
+            "platform": platform,
+            "unique_users": merged.count()
+        }
     
-    def get_daily_stats(self, days: int = 30) -> List[Dict]:
-        """Get daily statistics for the last N days"""
+    def get_daily_stats(self, days: int = 30, bucket: Optional[str] = None, hours: Optional[int] = None) -> List[Dict]:
+        """Get daily statistics for the last N days, or a series at another bucket size"""
         end_date = datetime.utcnow()
-        start_date = end_date - timedelta(days=days)
+        start_date = end_date - (timedelta(hours=hours) if hours else timedelta(days=days))
+        
+        if bucket:
+            return TimeSeriesStore(self.db).series(bucket, start_date, end_date)
         
         analytics = self.db.query(Analytics).filter(
             Analytics.date >= start_date,
@@ -159,6 +219,9 @@ class AnalyticsService:
     
     def get_trending_emotions(self, days: int = 7) -> List[Dict]:
         """Get trending emotions over the last N days"""
+        if 0 < days <= MAX_WINDOW_DAYS and emotion_window.warm:
+            return emotion_window.trending(days)
+        
         end_date = datetime.utcnow()
         start_date = end_date - timedelta(days=days)
         
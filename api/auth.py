@@ -5,8 +5,10 @@ from passlib.context import CryptContext
 from datetime import datetime, timedelta
 from typing import Optional
 import os
-from models import User, ApiKey
+from models import User, ApiKey, RateLimit
+from database import get_db
 from sqlalchemy.orm import Session
+from profiling import span
 
 # Security configuration
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
@@ -17,10 +19,12 @@ pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 security = HTTPBearer()
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    with span("password_verify"):
+        return pwd_context.verify(plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    with span("password_hash"):
+        return pwd_context.hash(password)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -46,18 +50,19 @@ def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(securit
         headers={"WWW-Authenticate": "Bearer"},
     )
     
-    token = credentials.credentials
-    payload = verify_token(token)
-    if payload is None:
-        raise credentials_exception
-    
-    username: str = payload.get("sub")
-    if username is None:
-        raise credentials_exception
-    
-    user = db.query(User).filter(User.username == username).first()
-    if user is None:
-        raise credentials_exception
+    with span("auth"):
+        token = credentials.credentials
+        payload = verify_token(token)
+        if payload is None:
+            raise credentials_exception
+        
+        username: str = payload.get("sub")
+        if username is None:
+            raise credentials_exception
+        
+        user = db.query(User).filter(User.username == username).first()
+        if user is None:
+            raise credentials_exception
     
     return user
 
@@ -71,10 +76,11 @@ def get_current_user_optional(credentials: Optional[HTTPAuthorizationCredentials
         return None
 
 def verify_api_key(api_key: str, db: Session) -> Optional[ApiKey]:
-    key_obj = db.query(ApiKey).filter(ApiKey.key == api_key, ApiKey.is_active == True).first()
-    if key_obj:
-        key_obj.last_used = datetime.utcnow()
-        db.commit()
+    with span("api_key"):
+        key_obj = db.query(ApiKey).filter(ApiKey.key == api_key, ApiKey.is_active == True).first()
+        if key_obj:
+            key_obj.last_used = datetime.utcnow()
+            db.commit()
     return key_obj
 
 def check_rate_limit(identifier: str, limit: int, db: Session) -> bool:
@@ -0,0 +1,222 @@
+"""Local stand-in for the OpenAI, Anthropic and Ollama APIs, for load tests without real model spend
+
+Usage (from api/):
+    python benchmarks/fake_provider.py --port 9100 --latency-ms 400 --latency-dist lognormal --error-rate 0.02
+
+Then point the API at it:
+    OPENAI_API_KEY=fake OPENAI_BASE_URL=http://127.0.0.1:9100/v1
+    ANTHROPIC_API_KEY=fake ANTHROPIC_BASE_URL=http://127.0.0.1:9100
+    OLLAMA_BASE_URL=http://127.0.0.1:9100
+"""
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from typing import AsyncIterator, Dict
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+import uuid
+
+# Behaviour, overridable per process with the command-line flags below
+CONFIG = {
+    "latency_ms": float(os.getenv("FAKE_LLM_LATENCY_MS", "300")),
+    "jitter_ms": float(os.getenv("FAKE_LLM_JITTER_MS", "100")),
+    "latency_dist": os.getenv("FAKE_LLM_LATENCY_DIST", "normal"),  # fixed, uniform, normal, lognormal
+    "error_rate": float(os.getenv("FAKE_LLM_ERROR_RATE", "0")),
+    "rate_limit_rate": float(os.getenv("FAKE_LLM_RATE_LIMIT_RATE", "0")),
+    "stream_chunk_ms": float(os.getenv("FAKE_LLM_STREAM_CHUNK_MS", "20"))
+}
+
+REPLIES = [
+    "The loudest river carries the least water.",
+    "A calm mind hears what an angry one only shouts.",
+    "Still water reflects the sky; troubled water reflects only itself.",
+    "The arrow aimed at another first leaves your own bow.",
+    "He who throws mud loses ground."
+]
+
+app = FastAPI(title="Fake LLM provider")
+stats = {"requests": 0, "errors": 0, "rate_limited": 0, "streams": 0}
+
+def sample_latency() -> float:
+    base, jitter, dist = CONFIG["latency_ms"], CONFIG["jitter_ms"], CONFIG["latency_dist"]
+    if dist == "fixed":
+        value = base
+    elif dist == "uniform":
+        value = random.uniform(base - jitter, base + jitter)
+    elif dist == "lognormal":
+        # Median at base with a long right tail, like real model latency
+        value = base * random.lognormvariate(0, max(jitter, 1) / max(base, 1))
+    else:
+        value = random.gauss(base, jitter)
+    return max(0.0, value) / 1000
+
+async def injected_failure(provider: str):
+    """Latency, then maybe a synthetic 429 or 500 in the provider's error shape"""
+    stats["requests"] += 1
+    await asyncio.sleep(sample_latency())
+    roll = random.random()
+    if roll < CONFIG["rate_limit_rate"]:
+        stats["rate_limited"] += 1
+        return _error(provider, 429, "rate_limit_exceeded", "Rate limit reached")
+    if roll < CONFIG["rate_limit_rate"] + CONFIG["error_rate"]:
+        stats["errors"] += 1
+        return _error(provider, 500, "server_error", "Injected failure")
+    return None
+
+def _error(provider: str, status: int, code: str, message: str) -> JSONResponse:
+    if provider == "anthropic":
+        body = {"type": "error", "error": {"type": code, "message": message}}
+    elif provider == "ollama":
+        body = {"error": message}
+    else:
+        body = {"error": {"message": message, "type": code, "code": code}}
+    headers = {"retry-after": "1"} if status == 429 else {}
+    return JSONResponse(body, status_code=status, headers=headers)
+
+def reply_text() -> str:
+    return random.choice(REPLIES)
+
+async def _chunks(text: str) -> AsyncIterator[str]:
+    words = text.split(" ")
+    for i, word in enumerate(words):
+        await asyncio.sleep(CONFIG["stream_chunk_ms"] / 1000)
+        yield word if i == 0 else " " + word
+
+def _sse(event: Dict, name: str = None) -> str:
+    prefix = f"event: {name}\n" if name else ""
+    return f"{prefix}data: {json.dumps(event)}\n\n"
+
+@app.post("/v1/chat/completions")
+async def openai_chat(request: Request):
+    body = await request.json()
+    failure = await injected_failure("openai")
+    if failure:
+        return failure
+    text, model, created = reply_text(), body.get("model", "gpt-4"), int(time.time())
+    completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+
+    if body.get("stream"):
+        stats["streams"] += 1
+
+        async def events():
+            async for piece in _chunks(text):
+                yield _sse({"id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                            "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}]})
+            yield _sse({"id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                        "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+            yield "data: [DONE]\n\n"
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return {
+        "id": completion_id,
+        "object": "chat.completion",
+        "created": created,
+        "model": model,
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": 120, "completion_tokens": len(text.split()), "total_tokens": 120 + len(text.split())}
+    }
+
+@app.post("/v1/messages")
+async def anthropic_messages(request: Request):
+    body = await request.json()
+    failure = await injected_failure("anthropic")
+    if failure:
+        return failure
+    text, model = reply_text(), body.get("model", "claude-3-sonnet-20240229")
+    message_id = f"msg_{uuid.uuid4().hex[:24]}"
+    usage = {"input_tokens": 120, "output_tokens": len(text.split())}
+
+    if body.get("stream"):
+        stats["streams"] += 1
+
+        async def events():
+            yield _sse({"type": "message_start", "message": {"id": message_id, "type": "message", "role": "assistant",
+                        "model": model, "content": [], "stop_reason": None, "usage": {**usage, "output_tokens": 0}}},
+                       "message_start")
+            yield _sse({"type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""}},
+                       "content_block_start")
+            async for piece in _chunks(text):
+                yield _sse({"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": piece}},
+                           "content_block_delta")
+            yield _sse({"type": "content_block_stop", "index": 0}, "content_block_stop")
+            yield _sse({"type": "message_delta", "delta": {"stop_reason": "end_turn"}, "usage": {"output_tokens": usage["output_tokens"]}},
+                       "message_delta")
+            yield _sse({"type": "message_stop"}, "message_stop")
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return {
+        "id": message_id,
+        "type": "message",
+        "role": "assistant",
+        "model": model,
+        "content": [{"type": "text", "text": text}],
+        "stop_reason": "end_turn",
+        "stop_sequence": None,
+        "usage": usage
+    }
+
+@app.post("/api/generate")
+async def ollama_generate(request: Request):
+    body = await request.json()
+    failure = await injected_failure("ollama")
+    if failure:
+        return failure
+    text, model = reply_text(), body.get("model", "llama2")
+
+    if body.get("stream", True):
+        stats["streams"] += 1
+
+        async def lines():
+            async for piece in _chunks(text):
+                yield json.dumps({"model": model, "created_at": _now(), "response": piece, "done": False}) + "\n"
+            yield json.dumps({"model": model, "created_at": _now(), "response": "", "done": True,
+                              "eval_count": len(text.split())}) + "\n"
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    return {"model": model, "created_at": _now(), "response": text, "done": True, "eval_count": len(text.split())}
+
+@app.get("/v1/models")
+async def list_models():
+    # Reachability probe used by the API's readiness checks, for both OpenAI and Anthropic
+    return {"object": "list", "data": [{"id": "gpt-4", "object": "model"}, {"id": "claude-3-sonnet-20240229", "type": "model"}]}
+
+@app.get("/api/tags")
+async def ollama_tags():
+    return {"models": [{"name": "llama2:latest"}]}
+
+@app.get("/stats")
+async def get_stats():
+    return {**stats, "config": CONFIG}
+
+def _now() -> str:
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake OpenAI/Anthropic/Ollama server for load tests")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency-ms", type=float, default=CONFIG["latency_ms"])
+    parser.add_argument("--jitter-ms", type=float, default=CONFIG["jitter_ms"])
+    parser.add_argument("--latency-dist", choices=["fixed", "uniform", "normal", "lognormal"], default=CONFIG["latency_dist"])
+    parser.add_argument("--error-rate", type=float, default=CONFIG["error_rate"])
+    parser.add_argument("--rate-limit-rate", type=float, default=CONFIG["rate_limit_rate"])
+    parser.add_argument("--stream-chunk-ms", type=float, default=CONFIG["stream_chunk_ms"])
+    args = parser.parse_args()
+
+    CONFIG.update({
+        "latency_ms": args.latency_ms,
+        "jitter_ms": args.jitter_ms,
+        "latency_dist": args.latency_dist,
+        "error_rate": args.error_rate,
+        "rate_limit_rate": args.rate_limit_rate,
+        "stream_chunk_ms": args.stream_chunk_ms
+    })
+
+    import uvicorn
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""Open-loop load generator for /analyze, /bulk/analyze and the history endpoints
+
+Usage (from api/, with the API and benchmarks/fake_provider.py running):
+    python benchmarks/loadgen.py --base-url http://127.0.0.1:8000 --rps 50 --duration 60 \
+        --mix analyze=8,bulk=1,history=1 --output loadtest.json
+
+Requests are sent on a fixed schedule regardless of how fast earlier ones finish.
+Latency is measured from each request's scheduled start, so a backed-up server
+shows up in the percentiles instead of silently lowering the offered load.
+"""
+from typing import Dict, List, Optional
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+import uuid
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic_data import STYLES, PLATFORMS, sample_texts
+
+SCENARIOS = ("analyze", "bulk", "history")
+
+def parse_mix(value: str) -> Dict[str, int]:
+    mix = {}
+    for item in value.split(","):
+        name, _, weight = item.partition("=")
+        if name.strip() not in SCENARIOS:
+            raise ValueError(f"Unknown scenario: {name}")
+        mix[name.strip()] = int(weight or 1)
+    return mix
+
+def percentile(sorted_values: List[float], q: float) -> Optional[float]:
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(q * (len(sorted_values) - 1)))))
+    return sorted_values[index]
+
+class LoadGenerator:
+    def __init__(self, base_url: str, rps: float, duration: float, mix: Dict[str, int], provider: str,
+                 bulk_size: int, max_inflight: int):
+        self.base_url = base_url.rstrip("/")
+        self.rps = rps
+        self.duration = duration
+        self.mix = mix
+        self.provider = provider
+        self.bulk_size = bulk_size
+        self.max_inflight = max_inflight
+        self.texts = sample_texts(5000)
+        self.latencies: Dict[str, List[float]] = {name: [] for name in SCENARIOS}
+        self.statuses: Dict[str, Dict[str, int]] = {name: {} for name in SCENARIOS}
+        self.skipped = 0
+        self.inflight = 0
+        self.token: Optional[str] = None
+
+    async def login(self, client: httpx.AsyncClient):
+        """Register a throwaway user so history requests are authenticated"""
+        name = f"load{uuid.uuid4().hex[:10]}"
+        response = await client.post("/auth/register", json={
+            "username": name, "email": f"{name}@example.com", "password": uuid.uuid4().hex
+        })
+        response.raise_for_status()
+        self.token = response.json()["access_token"]
+
+    def _headers(self) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {self.token}"} if self.token else {}
+
+    async def _send(self, client: httpx.AsyncClient, scenario: str):
+        if scenario == "analyze":
+            return await client.post("/analyze", headers=self._headers(), json={
+                "text": random.choice(self.texts),
+                "style": random.choice(STYLES),
+                "platform": random.choice(PLATFORMS),
+                "ai_provider": self.provider
+            })
+        if scenario == "bulk":
+            return await client.post("/bulk/analyze", headers=self._headers(), json={
+                "texts": random.sample(self.texts, self.bulk_size),
+                "style": random.choice(STYLES),
+                "ai_provider": self.provider
+            })
+        if random.random() < 0.5:
+            return await client.get("/history", headers=self._headers(), params={"limit": 20})
+        return await client.post("/history/search", headers=self._headers(),
+                                 params={"query": random.choice(["stupid", "code review", "great"]), "limit": 20})
+
+    async def _request(self, client: httpx.AsyncClient, scenario: str, scheduled: float):
+        self.inflight += 1
+        try:
+            response = await self._send(client, scenario)
+            status = str(response.status_code)
+        except httpx.HTTPError as e:
+            status = type(e).__name__
+        finally:
+            self.inflight -= 1
+        self.latencies[scenario].append(time.perf_counter() - scheduled)
+        self.statuses[scenario][status] = self.statuses[scenario].get(status, 0) + 1
+
+    async def run(self) -> Dict:
+        limits = httpx.Limits(max_connections=self.max_inflight, max_keepalive_connections=self.max_inflight)
+        async with httpx.AsyncClient(base_url=self.base_url, timeout=60.0, limits=limits) as client:
+            if "history" in self.mix:
+                await self.login(client)
+
+            scenarios = [name for name, weight in self.mix.items() for _ in range(weight)]
+            total = int(self.rps * self.duration)
+            tasks = []
+            started = time.perf_counter()
+            for i in range(total):
+                scheduled = started + i / self.rps
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                if self.inflight >= self.max_inflight:
+                    self.skipped += 1
+                    continue
+                tasks.append(asyncio.create_task(self._request(client, random.choice(scenarios), scheduled)))
+            await asyncio.gather(*tasks)
+            elapsed = time.perf_counter() - started
+
+        return self.report(elapsed)
+
+    def report(self, elapsed: float) -> Dict:
+        summary = {"target_rps": self.rps, "duration_s": round(elapsed, 2), "skipped": self.skipped, "scenarios": {}}
+        completed = 0
+        for scenario in SCENARIOS:
+            values = sorted(self.latencies[scenario])
+            if not values:
+                continue
+            completed += len(values)
+            ok = sum(count for status, count in self.statuses[scenario].items() if status.startswith("2"))
+            summary["scenarios"][scenario] = {
+                "requests": len(values),
+                "ok": ok,
+                "error_rate": round(1 - ok / len(values), 4),
+                "throughput_rps": round(len(values) / elapsed, 2),
+                "p50_ms": round(percentile(values, 0.50) * 1000, 1),
+                "p95_ms": round(percentile(values, 0.95) * 1000, 1),
+                "p99_ms": round(percentile(values, 0.99) * 1000, 1),
+                "max_ms": round(values[-1] * 1000, 1),
+                "statuses": self.statuses[scenario]
+            }
+        summary["throughput_rps"] = round(completed / elapsed, 2) if elapsed else 0
+        return summary
+
+def print_report(summary: Dict):
+    print(f"\nOffered {summary['target_rps']} rps for {summary['duration_s']}s; "
+          f"achieved {summary['throughput_rps']} rps, skipped {summary['skipped']}")
+    print(f"{'scenario':10s} {'requests':>9s} {'errors':>8s} {'rps':>8s} {'p50':>9s} {'p95':>9s} {'p99':>9s}")
+    for name, s in summary["scenarios"].items():
+        print(f"{name:10s} {s['requests']:9d} {s['error_rate']:8.2%} {s['throughput_rps']:8.1f} "
+              f"{s['p50_ms']:7.1f}ms {s['p95_ms']:7.1f}ms {s['p99_ms']:7.1f}ms")
+
+def main():
+    parser = argparse.ArgumentParser(description="Drive the WitMirror API at a target request rate")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--rps", type=float, default=20)
+    parser.add_argument("--duration", type=float, default=30, help="seconds")
+    parser.add_argument("--mix", default="analyze=8,bulk=1,history=1")
+    parser.add_argument("--provider", default="openai", help="ai_provider sent with analyze requests")
+    parser.add_argument("--bulk-size", type=int, default=10)
+    parser.add_argument("--max-inflight", type=int, default=256)
+    parser.add_argument("--output", default=None, help="write the report as JSON")
+    args = parser.parse_args()
+
+    generator = LoadGenerator(args.base_url, args.rps, args.duration, parse_mix(args.mix), args.provider,
+                              args.bulk_size, args.max_inflight)
+    summary = asyncio.run(generator.run())
+    print_report(summary)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(summary, f, indent=2)
+
+if __name__ == "__main__":
+    main()
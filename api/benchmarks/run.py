@@ -0,0 +1,203 @@
+"""Microbenchmarks for the hot paths, with JSON baselines and regression reports
+
+Usage (from api/):
+    python benchmarks/run.py --sizes 10k                 # run and compare with stored baselines
+    python benchmarks/run.py --sizes 10k,1m --save-baseline
+    python benchmarks/run.py --only sentiment,history    # benchmarks whose name starts with these
+"""
+from typing import Callable, Dict, List, Optional
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+API_DIR = os.path.dirname(BENCH_DIR)
+BASELINE_DIR = os.path.join(BENCH_DIR, "baselines")
+
+sys.path.insert(0, API_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from synthetic_data import SIZES, DATA_DIR, dataset_url, sample_texts
+
+# Each benchmark runs for at least MIN_TIME seconds and at most MAX_ITERATIONS times
+MIN_TIME = 1.0
+MAX_ITERATIONS = 10_000
+MIN_ITERATIONS = 3
+REGRESSION_THRESHOLD = 0.20  # slower than baseline by more than this fraction
+
+def define_benchmarks(db) -> Dict[str, Callable[[], object]]:
+    """Benchmark name -> zero-argument callable timed as one operation"""
+    from sqlalchemy import func
+    from models import Analysis
+    from sentiment import analyze_sentiment_advanced
+    from ai_services import ai_service
+    from analytics import AnalyticsService
+    from comment_history import CommentHistoryManager
+
+    texts = sample_texts(1000)
+    busiest_user = db.query(Analysis.user_id).group_by(Analysis.user_id).order_by(
+        func.count(Analysis.id).desc()
+    ).limit(1).scalar()
+    analytics = AnalyticsService(db)
+    history = CommentHistoryManager(db)
+    counter = {"i": 0}
+
+    def next_text() -> str:
+        counter["i"] += 1
+        return texts[counter["i"] % len(texts)]
+
+    return {
+        "sentiment.analyze_sentiment_advanced": lambda: analyze_sentiment_advanced(next_text()),
+        "ai.build_prompt": lambda: ai_service._build_prompt(next_text(), "stoic"),
+        "ai.fallback_wisdom": lambda: ai_service._get_fallback_wisdom(next_text(), "zen"),
+        "analytics.track_request": lambda: analytics.track_request({
+            "sentiment": "negative",
+            "detected_emotions": ["anger", "contempt"],
+            "platform": "reddit",
+            "visitor": f"bench:{counter['i']}"
+        }, 0.25, True),
+        "analytics.get_usage_summary": analytics.get_usage_summary,
+        "history.get_history_stats": lambda: history.get_history_stats(busiest_user),
+        "history.search_history": lambda: history.search_history(busiest_user, "stupid code", limit=50)
+    }
+
+def time_benchmark(fn: Callable[[], object], min_time: float = MIN_TIME) -> Dict:
+    samples: List[float] = []
+    started = time.perf_counter()
+    while len(samples) < MAX_ITERATIONS and (len(samples) < MIN_ITERATIONS or time.perf_counter() - started < min_time):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    samples.sort()
+    median = statistics.median(samples)
+    return {
+        "iterations": len(samples),
+        "median_ms": median * 1000,
+        "p95_ms": samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1000,
+        "min_ms": samples[0] * 1000,
+        "ops_per_sec": 1 / median if median else None
+    }
+
+def run_size(size: str, only: Optional[List[str]], min_time: float) -> Dict:
+    """Build (or reuse) one dataset and time every benchmark against it; runs in its own process"""
+    from synthetic_data import build_dataset
+    from database import SessionLocal
+
+    print(f"[{size}] preparing {SIZES[size]:,} analyses")
+    build_dataset(SIZES[size])
+
+    db = SessionLocal()
+    try:
+        results = {}
+        for name, fn in define_benchmarks(db).items():
+            if only and not any(name.startswith(prefix) for prefix in only):
+                continue
+            fn()  # warm caches and lazy imports outside the timing
+            results[name] = time_benchmark(fn, min_time)
+            print(f"[{size}] {name:40s} {results[name]['median_ms']:10.3f}ms median  ({results[name]['iterations']} runs)")
+        return results
+    finally:
+        db.close()
+
+def baseline_path(size: str) -> str:
+    return os.path.join(BASELINE_DIR, f"{size}.json")
+
+def compare(size: str, results: Dict, threshold: float) -> List[str]:
+    """Report each benchmark against the stored baseline; returns regressions"""
+    path = baseline_path(size)
+    if not os.path.exists(path):
+        print(f"[{size}] no baseline at {path}; run with --save-baseline to create one")
+        return []
+    with open(path) as f:
+        baseline = json.load(f)["results"]
+
+    regressions = []
+    print(f"\n[{size}] vs baseline")
+    for name, result in results.items():
+        if name not in baseline:
+            print(f"  {name:40s} new")
+            continue
+        before, after = baseline[name]["median_ms"], result["median_ms"]
+        change = (after - before) / before if before else 0.0
+        flag = ""
+        if change > threshold:
+            flag = "  REGRESSION"
+            regressions.append(f"{size} {name}: {before:.3f}ms -> {after:.3f}ms ({change:+.0%})")
+        elif change < -threshold:
+            flag = "  improved"
+        print(f"  {name:40s} {before:10.3f}ms -> {after:10.3f}ms  {change:+7.1%}{flag}")
+    return regressions
+
+def save_baseline(size: str, results: Dict):
+    os.makedirs(BASELINE_DIR, exist_ok=True)
+    with open(baseline_path(size), "w") as f:
+        json.dump({
+            "size": size,
+            "rows": SIZES[size],
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "results": results
+        }, f, indent=2, sort_keys=True)
+    print(f"[{size}] baseline saved to {baseline_path(size)}")
+
+def main():
+    parser = argparse.ArgumentParser(description="WitMirror microbenchmarks")
+    parser.add_argument("--sizes", default="10k", help=f"comma-separated dataset sizes: {', '.join(SIZES)}")
+    parser.add_argument("--only", default=None, help="comma-separated benchmark name prefixes")
+    parser.add_argument("--min-time", type=float, default=MIN_TIME)
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--output", default=None, help="write all results to this JSON file")
+    parser.add_argument("--worker", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    only = args.only.split(",") if args.only else None
+
+    if args.worker:
+        # Child process: the dataset URL must be set before database is imported
+        print(json.dumps(run_size(args.worker, only, args.min_time)))
+        return
+
+    sizes = [s.strip() for s in args.sizes.split(",") if s.strip()]
+    unknown = [s for s in sizes if s not in SIZES]
+    if unknown:
+        sys.exit(f"Unknown dataset size(s): {', '.join(unknown)}")
+
+    os.makedirs(DATA_DIR, exist_ok=True)
+    all_results, regressions = {}, []
+    for size in sizes:
+        command = [sys.executable, os.path.abspath(__file__), "--worker", size, "--min-time", str(args.min_time)]
+        if args.only:
+            command += ["--only", args.only]
+        env = {**os.environ, "DATABASE_URL": dataset_url(size), "PYTHONPATH": API_DIR}
+        completed = subprocess.run(command, cwd=API_DIR, env=env, stdout=subprocess.PIPE, text=True)
+        lines = completed.stdout.strip().splitlines()
+        for line in lines[:-1]:
+            print(line)
+        if completed.returncode != 0 or not lines:
+            sys.exit(f"Benchmarks for {size} failed")
+
+        results = json.loads(lines[-1])
+        all_results[size] = results
+        if args.save_baseline:
+            save_baseline(size, results)
+        else:
+            regressions += compare(size, results, args.threshold)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(all_results, f, indent=2, sort_keys=True)
+
+    if regressions:
+        print("\nRegressions:")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
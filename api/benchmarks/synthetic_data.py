@@ -0,0 +1,108 @@
+"""Synthetic analysis datasets for the benchmark suite"""
+from datetime import datetime, timedelta
+from typing import Dict, List
+import json
+import os
+import random
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+SIZES = {"10k": 10_000, "1m": 1_000_000, "10m": 10_000_000}
+USERS = 1000
+DAYS = 365
+CHUNK = 10_000
+
+NEUTRAL_WORDS = [
+    "the", "post", "thread", "comment", "code", "review", "meeting", "today", "reddit", "discord",
+    "game", "update", "release", "team", "docs", "issue", "feature", "people", "this", "that"
+]
+NEGATIVE_WORDS = ["stupid", "idiot", "garbage", "terrible", "awful", "hate", "worst", "useless", "pathetic"]
+POSITIVE_WORDS = ["great", "love", "wonderful", "helpful", "excellent", "amazing", "thanks"]
+EMOTIONS = ["anger", "contempt", "disgust", "hostility", "aggression", "subjective", "strongly_negative"]
+STYLES = ["classic", "stoic", "zen", "sufi", "sarcastic", "poetic", "scientific", "humorous"]
+PLATFORMS = ["general", "reddit", "twitter", "discord", "youtube"]
+
+def dataset_url(size: str) -> str:
+    return f"sqlite:///{os.path.join(DATA_DIR, f'analyses_{size}.db')}"
+
+def synthetic_text(rng: random.Random) -> str:
+    words = rng.choices(NEUTRAL_WORDS, k=rng.randint(6, 30))
+    roll = rng.random()
+    if roll < 0.45:
+        words += rng.choices(NEGATIVE_WORDS, k=rng.randint(1, 3))
+    elif roll < 0.7:
+        words += rng.choices(POSITIVE_WORDS, k=rng.randint(1, 2))
+    rng.shuffle(words)
+    return " ".join(words)
+
+def synthetic_row(rng: random.Random, now: datetime) -> Dict:
+    text = synthetic_text(rng)
+    negative = any(word in text for word in NEGATIVE_WORDS)
+    return {
+        "user_id": rng.randint(1, USERS),
+        "original_text": text,
+        "sentiment": "negative" if negative else rng.choice(["positive", "neutral"]),
+        "confidence": round(rng.uniform(0.5, 0.95), 3),
+        "detected_emotions": json.dumps(rng.sample(EMOTIONS, rng.randint(1, 3)) if negative else []),
+        "toxicity_score": round(rng.uniform(0.0, 1.0), 3) if negative else 0.0,
+        "wisdom_response": "The mirror often blames the face it reflects.",
+        "style": rng.choice(STYLES),
+        "platform": rng.choice(PLATFORMS),
+        "model_used": rng.choice(["openai", "template", "fallback"]),
+        "processing_time": round(rng.uniform(0.01, 2.0), 3),
+        "created_at": now - timedelta(seconds=rng.randint(0, DAYS * 86400))
+    }
+
+def build_dataset(rows: int, seed: int = 42):
+    """Fill the configured database with `rows` analyses plus a year of daily analytics
+
+    Expects DATABASE_URL to point at the dataset; existing rows are kept and topped up.
+    """
+    from sqlalchemy import func
+    from database import SessionLocal, engine, init_database
+    from models import Analysis, Analytics, User
+
+    init_database()
+    db = SessionLocal()
+    try:
+        existing = db.query(func.count(Analysis.id)).scalar()
+        if existing >= rows:
+            return existing
+
+        rng = random.Random(seed + existing)
+        now = datetime.utcnow()
+        if not db.query(User.id).first():
+            db.bulk_insert_mappings(User, [
+                {"username": f"bench{i}", "email": f"bench{i}@example.com", "hashed_password": "x"}
+                for i in range(1, USERS + 1)
+            ])
+            db.bulk_insert_mappings(Analytics, [_daily_row(rng, now - timedelta(days=d)) for d in range(DAYS)])
+            db.commit()
+    finally:
+        db.close()
+
+    table = Analysis.__table__
+    with engine.begin() as conn:
+        for start in range(existing, rows, CHUNK):
+            conn.execute(table.insert(), [synthetic_row(rng, now) for _ in range(min(CHUNK, rows - start))])
+            if (start // CHUNK) % 50 == 0:
+                print(f"  {start + CHUNK:,} / {rows:,} analyses")
+    return rows
+
+def _daily_row(rng: random.Random, day: datetime) -> Dict:
+    total = rng.randint(500, 5000)
+    failed = rng.randint(0, total // 50)
+    return {
+        "date": day,
+        "total_requests": total,
+        "successful_requests": total - failed,
+        "failed_requests": failed,
+        "avg_processing_time": rng.uniform(0.1, 1.5),
+        "unique_users": rng.randint(50, 500),
+        "top_emotions": {emotion: rng.randint(0, total) for emotion in EMOTIONS},
+        "platform_usage": {platform: rng.randint(0, total) for platform in PLATFORMS}
+    }
+
+def sample_texts(count: int, seed: int = 7) -> List[str]:
+    rng = random.Random(seed)
+    return [synthetic_text(rng) for _ in range(count)]
@@ -0,0 +1,326 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import func, or_, and_
+from models import BulkJob, BulkJobItem
+from database import SessionLocal
+from sentiment import analyze_sentiment_advanced
+from sentiment_pool import sentiment_pool
+from template_engine import analysis_context
+from generation_policy import generation_policy
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from collections import Counter
+from datetime import datetime, timedelta
+import asyncio
+import json
+import os
+import uuid
+
+# Job limits and worker configuration
+MAX_JOB_TEXTS = int(os.getenv("BULK_JOB_MAX_TEXTS", "200000"))
+MAX_ACTIVE_JOBS = int(os.getenv("BULK_JOB_MAX_ACTIVE_PER_USER", "3"))
+JOB_WORKERS = int(os.getenv("BULK_JOB_WORKERS", "2"))
+CHUNK_SIZE = int(os.getenv("BULK_JOB_CHUNK_SIZE", "100"))  # items per checkpoint
+GENERATION_CONCURRENCY = int(os.getenv("BULK_JOB_GENERATION_CONCURRENCY", "8"))
+POLL_INTERVAL = float(os.getenv("BULK_JOB_POLL_INTERVAL", "1"))
+LEASE_SECONDS = int(os.getenv("BULK_JOB_LEASE_SECONDS", "120"))  # chunks leased by a dead worker are redone after this
+INSERT_BATCH = 5000
+RESULT_PAGE_MAX = 1000
+
+ACTIVE_STATUSES = ("queued", "running")
+
+def create_job(db: Session, user_id: int, plan: str, texts: List[str], style: str, platform: str,
+               ai_provider: str) -> BulkJob:
+    """Store a job and one pending item per text"""
+    job = BulkJob(
+        id=str(uuid.uuid4()),
+        user_id=user_id,
+        style=style,
+        platform=platform,
+        ai_provider=ai_provider,
+        plan=plan,
+        total=len(texts)
+    )
+    db.add(job)
+    db.flush()
+    for start in range(0, len(texts), INSERT_BATCH):
+        db.bulk_insert_mappings(BulkJobItem, [
+            {"job_id": job.id, "position": start + offset, "text": text, "status": "pending"}
+            for offset, text in enumerate(texts[start:start + INSERT_BATCH])
+        ])
+    db.commit()
+    return job
+
+def active_job_count(db: Session, user_id: int) -> int:
+    return db.query(func.count(BulkJob.id)).filter(
+        BulkJob.user_id == user_id,
+        BulkJob.status.in_(ACTIVE_STATUSES)
+    ).scalar()
+
+def job_summary(job: BulkJob) -> Dict:
+    """Progress of one job as returned by the API"""
+    finished = job.processed + job.failed
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "total": job.total,
+        "processed": job.processed,
+        "failed": job.failed,
+        "progress": round(finished / job.total, 4) if job.total else 1.0,
+        "style": job.style,
+        "platform": job.platform,
+        "ai_provider": job.ai_provider,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "completed_at": job.completed_at
+    }
+
+def cancel_job(db: Session, job: BulkJob):
+    """Stop scheduling a job; items already finished keep their results"""
+    if job.status in ACTIVE_STATUSES:
+        job.status = "cancelled"
+        job.completed_at = datetime.utcnow()
+        db.commit()
+
+def _item_result(item: BulkJobItem) -> Dict:
+    result = {"index": item.position, "status": item.status}
+    if item.status == "done":
+        result.update(item.result or {})
+    elif item.status == "failed":
+        result["error"] = item.error
+    return result
+
+def job_results(db: Session, job_id: str, after: int = -1, limit: int = 100) -> Tuple[List[Dict], Optional[int]]:
+    """One page of finished items in input order, starting after the given index"""
+    items = db.query(BulkJobItem).filter(
+        BulkJobItem.job_id == job_id,
+        BulkJobItem.position > after,
+        BulkJobItem.status.in_(["done", "failed"])
+    ).order_by(BulkJobItem.position).limit(limit + 1).all()
+    if len(items) <= limit:
+        return [_item_result(item) for item in items], None
+    return [_item_result(item) for item in items[:limit]], items[limit - 1].position
+
+def iter_results_ndjson(job_id: str, session_factory: Callable[[], Session] = SessionLocal) -> Iterator[bytes]:
+    """Every finished item as one JSON line, read in pages so memory stays flat"""
+    after = -1
+    while True:
+        db = session_factory()
+        try:
+            page, next_after = job_results(db, job_id, after, RESULT_PAGE_MAX)
+        finally:
+            db.close()
+        if page:
+            yield "".join(json.dumps(result, default=str) + "\n" for result in page).encode()
+        if next_after is None:
+            return
+        after = next_after
+
+class BulkJobWorker:
+    """Background pool that processes job items in leased chunks, taking turns between tenants"""
+
+    def __init__(self, session_factory: Callable[[], Session], workers: int = JOB_WORKERS,
+                 chunk_size: int = CHUNK_SIZE, poll_interval: float = POLL_INTERVAL):
+        self.session_factory = session_factory
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.poll_interval = poll_interval
+        self._tasks: List[asyncio.Task] = []
+        self._wake: Optional[asyncio.Event] = None
+        self._running_by_user: Counter = Counter()
+
+    async def start(self):
+        if self._tasks:
+            return
+        self._wake = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._run()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def wake(self):
+        """Nudge idle workers after a job is submitted from this process"""
+        if self._wake is not None:
+            self._wake.set()
+
+    @property
+    def running_chunks(self) -> int:
+        return sum(self._running_by_user.values())
+
+    async def _run(self):
+        while True:
+            try:
+                claim = await asyncio.to_thread(self._claim)
+            except Exception as e:
+                print(f"Bulk job claim error: {e}")
+                claim = None
+
+            if claim is None:
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            job, token, items = claim
+            self._running_by_user[job["user_id"]] += 1
+            try:
+                results = await self._process(job, items)
+                await asyncio.to_thread(self._checkpoint, job["id"], token, results)
+            except Exception as e:
+                # The lease expires and another worker redoes the chunk
+                print(f"Bulk job {job['id']} chunk error: {e}")
+            finally:
+                self._running_by_user[job["user_id"]] -= 1
+                if self._running_by_user[job["user_id"]] <= 0:
+                    del self._running_by_user[job["user_id"]]
+
+    def _claim(self) -> Optional[Tuple[Dict, str, List[Tuple[int, int, str]]]]:
+        """Lease the next chunk from the tenant that has waited longest and is least busy here"""
+        db = self.session_factory()
+        try:
+            jobs = db.query(BulkJob).filter(BulkJob.status.in_(ACTIVE_STATUSES)).order_by(BulkJob.created_at).all()
+            if not jobs:
+                return None
+
+            # Round-robin between users across processes, oldest job first within a user
+            last_turn: Dict[int, datetime] = {}
+            for job in jobs:
+                if job.last_claimed_at and job.last_claimed_at > last_turn.get(job.user_id, datetime.min):
+                    last_turn[job.user_id] = job.last_claimed_at
+                last_turn.setdefault(job.user_id, datetime.min)
+            running = dict(self._running_by_user)
+            users = sorted(last_turn, key=lambda user: (running.get(user, 0), last_turn[user]))
+
+            for user_id in users:
+                for job in jobs:
+                    if job.user_id == user_id:
+                        claim = self._lease(db, job)
+                        if claim is not None:
+                            return claim
+            return None
+        finally:
+            db.close()
+
+    def _lease(self, db: Session, job: BulkJob) -> Optional[Tuple[Dict, str, List[Tuple[int, int, str]]]]:
+        """Conditionally mark the next pending (or abandoned) items of a job as running"""
+        now = datetime.utcnow()
+        claimable = or_(
+            BulkJobItem.status == "pending",
+            and_(BulkJobItem.status == "running", BulkJobItem.lease_expires_at < now)
+        )
+        ids = [row.id for row in db.query(BulkJobItem.id).filter(
+            BulkJobItem.job_id == job.id, claimable
+        ).order_by(BulkJobItem.position).limit(self.chunk_size)]
+        if not ids:
+            self._complete_if_finished(db, job.id)
+            db.commit()
+            return None
+
+        # Conditional update so two processes never lease the same item
+        token = str(uuid.uuid4())
+        db.query(BulkJobItem).filter(BulkJobItem.id.in_(ids), claimable).update({
+            BulkJobItem.status: "running",
+            BulkJobItem.claim_token: token,
+            BulkJobItem.lease_expires_at: now + timedelta(seconds=LEASE_SECONDS)
+        }, synchronize_session=False)
+        values = {BulkJob.status: "running", BulkJob.last_claimed_at: now}
+        if job.started_at is None:
+            values[BulkJob.started_at] = now
+        db.query(BulkJob).filter(BulkJob.id == job.id, BulkJob.status.in_(ACTIVE_STATUSES)).update(
+            values, synchronize_session=False
+        )
+        db.commit()
+
+        items = [(row.id, row.position, row.text) for row in db.query(
+            BulkJobItem.id, BulkJobItem.position, BulkJobItem.text
+        ).filter(BulkJobItem.claim_token == token).order_by(BulkJobItem.position)]
+        if not items:
+            return None
+        job_info = {
+            "id": job.id, "user_id": job.user_id, "style": job.style, "platform": job.platform,
+            "ai_provider": job.ai_provider, "plan": job.plan
+        }
+        return job_info, token, items
+
+    async def _process(self, job: Dict, items: List[Tuple[int, int, str]]) -> Dict[int, Tuple[Optional[Dict], Optional[str]]]:
+        """Item id -> (result, error) for one chunk"""
+        texts = [text for _, _, text in items]
+        try:
+            analyses = await sentiment_pool.analyze_batch(texts)
+        except Exception as e:
+            print(f"Bulk job sentiment error: {e}")
+            analyses = [None] * len(texts)
+
+        results: Dict[int, Tuple[Optional[Dict], Optional[str]]] = {}
+        scored = []
+        for (item_id, _, text), analysis in zip(items, analyses):
+            try:
+                scored.append((item_id, text, analysis or analyze_sentiment_advanced(text)))
+            except Exception as e:
+                results[item_id] = (None, str(e))
+
+        try:
+            generated = await generation_policy.generate_batch(
+                [text for _, text, _ in scored], job["style"], job["ai_provider"],
+                [analysis_context(analysis, job["platform"]) for _, _, analysis in scored], job["plan"],
+                concurrency=GENERATION_CONCURRENCY
+            )
+        except Exception as e:
+            print(f"Bulk job generation error: {e}")
+            generated = [None] * len(scored)
+
+        for (item_id, text, analysis), wisdom in zip(scored, generated):
+            if wisdom is None:
+                results[item_id] = (None, "generation failed")
+                continue
+            results[item_id] = ({
+                "text": text,
+                "analysis": analysis.model_dump(),
+                "wisdom": wisdom[0],
+                "model_used": wisdom[2]
+            }, None)
+        return results
+
+    def _checkpoint(self, job_id: str, token: str, results: Dict[int, Tuple[Optional[Dict], Optional[str]]]):
+        """Store a chunk's results and advance the job's counters in one transaction"""
+        db = self.session_factory()
+        try:
+            done = failed = 0
+            # Items whose lease expired and were taken over elsewhere no longer carry this token
+            for item in db.query(BulkJobItem).filter(BulkJobItem.claim_token == token):
+                result, error = results.get(item.id, (None, "not processed"))
+                item.status = "done" if result is not None else "failed"
+                item.result = result
+                item.error = error
+                item.claim_token = None
+                item.lease_expires_at = None
+                if result is not None:
+                    done += 1
+                else:
+                    failed += 1
+            db.query(BulkJob).filter(BulkJob.id == job_id).update({
+                BulkJob.processed: BulkJob.processed + done,
+                BulkJob.failed: BulkJob.failed + failed
+            }, synchronize_session=False)
+            db.flush()
+            self._complete_if_finished(db, job_id)
+            db.commit()
+        finally:
+            db.close()
+
+    def _complete_if_finished(self, db: Session, job_id: str):
+        remaining = db.query(BulkJobItem.id).filter(
+            BulkJobItem.job_id == job_id,
+            BulkJobItem.status.in_(["pending", "running"])
+        ).first()
+        if remaining is None:
+            db.query(BulkJob).filter(BulkJob.id == job_id, BulkJob.status.in_(ACTIVE_STATUSES)).update({
+                BulkJob.status: "completed",
+                BulkJob.completed_at: datetime.utcnow()
+            }, synchronize_session=False)
+
+# Process-wide worker pool, started and stopped with the app
+bulk_job_worker = BulkJobWorker(SessionLocal)
@@ -0,0 +1,159 @@
+from sqlalchemy.orm import Session
+from models import Analysis, Analytics
+from typing import Dict, Iterator, List, Optional
+from datetime import datetime
+import io
+import json
+
+# Supported columnar formats and their media types
+COLUMNAR_FORMATS = {
+    "arrow": "application/vnd.apache.arrow.stream",
+    "parquet": "application/vnd.apache.parquet"
+}
+
+# Rows fetched from the database per record batch
+BATCH_SIZE = 10000
+
+def _load_pyarrow():
+    """Import pyarrow lazily so the API still starts without it"""
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise RuntimeError("Columnar export requires the 'pyarrow' package")
+    return pyarrow
+
+def _decode_list(value) -> List[str]:
+    if not value:
+        return []
+    return json.loads(value) if isinstance(value, str) else list(value)
+
+def _decode_dict(value) -> Dict[str, int]:
+    if not value:
+        return {}
+    return json.loads(value) if isinstance(value, str) else dict(value)
+
+class ColumnarExporter:
+    def __init__(self, db: Session):
+        self.db = db
+        self.pa = _load_pyarrow()
+
+    def history_schema(self):
+        """Arrow schema for analysis history exports"""
+        pa = self.pa
+        category = pa.dictionary(pa.int32(), pa.string())
+        return pa.schema([
+            ("id", pa.int64()),
+            ("original_text", pa.string()),
+            ("sentiment", category),
+            ("confidence", pa.float64()),
+            ("detected_emotions", pa.list_(pa.string())),
+            ("toxicity_score", pa.float64()),
+            ("wisdom_response", pa.string()),
+            ("style", category),
+            ("platform", category),
+            ("model_used", category),
+            ("processing_time", pa.float64()),
+            ("created_at", pa.timestamp("us"))
+        ])
+
+    def analytics_schema(self):
+        """Arrow schema for daily analytics exports"""
+        pa = self.pa
+        return pa.schema([
+            ("date", pa.timestamp("us")),
+            ("total_requests", pa.int64()),
+            ("successful_requests", pa.int64()),
+            ("failed_requests", pa.int64()),
+            ("avg_processing_time", pa.float64()),
+            ("unique_users", pa.int64()),
+            ("top_emotions", pa.map_(pa.string(), pa.int64())),
+            ("platform_usage", pa.map_(pa.string(), pa.int64()))
+        ])
+
+    def export_history(self, user_id: int, format: str = "arrow") -> Iterator[bytes]:
+        """Stream a user's analysis history as Arrow IPC or Parquet"""
+        query = self.db.query(
+            Analysis.id,
+            Analysis.original_text,
+            Analysis.sentiment,
+            Analysis.confidence,
+            Analysis.detected_emotions,
+            Analysis.toxicity_score,
+            Analysis.wisdom_response,
+            Analysis.style,
+            Analysis.platform,
+            Analysis.model_used,
+            Analysis.processing_time,
+            Analysis.created_at
+        ).filter(Analysis.user_id == user_id).order_by(Analysis.id)
+
+        return self._write(query, self.history_schema(), format, {"detected_emotions": _decode_list})
+
+    def export_analytics(self, start_date: Optional[datetime] = None, end_date: Optional[datetime] = None,
+                         format: str = "arrow") -> Iterator[bytes]:
+        """Stream daily analytics rows as Arrow IPC or Parquet"""
+        query = self.db.query(
+            Analytics.date,
+            Analytics.total_requests,
+            Analytics.successful_requests,
+            Analytics.failed_requests,
+            Analytics.avg_processing_time,
+            Analytics.unique_users,
+            Analytics.top_emotions,
+            Analytics.platform_usage
+        )
+
+        if start_date:
+            query = query.filter(Analytics.date >= start_date)
+        if end_date:
+            query = query.filter(Analytics.date <= end_date)
+
+        decoders = {
+            "top_emotions": lambda v: list(_decode_dict(v).items()),
+            "platform_usage": lambda v: list(_decode_dict(v).items())
+        }
+        return self._write(query.order_by(Analytics.date), self.analytics_schema(), format, decoders)
+
+    def _write(self, query, schema, format: str, decoders: Dict) -> Iterator[bytes]:
+        """Build record batches column by column and yield the encoded bytes"""
+        if format not in COLUMNAR_FORMATS:
+            raise ValueError(f"Unsupported columnar format: {format}")
+
+        pa = self.pa
+        sink = io.BytesIO()
+        if format == "parquet":
+            writer = pa.parquet.ParquetWriter(sink, schema, compression="zstd")
+        else:
+            writer = pa.ipc.new_stream(sink, schema)
+
+        def drain() -> bytes:
+            chunk = sink.getvalue()
+            sink.seek(0)
+            sink.truncate()
+            return chunk
+
+        def batches() -> Iterator[bytes]:
+            names = schema.names
+            columns = [[] for _ in names]
+            column_decoders = [decoders.get(name) for name in names]
+            rows = 0
+
+            for row in query.yield_per(BATCH_SIZE):
+                for i, value in enumerate(row):
+                    decode = column_decoders[i]
+                    columns[i].append(decode(value) if decode else value)
+                rows += 1
+
+                if rows == BATCH_SIZE:
+                    writer.write_batch(pa.record_batch(columns, schema=schema))
+                    columns = [[] for _ in names]
+                    rows = 0
+                    yield drain()
+
+            if rows:
+                writer.write_batch(pa.record_batch(columns, schema=schema))
+            writer.close()
+            yield drain()
+
+        return batches()
@@ -1,8 +1,11 @@
 from sqlalchemy.orm import Session
 from sqlalchemy import desc, func, and_
 from models import Analysis, User
+from pagination import keyset_page
+from search_index import apply_text_search
+from topic_index import TopicIndex
 from typing import List, Dict, Optional, Tuple
-from datetime import datetime, timedelta
+from datetime import datetime
 import json
 
 class CommentHistoryManager:
@@ -13,25 +16,32 @@ class CommentHistoryManager:
         """Get user's comment analysis history"""
         analyses = self.db.query(Analysis).filter(
             Analysis.user_id == user_id
-        ).order_by(desc(Analysis.created_at)).offset(offset).limit(limit).all()
+        ).order_by(desc(Analysis.created_at), desc(Analysis.id)).offset(offset).limit(limit).all()
         
-        return [
-            {
-                'id': analysis.id,
-                'original_text': analysis.original_text,
-                'sentiment': analysis.sentiment,
-                'confidence': analysis.confidence,
-                'detected_emotions': json.loads(analysis.detected_emotions) if analysis.detected_emotions else [],
-                'toxicity_score': analysis.toxicity_score,
-                'wisdom_response': analysis.wisdom_response,
-                'style': analysis.style,
-                'platform': analysis.platform,
-                'model_used': analysis.model_used,
-                'processing_time': analysis.processing_time,
-                'created_at': analysis.created_at.isoformat()
-            }
-            for analysis in analyses
-        ]
+        return [self._history_item(analysis) for analysis in analyses]
+    
+    def get_user_history_page(self, user_id: int, limit: int = 50, cursor: Optional[str] = None) -> Tuple[List[Dict], Optional[str]]:
+        """Get one keyset page of user's history and the cursor for the next page"""
+        query = self.db.query(Analysis).filter(Analysis.user_id == user_id)
+        analyses, next_cursor = keyset_page(query, Analysis, limit, cursor)
+        
+        return [self._history_item(analysis) for analysis in analyses], next_cursor
+    
+    def _history_item(self, analysis: Analysis) -> Dict:
+        return {
+            'id': analysis.id,
+            'original_text': analysis.original_text,
+            'sentiment': analysis.sentiment,
+            'confidence': analysis.confidence,
+            'detected_emotions': json.loads(analysis.detected_emotions) if analysis.detected_emotions else [],
+            'toxicity_score': analysis.toxicity_score,
+            'wisdom_response': analysis.wisdom_response,
+            'style': analysis.style,
+            'platform': analysis.platform,
+            'model_used': analysis.model_used,
+            'processing_time': analysis.processing_time,
+            'created_at': analysis.created_at.isoformat()
+        }
     
     def get_history_stats(self, user_id: int) -> Dict:
         """Get statistics for user's comment history"""
@@ -98,14 +108,10 @@ class CommentHistoryManager:
             'time_analysis': time_analysis
         }
     
-    def search_history(self, user_id: int, query: str, filters: Dict = None) -> List[Dict]:
-        """Search through user's comment history"""
+    def search_history(self, user_id: int, query: str, filters: Dict = None, limit: int = 50, offset: int = 0) -> List[Dict]:
+        """Search through user's comment history, best matches first"""
         query_obj = self.db.query(Analysis).filter(Analysis.user_id == user_id)
         
-        # Text search
-        if query:
-            query_obj = query_obj.filter(Analysis.original_text.contains(query))
-        
         # Apply filters
         if filters:
             if 'sentiment' in filters:
@@ -119,7 +125,13 @@ class CommentHistoryManager:
             if 'date_to' in filters:
                 query_obj = query_obj.filter(Analysis.created_at <= filters['date_to'])
         
-        analyses = query_obj.order_by(desc(Analysis.created_at)).all()
+        # Text search
+        if query:
+            query_obj = apply_text_search(self.db, query_obj, query)
+        else:
+            query_obj = query_obj.order_by(desc(Analysis.created_at))
+        
+        analyses = query_obj.offset(offset).limit(limit).all()
         
         return [
             {
@@ -161,31 +173,7 @@ class CommentHistoryManager:
     
     def get_trending_topics(self, user_id: int, days: int = 30) -> List[Dict]:
         """Get trending topics from user's analysis history"""
-        start_date = datetime.now() - timedelta(days=days)
-        
-        analyses = self.db.query(Analysis).filter(
-            and_(
-                Analysis.user_id == user_id,
-                Analysis.created_at >= start_date
-            )
-        ).all()
-        
-        # Simple keyword extraction (in production, use proper NLP)
-        keywords = {}
-        for analysis in analyses:
-            text = analysis.original_text.lower()
-            # Simple keyword extraction
-            words = text.split()
-            for word in words:
-                if len(word) > 3:  # Filter short words
-                    keywords[word] = keywords.get(word, 0) + 1
-        
-        trending_topics = sorted(keywords.items(), key=lambda x: x[1], reverse=True)[:10]
-        
-        return [
-            {'topic': topic, 'frequency': count}
-            for topic, count in trending_topics
-        ]
+        return TopicIndex(self.db).top_terms(user_id, days)
     
     def export_history(self, user_id: int, format: str = 'json') -> Dict:
         """Export user's complete analysis history"""
@@ -228,18 +216,25 @@ class CommentHistoryManager:
         if not analysis:
             return False
         
+        TopicIndex(self.db).forget(user_id, analysis.original_text, analysis.created_at)
         self.db.delete(analysis)
         self.db.commit()
         return True
     
     def bulk_delete_analyses(self, user_id: int, analysis_ids: List[int]) -> int:
         """Bulk delete analyses from user's history"""
-        deleted_count = self.db.query(Analysis).filter(
+        selection = self.db.query(Analysis).filter(
             and_(
                 Analysis.id.in_(analysis_ids),
                 Analysis.user_id == user_id
             )
-        ).delete(synchronize_session=False)
+        )
+        
+        topic_index = TopicIndex(self.db)
+        for row in selection.with_entities(Analysis.original_text, Analysis.created_at):
+            topic_index.forget(user_id, row.original_text, row.created_at)
+        
+        deleted_count = selection.delete(synchronize_session=False)
         
         self.db.commit()
         return deleted_count
@@ -1,6 +1,10 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect
+from sqlalchemy.schema import CreateColumn
 from sqlalchemy.orm import sessionmaker
 from models import Base
+from search_index import ensure_search_index
+from topic_index import ensure_topic_index
+from timeseries import ensure_metric_buckets
 import os
 
 # Database configuration
@@ -26,6 +30,32 @@ def get_db():
 def init_database():
     """Initialize database tables"""
     Base.metadata.create_all(bind=engine)
+    add_missing_columns()
+    
+    # create_all skips indexes on tables that already exist
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+    
+    ensure_search_index(engine)
+    
+    db = SessionLocal()
+    try:
+        ensure_topic_index(db)
+        ensure_metric_buckets(db)
+    finally:
+        db.close()
+
+def add_missing_columns():
+    """Add nullable columns introduced after a table was first created"""
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            existing = {c["name"] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing and column.nullable:
+                    ddl = CreateColumn(column).compile(dialect=engine.dialect)
+                    conn.exec_driver_sql(f"ALTER TABLE {table.name} ADD COLUMN {ddl}")
 
 def reset_database():
     """Reset database (for development)"""
@@ -0,0 +1,149 @@
+from sqlalchemy.orm import Session
+from models import Analysis
+from database import SessionLocal
+from typing import Callable, Dict, Iterable, List, Optional
+from datetime import datetime
+import asyncio
+import calendar
+import json
+import os
+import threading
+
+# Longest trending window answered from memory
+MAX_WINDOW_DAYS = 7
+SLOTS = MAX_WINDOW_DAYS * 24 * 60
+
+# How often the background task checks for completed minutes to pull from stored analyses
+SYNC_INTERVAL = float(os.getenv("EMOTION_WINDOW_SYNC_SECONDS", "5"))
+
+def _minute_of(moment: datetime) -> int:
+    """Minutes since the epoch for a naive UTC timestamp"""
+    return calendar.timegm(moment.utctimetuple()) // 60
+
+class EmotionWindow:
+    """Per-minute ring buffer of emotion counts covering the longest trending window
+
+    Completed minutes come from stored analyses, so every worker and the ingestion
+    scheduler are counted once. The minute in progress is counted locally by add()
+    until the background sync replaces it.
+    """
+
+    def __init__(self, session_factory: Callable[[], Session], slots: int = SLOTS,
+                 interval: float = SYNC_INTERVAL):
+        self.session_factory = session_factory
+        self.slots = slots
+        self.interval = interval
+        self._minutes: List[int] = [-1] * slots
+        self._counts: List[Optional[Dict[str, int]]] = [None] * slots
+        self._lock = threading.Lock()
+        self._synced_through: Optional[int] = None  # last minute loaded from the database
+        self._version = 0
+        self._results: Dict[int, tuple] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def warm(self) -> bool:
+        return self._synced_through is not None
+
+    def add(self, emotions: Iterable[str], at: Optional[datetime] = None):
+        """Count emotions seen by this worker in a minute the database sync has not loaded yet"""
+        minute = _minute_of(at or datetime.utcnow())
+        with self._lock:
+            if self._synced_through is not None and minute <= self._synced_through:
+                return
+            counts = self._slot(minute)
+            for emotion in emotions:
+                counts[emotion] = counts.get(emotion, 0) + 1
+            self._version += 1
+
+    def trending(self, days: int) -> List[Dict]:
+        """Emotion counts over the last N days, newest minute included"""
+        now_minute = _minute_of(datetime.utcnow())
+        first_minute = now_minute - days * 24 * 60
+
+        with self._lock:
+            cached = self._results.get(days)
+            if cached and cached[0] == self._version and cached[1] == now_minute:
+                return cached[2]
+
+            totals: Dict[str, int] = {}
+            for minute, counts in zip(self._minutes, self._counts):
+                if counts and first_minute < minute <= now_minute:
+                    for emotion, count in counts.items():
+                        totals[emotion] = totals.get(emotion, 0) + count
+
+            result = [
+                {"emotion": emotion, "count": count}
+                for emotion, count in sorted(totals.items(), key=lambda x: x[1], reverse=True)
+            ]
+            self._results[days] = (self._version, now_minute, result)
+            return result
+
+    def _slot(self, minute: int) -> Dict[str, int]:
+        index = minute % self.slots
+        if self._minutes[index] != minute:
+            self._minutes[index] = minute
+            self._counts[index] = {}
+        return self._counts[index]
+
+    def warm_up(self):
+        """Load the whole window from stored analyses; run once at startup"""
+        self._load(_minute_of(datetime.utcnow()) - self.slots + 1)
+
+    def sync_once(self):
+        """Load minutes completed since the last sync"""
+        if self._synced_through is None:
+            self.warm_up()
+        elif _minute_of(datetime.utcnow()) - 1 > self._synced_through:
+            # Re-read the last loaded minute too, its final rows may have committed late
+            self._load(self._synced_through)
+
+    def _load(self, first_minute: int):
+        last_minute = _minute_of(datetime.utcnow()) - 1
+        minutes: Dict[int, Dict[str, int]] = {minute: {} for minute in range(first_minute, last_minute + 1)}
+
+        # Every stored analysis counts, whether it came from /analyze or the ingestion scheduler
+        db = self.session_factory()
+        try:
+            rows = db.query(Analysis.created_at, Analysis.detected_emotions).filter(
+                Analysis.created_at >= datetime.utcfromtimestamp(first_minute * 60),
+                Analysis.created_at < datetime.utcfromtimestamp((last_minute + 1) * 60)
+            )
+            for created_at, detected_emotions in rows.yield_per(1000):
+                counts = minutes.setdefault(_minute_of(created_at), {})
+                if isinstance(detected_emotions, str):
+                    detected_emotions = json.loads(detected_emotions)
+                for emotion in detected_emotions or []:
+                    counts[emotion] = counts.get(emotion, 0) + 1
+        finally:
+            db.close()
+
+        with self._lock:
+            # Replaces what add() counted locally for these minutes
+            for minute, counts in minutes.items():
+                index = minute % self.slots
+                self._minutes[index] = minute
+                self._counts[index] = counts
+            self._synced_through = last_minute
+            self._version += 1
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.to_thread(self.sync_once)
+            except Exception as e:
+                print(f"Emotion window sync error: {e}")
+            await asyncio.sleep(self.interval)
+
+# Process-wide window, warmed up at startup and synced in the background with the app
+emotion_window = EmotionWindow(SessionLocal)
@@ -0,0 +1,204 @@
+from ai_services import ai_service
+from template_engine import template_engine
+from profiling import span
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from collections import OrderedDict
+import asyncio
+import hashlib
+import os
+import threading
+
+# Generation tiers, cheapest first
+TIERS = ("cache", "template", "fallback", "ollama", "premium")
+PREMIUM_PROVIDERS = ("openai", "anthropic")
+
+# Order in which a busy or unavailable tier steps down; fallback always answers
+LADDER = ("template", "ollama", "premium")
+
+# Policy configuration
+WISDOM_CACHE_SIZE = int(os.getenv("WISDOM_CACHE_SIZE", "5000"))
+PREMIUM_MIN_TOXICITY = float(os.getenv("GENERATION_PREMIUM_MIN_TOXICITY", "0.0"))
+MAX_INFLIGHT = {
+    "premium": int(os.getenv("GENERATION_MAX_INFLIGHT_PREMIUM", "16")),
+    "ollama": int(os.getenv("GENERATION_MAX_INFLIGHT_OLLAMA", "4"))
+}
+
+def _parse_ceilings(value: str) -> Dict[str, str]:
+    ceilings = {}
+    for item in value.split(","):
+        plan, _, tier = item.partition(":")
+        if tier.strip() in TIERS:
+            ceilings[plan.strip()] = tier.strip()
+    return ceilings
+
+# Most expensive tier each plan may reach, e.g. "anonymous:ollama,free:premium"
+PLAN_CEILINGS = _parse_ceilings(os.getenv("GENERATION_PLAN_CEILINGS", "anonymous:premium,free:premium,pro:premium"))
+
+def user_plan(user) -> str:
+    """Billing plan used by the policy; stored in user preferences"""
+    if user is None:
+        return "anonymous"
+    if user.is_admin:
+        return "pro"
+    return (user.preferences or {}).get("plan", "free")
+
+def _cache_key(text: str, style: str, tier: str) -> str:
+    normalized = " ".join(text.lower().split())
+    return hashlib.sha1(f"{tier}\x00{style}\x00{normalized}".encode("utf-8")).hexdigest()
+
+class GenerationPolicy:
+    """Chooses the cheapest generation tier that fits the comment, plan and provider load"""
+
+    def __init__(self, cache_size: int = WISDOM_CACHE_SIZE):
+        self.cache_size = cache_size
+        self._lock = threading.Lock()
+        self._cache: "OrderedDict[str, Tuple[str, float, str]]" = OrderedDict()
+        self._inflight = {"premium": 0, "ollama": 0}
+        self._counters = {tier: {"chosen": 0, "served": 0} for tier in TIERS}
+        self._degraded = 0
+
+    def choose(self, provider: str, context: Dict, plan: str = "free") -> str:
+        """Tier to attempt before availability and load are considered"""
+        if provider == "template":
+            return "template"
+        if provider == "fallback":
+            return "fallback"
+
+        # Positive or neutral comments with no toxicity gain nothing from a model
+        toxicity = context.get("toxicity_score") or 0.0
+        if context.get("sentiment") != "negative" and toxicity <= 0.0:
+            return "template"
+
+        if provider == "ollama" or toxicity < PREMIUM_MIN_TOXICITY:
+            desired = "ollama"
+        else:
+            desired = "premium"
+
+        ceiling = PLAN_CEILINGS.get(plan, "premium")
+        if TIERS.index(desired) > TIERS.index(ceiling):
+            desired = ceiling
+        return desired
+
+    def generate(self, text: str, style: str = "classic", provider: str = "openai",
+                 context: Optional[Dict] = None, plan: str = "free") -> Tuple[str, float, str]:
+        """Generate wisdom through the chosen tier, stepping down when a tier is unavailable or busy"""
+        context = context or {}
+        tier = self.choose(provider, context, plan)
+
+        # Only model output is cached, and only the tier this caller was chosen for may reuse it
+        if tier in ("ollama", "premium"):
+            key = _cache_key(text, style, tier)
+            with self._lock:
+                cached = self._cache.get(key)
+                if cached is not None:
+                    self._cache.move_to_end(key)
+                    self._count("cache", chosen=True, served=True)
+                    return cached
+
+        with self._lock:
+            self._count(tier, chosen=True)
+
+        candidates = LADDER[:LADDER.index(tier) + 1][::-1] if tier in LADDER else ()
+        for candidate in candidates:
+            result = self._try_tier(candidate, text, style, provider, context)
+            if result is not None:
+                break
+        else:
+            result = ai_service._get_fallback_wisdom(text, style)
+            candidate = "fallback"
+
+        served = candidate
+        with self._lock:
+            if served != tier:
+                self._degraded += 1
+            self._count(served, served=True)
+            if served in ("ollama", "premium"):
+                key = _cache_key(text, style, served)
+                self._cache[key] = result
+                if len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return result
+
+    async def generate_batch(self, texts: List[str], style: str = "classic", provider: str = "openai",
+                             contexts: Optional[List[Dict]] = None, plan: str = "free",
+                             concurrency: int = 8) -> List[Tuple[str, float, str]]:
+        """Generate wisdom for several texts concurrently, preserving input order"""
+        semaphore = asyncio.Semaphore(concurrency)
+        contexts = contexts or [None] * len(texts)
+
+        async def generate(text: str, context: Optional[Dict]) -> Tuple[str, float, str]:
+            async with semaphore:
+                return await asyncio.to_thread(self.generate, text, style, provider, context, plan)
+
+        return await asyncio.gather(*(generate(text, context) for text, context in zip(texts, contexts)))
+
+    async def generate_as_completed(self, texts: List[str], style: str = "classic", provider: str = "openai",
+                                    contexts: Optional[List[Dict]] = None, plan: str = "free", concurrency: int = 8
+                                    ) -> AsyncIterator[Tuple[int, Optional[Tuple[str, float, str]], Optional[Exception]]]:
+        """Yield (index, result, error) for each text as soon as its generation finishes"""
+        semaphore = asyncio.Semaphore(concurrency)
+        contexts = contexts or [None] * len(texts)
+
+        async def generate(index: int, text: str, context: Optional[Dict]):
+            async with semaphore:
+                try:
+                    return index, await asyncio.to_thread(self.generate, text, style, provider, context, plan), None
+                except Exception as e:
+                    return index, None, e
+
+        tasks = [asyncio.create_task(generate(i, text, context)) for i, (text, context) in enumerate(zip(texts, contexts))]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                yield await finished
+        finally:
+            # The consumer went away, e.g. a client disconnected mid-stream
+            for task in tasks:
+                task.cancel()
+
+    def _try_tier(self, tier: str, text: str, style: str, provider: str,
+                  context: Dict) -> Optional[Tuple[str, float, str]]:
+        if tier == "template":
+            with span("template"):
+                return template_engine.render(text, style, context)
+
+        if tier == "ollama":
+            model_provider = "ollama" if "ollama" in ai_service.providers else None
+        elif provider in PREMIUM_PROVIDERS and provider in ai_service.providers:
+            model_provider = provider
+        else:
+            model_provider = next((p for p in PREMIUM_PROVIDERS if p in ai_service.providers), None)
+        if model_provider is None:
+            return None
+
+        with self._lock:
+            if self._inflight[tier] >= MAX_INFLIGHT[tier]:
+                return None
+            self._inflight[tier] += 1
+        try:
+            result = ai_service.generate_wisdom(text, style, model_provider, context)
+            # A failed provider answers with canned wisdom; try the next tier down instead
+            return None if result[2] == "fallback" else result
+        finally:
+            with self._lock:
+                self._inflight[tier] -= 1
+
+    def _count(self, tier: str, chosen: bool = False, served: bool = False):
+        if chosen:
+            self._counters[tier]["chosen"] += 1
+        if served:
+            self._counters[tier]["served"] += 1
+
+    def stats(self) -> Dict:
+        """Per-tier counters, current provider load and cache size"""
+        with self._lock:
+            return {
+                "tiers": {tier: dict(counts) for tier, counts in self._counters.items()},
+                "degraded": self._degraded,
+                "inflight": dict(self._inflight),
+                "max_inflight": dict(MAX_INFLIGHT),
+                "cache_entries": len(self._cache),
+                "plan_ceilings": dict(PLAN_CEILINGS)
+            }
+
+# Process-wide policy shared by every request
+generation_policy = GenerationPolicy()
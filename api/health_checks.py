@@ -0,0 +1,175 @@
+from sqlalchemy.orm import Session
+from models import CatalogVersion
+from database import SessionLocal, engine
+from ai_services import ai_service
+from warmup import warmup_report
+from typing import Callable, Dict, List, Optional, Tuple
+from datetime import datetime
+import asyncio
+import os
+import time
+import httpx
+
+# Background checker configuration
+CHECK_INTERVAL = float(os.getenv("HEALTH_CHECK_INTERVAL", "10"))
+CHECK_TIMEOUT = float(os.getenv("HEALTH_CHECK_TIMEOUT", "3"))
+STALE_AFTER = float(os.getenv("HEALTH_STALE_AFTER", str(CHECK_INTERVAL * 3)))  # results older than this fail readiness
+
+# Readiness thresholds
+DB_MAX_LATENCY_MS = float(os.getenv("HEALTH_DB_MAX_LATENCY_MS", "500"))
+POOL_MAX_SATURATION = float(os.getenv("HEALTH_POOL_MAX_SATURATION", "0.9"))
+# Providers whose outage makes this worker unready; others only degrade generation to cheaper tiers
+REQUIRED_PROVIDERS = [p.strip() for p in os.getenv("HEALTH_REQUIRED_PROVIDERS", "").split(",") if p.strip()]
+
+def _provider_probe(name: str) -> Tuple[str, Dict[str, str]]:
+    """URL and headers of a request that reaches the provider without spending tokens"""
+    provider = ai_service.providers[name]
+    if name == "openai":
+        return f"{(provider.base_url or 'https://api.openai.com/v1').rstrip('/')}/models", {
+            "Authorization": f"Bearer {provider.api_key}"
+        }
+    if name == "anthropic":
+        return f"{(provider.base_url or 'https://api.anthropic.com').rstrip('/')}/v1/models", {
+            "x-api-key": provider.api_key, "anthropic-version": "2023-06-01"
+        }
+    return f"{provider.base_url.rstrip('/')}/api/tags", {}
+
+def pool_usage() -> Dict:
+    """Connections checked out against the pool's capacity, read without touching the database"""
+    pool = engine.pool
+    if not hasattr(pool, "checkedout"):
+        return {"checked_out": None, "capacity": None, "saturation": 0.0}
+    capacity = pool.size() + max(0, getattr(pool, "_max_overflow", 0))
+    checked_out = pool.checkedout()
+    return {
+        "checked_out": checked_out,
+        "capacity": capacity,
+        "saturation": round(checked_out / capacity, 3) if capacity else 0.0
+    }
+
+class HealthMonitor:
+    """Checks the database and model providers on an interval so probes only read cached results"""
+
+    def __init__(self, session_factory: Callable[[], Session], interval: float = CHECK_INTERVAL,
+                 timeout: float = CHECK_TIMEOUT):
+        self.session_factory = session_factory
+        self.interval = interval
+        self.timeout = timeout
+        self.results: Dict = {}
+        self._checked_at: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+        self._client: Optional[httpx.AsyncClient] = None
+
+    async def start(self):
+        if self._task is None:
+            self._client = httpx.AsyncClient(timeout=self.timeout)
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.check_once()
+            except Exception as e:
+                print(f"Health check error: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def check_once(self) -> Dict:
+        """Run every check concurrently and replace the cached results"""
+        names = list(ai_service.providers)
+        database, *providers = await asyncio.gather(
+            self._check_database(),
+            *(self._check_provider(name) for name in names)
+        )
+        self.results = {
+            "database": database,
+            "providers": dict(zip(names, providers)),
+            "checked_at": datetime.utcnow().isoformat()
+        }
+        self._checked_at = time.monotonic()
+        return self.results
+
+    def _query_database(self):
+        db = self.session_factory()
+        try:
+            # A real table rather than SELECT 1, so a locked or missing database file fails
+            db.query(CatalogVersion.version).limit(1).all()
+        finally:
+            db.close()
+
+    async def _check_database(self) -> Dict:
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(asyncio.to_thread(self._query_database), timeout=self.timeout)
+            return {"status": "ok", "latency_ms": round((time.perf_counter() - start) * 1000, 1)}
+        except asyncio.TimeoutError:
+            return {"status": "fail", "error": f"no response within {self.timeout:g}s"}
+        except Exception as e:
+            return {"status": "fail", "error": str(e)[:200]}
+
+    async def _check_provider(self, name: str) -> Dict:
+        start = time.perf_counter()
+        try:
+            url, headers = _provider_probe(name)
+            response = await self._client.get(url, headers=headers)
+        except Exception as e:
+            # Includes a misconfigured base URL (InvalidURL, missing key), not just network errors
+            return {"status": "fail", "error": type(e).__name__}
+        latency_ms = round((time.perf_counter() - start) * 1000, 1)
+        # Any answer short of a server or credential error means requests can get through
+        if response.status_code >= 500 or response.status_code in (401, 403):
+            return {"status": "fail", "http_status": response.status_code, "latency_ms": latency_ms}
+        return {"status": "ok", "http_status": response.status_code, "latency_ms": latency_ms}
+
+    @property
+    def age(self) -> Optional[float]:
+        """Seconds since the last completed round of checks"""
+        return None if self._checked_at is None else time.monotonic() - self._checked_at
+
+    def readiness(self) -> Tuple[bool, List[str]]:
+        """Whether this worker should receive traffic, and why not"""
+        reasons = []
+        if warmup_report.get("completed_at") is None:
+            reasons.append("warm-up has not finished")
+        age = self.age
+        if age is None:
+            reasons.append("dependency checks have not run yet")
+        elif age > STALE_AFTER:
+            reasons.append(f"dependency checks are {age:.0f}s old")
+        else:
+            database = self.results["database"]
+            if database["status"] != "ok":
+                reasons.append(f"database: {database.get('error')}")
+            elif database["latency_ms"] > DB_MAX_LATENCY_MS:
+                reasons.append(f"database round trip {database['latency_ms']:.0f}ms over {DB_MAX_LATENCY_MS:.0f}ms")
+            for name in REQUIRED_PROVIDERS:
+                provider = self.results["providers"].get(name)
+                if provider is None:
+                    reasons.append(f"required provider {name} is not configured")
+                elif provider["status"] != "ok":
+                    reasons.append(f"required provider {name} is unreachable")
+
+        pool = pool_usage()
+        if pool["saturation"] >= POOL_MAX_SATURATION:
+            reasons.append(f"connection pool {pool['saturation']:.0%} checked out")
+        return not reasons, reasons
+
+    def report(self) -> Dict:
+        """Cached check results with the live pool usage"""
+        age = self.age
+        return {
+            **self.results,
+            "age_seconds": None if age is None else round(age, 1),
+            "pool": pool_usage()
+        }
+
+# Process-wide monitor, started and stopped with the app
+health_monitor = HealthMonitor(SessionLocal)
@@ -0,0 +1,69 @@
+from typing import Iterable, Optional
+import hashlib
+import math
+
+# 2^12 registers: ~1.6% standard error in 4 KiB per sketch
+DEFAULT_PRECISION = 12
+
+_HASH_BITS = 64
+_INVERSE_POWERS = [2.0 ** -r for r in range(_HASH_BITS + 2)]
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "big")
+
+class HyperLogLog:
+    """Mergeable cardinality sketch for counting distinct visitors"""
+
+    def __init__(self, precision: int = DEFAULT_PRECISION, registers: Optional[bytes] = None):
+        if not 4 <= precision <= 16:
+            raise ValueError("precision must be between 4 and 16")
+        self.precision = precision
+        self.size = 1 << precision
+        if registers is not None and len(registers) != self.size:
+            raise ValueError("register array does not match precision")
+        self.registers = bytearray(registers) if registers is not None else bytearray(self.size)
+
+    def add(self, value: str):
+        """Add one item to the sketch"""
+        h = _hash(value)
+        index = h >> (_HASH_BITS - self.precision)
+        remainder_bits = _HASH_BITS - self.precision
+        remainder = h & ((1 << remainder_bits) - 1)
+        rank = remainder_bits - remainder.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def update(self, values: Iterable[str]):
+        for value in values:
+            self.add(value)
+
+    def merge(self, other: "HyperLogLog") -> "HyperLogLog":
+        """Fold another sketch of the same precision into this one"""
+        if other.precision != self.precision:
+            raise ValueError("cannot merge sketches with different precision")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    def count(self) -> int:
+        """Estimated number of distinct items added"""
+        m = self.size
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(_INVERSE_POWERS[r] for r in self.registers)
+
+        # Linear counting is more accurate while many registers are still empty
+        if estimate <= 2.5 * m:
+            zeros = self.registers.count(0)
+            if zeros:
+                estimate = m * math.log(m / zeros)
+
+        return int(round(estimate))
+
+    def to_bytes(self) -> bytes:
+        return bytes([self.precision]) + bytes(self.registers)
+
+    @classmethod
+    def from_bytes(cls, data: Optional[bytes]) -> "HyperLogLog":
+        """Load a sketch written by to_bytes, or an empty one for missing data"""
+        if not data:
+            return cls()
+        return cls(precision=data[0], registers=data[1:])
@@ -0,0 +1,252 @@
+from sqlalchemy.orm import Session
+from models import Analysis, MonitoredSource, User
+from database import SessionLocal
+from reddit_client import reddit_fetcher
+from sentiment_pool import sentiment_pool
+from generation_policy import generation_policy, user_plan
+from template_engine import analysis_context
+from topic_index import TopicIndex
+from emotion_window import emotion_window
+from response_cache import analytics_cache
+from typing import Callable, Dict, List, Optional
+from datetime import datetime, timedelta
+import asyncio
+import json
+import os
+import time
+
+# Scheduler configuration
+SCHEDULER_TICK = float(os.getenv("INGESTION_TICK_SECONDS", "5"))
+SCHEDULER_CONCURRENCY = int(os.getenv("INGESTION_CONCURRENCY", "4"))
+MIN_POLL_INTERVAL = float(os.getenv("INGESTION_MIN_INTERVAL", "60"))
+MAX_POLL_INTERVAL = float(os.getenv("INGESTION_MAX_INTERVAL", "3600"))
+REDDIT_LISTING_DEPTH = 1000  # Reddit stops paging a listing after about this many items
+# Polls page back to the previous high-water mark, up to this many comments
+MAX_ITEMS_PER_POLL = min(int(os.getenv("INGESTION_MAX_ITEMS", str(REDDIT_LISTING_DEPTH))), REDDIT_LISTING_DEPTH)
+INITIAL_BACKFILL = 25  # comments analysed on a source's first poll
+LEASE_SECONDS = 300
+
+SOURCE_KINDS = ("subreddit", "account")
+
+def next_interval(current: float, new_items: int, failed: bool = False) -> float:
+    """Poll busy sources more often and quiet or failing ones less often"""
+    if failed:
+        current *= 2
+    elif new_items >= MAX_ITEMS_PER_POLL // 2:
+        current /= 4
+    elif new_items:
+        current /= 2
+    else:
+        current *= 1.5
+    return max(MIN_POLL_INTERVAL, min(MAX_POLL_INTERVAL, current))
+
+class IngestionScheduler:
+    """Background poller that analyses only comments newer than each source's high-water mark"""
+
+    def __init__(self, session_factory: Callable[[], Session], concurrency: int = SCHEDULER_CONCURRENCY,
+                 tick: float = SCHEDULER_TICK):
+        self.session_factory = session_factory
+        self.concurrency = concurrency
+        self.tick = tick
+        self._task: Optional[asyncio.Task] = None
+        self.queued = 0  # claimed sources waiting for a concurrency slot
+        self.polling = 0
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                print(f"Ingestion scheduler error: {e}")
+            await asyncio.sleep(self.tick)
+
+    async def run_once(self) -> int:
+        """Poll every due source once; returns the number of comments ingested"""
+        sources = await asyncio.to_thread(self._claim_due)
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def poll(source: Dict) -> int:
+            self.queued += 1
+            try:
+                await semaphore.acquire()
+            finally:
+                self.queued -= 1
+            self.polling += 1
+            try:
+                return await self.poll_source(source)
+            finally:
+                self.polling -= 1
+                semaphore.release()
+
+        results = await asyncio.gather(*(poll(source) for source in sources))
+        return sum(results)
+
+    def _claim_due(self) -> List[Dict]:
+        """Lease due sources so other workers skip them while this one polls"""
+        db = self.session_factory()
+        try:
+            now = datetime.utcnow()
+            ids = [row.id for row in db.query(MonitoredSource.id).filter(
+                MonitoredSource.is_active == True,
+                MonitoredSource.next_poll_at <= now
+            ).order_by(MonitoredSource.next_poll_at).limit(self.concurrency * 4)]
+            if not ids:
+                return []
+
+            lease_until = now + timedelta(seconds=LEASE_SECONDS)
+            claimed = []
+            for source_id in ids:
+                updated = db.query(MonitoredSource).filter(
+                    MonitoredSource.id == source_id,
+                    MonitoredSource.next_poll_at <= now
+                ).update({MonitoredSource.next_poll_at: lease_until}, synchronize_session=False)
+                if updated:
+                    claimed.append(source_id)
+            db.commit()
+
+            owners = {
+                user.id: user_plan(user)
+                for user in db.query(User).join(MonitoredSource, MonitoredSource.user_id == User.id).filter(
+                    MonitoredSource.id.in_(claimed)
+                )
+            }
+            return [
+                {
+                    "id": s.id,
+                    "user_id": s.user_id,
+                    "plan": owners.get(s.user_id, "free"),
+                    "platform": s.platform,
+                    "kind": s.kind,
+                    "target": s.target,
+                    "style": s.style,
+                    # Sources created before providers were stored keep the old default
+                    "ai_provider": s.ai_provider or "openai",
+                    "poll_interval": s.poll_interval,
+                    "high_water_mark": s.high_water_mark
+                }
+                for s in db.query(MonitoredSource).filter(MonitoredSource.id.in_(claimed))
+            ]
+        finally:
+            db.close()
+
+    async def poll_source(self, source: Dict) -> int:
+        """Fetch, analyse and store new comments for one source"""
+        try:
+            comments = await self._fetch_new(source)
+        except Exception as e:
+            await asyncio.to_thread(self._finish, source, [], None, f"{type(e).__name__}: {e}")
+            return 0
+
+        # Listings are newest first; store oldest first
+        newest_id = comments[0]['id'] if comments else None
+        gap = None
+        if source["high_water_mark"] is not None and len(comments) >= MAX_ITEMS_PER_POLL:
+            # Paging stopped before reaching the previous mark, so older new comments are out of reach
+            gap = (f"More than {MAX_ITEMS_PER_POLL} new comments since the last poll; "
+                   f"comments between {source['high_water_mark']} and {comments[-1]['id']} were skipped")
+        comments = [c for c in reversed(comments) if c.get('text')]
+        try:
+            rows = await self._analyze(source, comments) if comments else []
+        except Exception as e:
+            # Keep the high-water mark so the same comments are retried after backoff
+            await asyncio.to_thread(self._finish, source, [], None, f"{type(e).__name__}: {e}")
+            return 0
+        await asyncio.to_thread(self._finish, source, rows, newest_id, None, gap)
+        return len(rows)
+
+    async def _fetch_new(self, source: Dict) -> List[Dict]:
+        if source["platform"] != "reddit":
+            raise ValueError(f"Unsupported platform: {source['platform']}")
+        if source["kind"] == "account":
+            path = f"/user/{source['target']}/comments.json"
+        else:
+            path = f"/r/{source['target']}/comments.json"
+
+        if source["high_water_mark"] is None:
+            return await reddit_fetcher.fetch_listing(path, INITIAL_BACKFILL, newer_than="0")
+        return await reddit_fetcher.fetch_listing(path, MAX_ITEMS_PER_POLL, newer_than=source["high_water_mark"])
+
+    async def _analyze(self, source: Dict, comments: List[Dict]) -> List[Dict]:
+        start_time = time.time()
+        texts = [comment['text'] for comment in comments]
+        analyses = await sentiment_pool.analyze_batch(texts)
+
+        # Only negative comments get a generated reflection
+        negative = [i for i, analysis in enumerate(analyses) if analysis.sentiment == "negative"]
+        wisdom_results = await generation_policy.generate_batch(
+            [texts[i] for i in negative], source["style"], source["ai_provider"],
+            [analysis_context(analyses[i], source["platform"]) for i in negative], source["plan"]
+        )
+        wisdom_by_index = dict(zip(negative, wisdom_results))
+        per_item_time = (time.time() - start_time) / len(comments)
+
+        rows = []
+        for i, (comment, analysis) in enumerate(zip(comments, analyses)):
+            wisdom, _, model_used = wisdom_by_index.get(i, ("", 0.0, "none"))
+            rows.append({
+                "user_id": source["user_id"],
+                "original_text": comment['text'],
+                "sentiment": analysis.sentiment,
+                "confidence": analysis.confidence,
+                "detected_emotions": json.dumps(analysis.detected_emotions),
+                "toxicity_score": analysis.toxicity_score,
+                "wisdom_response": wisdom,
+                "style": source["style"],
+                "platform": source["platform"],
+                "model_used": model_used,
+                "processing_time": per_item_time,
+                "user_agent": f"monitor:{source['id']}"
+            })
+        return rows
+
+    def _finish(self, source: Dict, rows: List[Dict], newest_id: Optional[str], error: Optional[str],
+                warning: Optional[str] = None):
+        """Store analyses and advance the high-water mark in one transaction
+
+        A warning is recorded in last_error like an error, but does not back off polling.
+        """
+        db = self.session_factory()
+        try:
+            if rows:
+                db.bulk_insert_mappings(Analysis, rows)
+                topic_index = TopicIndex(db)
+                for row in rows:
+                    topic_index.record(row["user_id"], row["original_text"])
+
+            interval = next_interval(source["poll_interval"], len(rows), failed=error is not None)
+            values = {
+                MonitoredSource.poll_interval: interval,
+                MonitoredSource.next_poll_at: datetime.utcnow() + timedelta(seconds=interval),
+                MonitoredSource.last_polled_at: datetime.utcnow(),
+                MonitoredSource.last_error: error or warning,
+                MonitoredSource.total_ingested: MonitoredSource.total_ingested + len(rows)
+            }
+            if newest_id:
+                values[MonitoredSource.high_water_mark] = newest_id
+            elif source["high_water_mark"] is None and error is None:
+                # Empty first poll: start from the beginning next time
+                values[MonitoredSource.high_water_mark] = "0"
+
+            db.query(MonitoredSource).filter(MonitoredSource.id == source["id"]).update(
+                values, synchronize_session=False
+            )
+            db.commit()
+            if rows:
+                analytics_cache.mark_dirty()
+            for row in rows:
+                emotion_window.add(json.loads(row["detected_emotions"]))
+        finally:
+            db.close()
+
+# Process-wide scheduler, started and stopped with the app
+ingestion_scheduler = IngestionScheduler(SessionLocal)
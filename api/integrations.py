@@ -1,42 +1,45 @@
 from sqlalchemy.orm import Session
-from models import Analysis, User
+from models import Analysis, User, DiscordWebhook, MonitoredSource
+from reddit_client import reddit_fetcher
+from sentiment_pool import sentiment_pool
+from generation_policy import generation_policy
+from webhook_outbox import enqueue_notification, delivery_worker
+from ingestion_scheduler import SOURCE_KINDS, MIN_POLL_INTERVAL
 from typing import List, Dict, Optional
-import requests
+from urllib.parse import urlsplit
 import json
 from datetime import datetime, timedelta
 
+# Deliveries are posted server-side, so only Discord's own webhook endpoints are accepted
+DISCORD_WEBHOOK_HOSTS = {
+    f"{prefix}{domain}" for prefix in ("", "ptb.", "canary.") for domain in ("discord.com", "discordapp.com")
+}
+DISCORD_WEBHOOK_PATH = "/api/webhooks/"
+
+def is_discord_webhook_url(url: str) -> bool:
+    """Whether url is an https Discord webhook endpoint"""
+    try:
+        parts = urlsplit(url)
+        port = parts.port
+    except ValueError:
+        return False
+    return (
+        parts.scheme == "https"
+        and (parts.hostname or "").lower() in DISCORD_WEBHOOK_HOSTS
+        and port in (None, 443)
+        and parts.username is None and parts.password is None
+        and parts.path.startswith(DISCORD_WEBHOOK_PATH)
+    )
+
 class IntegrationManager:
     def __init__(self, db: Session):
         self.db = db
     
-    def get_reddit_comments(self, subreddit: str, limit: int = 10) -> List[Dict]:
+    async def get_reddit_comments(self, subreddit: str, limit: int = 10) -> List[Dict]:
         """Fetch recent comments from Reddit API"""
         try:
             # Reddit API endpoint (requires authentication in production)
-            url = f"https://www.reddit.com/r/{subreddit}/comments.json"
-            headers = {
-                'User-Agent': 'WitMirror/1.0'
-            }
-            
-            response = requests.get(url, headers=headers, params={'limit': limit})
-            response.raise_for_status()
-            
-            data = response.json()
-            comments = []
-            
-            for post in data.get('data', {}).get('children', []):
-                post_data = post.get('data', {})
-                comments.append({
-                    'id': post_data.get('id'),
-                    'text': post_data.get('body', ''),
-                    'author': post_data.get('author'),
-                    'score': post_data.get('score', 0),
-                    'created_utc': post_data.get('created_utc'),
-                    'subreddit': post_data.get('subreddit'),
-                    'platform': 'reddit'
-                })
-            
-            return comments
+            return await reddit_fetcher.fetch_comments(subreddit, limit)
         except Exception as e:
             print(f"Reddit API error: {e}")
             return []
@@ -60,12 +63,14 @@ class IntegrationManager:
             print(f"Twitter API error: {e}")
             return []
     
-    def analyze_social_media_sentiment(self, platform: str, query: str, limit: int = 50) -> Dict:
+    async def analyze_social_media_sentiment(self, platform: str, query: str, limit: int = 50,
+                                             style: str = "classic", ai_provider: str = "openai",
+                                             plan: str = "free") -> Dict:
         """Analyze sentiment across social media platforms"""
         comments = []
         
         if platform == 'reddit':
-            comments = self.get_reddit_comments(query, limit)
+            comments = await self.get_reddit_comments(query, limit)
         elif platform == 'twitter':
             comments = self.get_twitter_mentions(query, limit)
         
@@ -79,33 +84,40 @@ class IntegrationManager:
                 'recommended_responses': []
             }
         
-        # Analyze sentiment for each comment
+        # Score every comment in one batch through the shared sentiment engine
+        analyses = await sentiment_pool.analyze_batch([comment['text'] for comment in comments])
+        
         sentiment_counts = {'positive': 0, 'negative': 0, 'neutral': 0}
         negative_comments = []
+        for comment, analysis in zip(comments, analyses):
+            sentiment_counts[analysis.sentiment] = sentiment_counts.get(analysis.sentiment, 0) + 1
+            if analysis.sentiment == 'negative':
+                negative_comments.append({
+                    **comment,
+                    'confidence': analysis.confidence,
+                    'detected_emotions': analysis.detected_emotions,
+                    'toxicity_score': analysis.toxicity_score
+                })
         
-        for comment in comments:
-            # Simple sentiment analysis (in production, use proper NLP)
-            text = comment['text'].lower()
-            negative_words = ['hate', 'stupid', 'dumb', 'terrible', 'awful', 'horrible']
-            positive_words = ['love', 'great', 'amazing', 'wonderful', 'excellent']
-            
-            if any(word in text for word in negative_words):
-                sentiment_counts['negative'] += 1
-                if len(negative_comments) < 5:  # Top 5 negative comments
-                    negative_comments.append(comment)
-            elif any(word in text for word in positive_words):
-                sentiment_counts['positive'] += 1
-            else:
-                sentiment_counts['neutral'] += 1
+        # Top 5 negative comments, most toxic first
+        negative_comments.sort(key=lambda c: (c['toxicity_score'], c['confidence']), reverse=True)
+        negative_comments = negative_comments[:5]
         
-        # Generate recommended responses for negative comments
-        recommended_responses = []
-        for comment in negative_comments[:3]:  # Top 3 for responses
-            recommended_responses.append({
+        # Generate recommended responses for the top 3 concurrently
+        targets = negative_comments[:3]
+        wisdom_results = await generation_policy.generate_batch(
+            [comment['text'] for comment in targets], style, ai_provider,
+            [{**comment, 'sentiment': 'negative'} for comment in targets], plan
+        )
+        recommended_responses = [
+            {
                 'original_text': comment['text'],
-                'wisdom_response': self._generate_wisdom_for_comment(comment['text']),
+                'wisdom_response': wisdom,
+                'model_used': model_used,
                 'platform': comment['platform']
-            })
+            }
+            for comment, (wisdom, _, model_used) in zip(targets, wisdom_results)
+        ]
         
         return {
             'platform': platform,
@@ -116,43 +128,105 @@ class IntegrationManager:
             'recommended_responses': recommended_responses
         }
     
-    def _generate_wisdom_for_comment(self, text: str) -> str:
-        """Generate wisdom response for a comment"""
-        wisdom_options = [
-            "The mirror often blames the face it reflects.",
-            "Politeness is free; rudeness always collects interest.",
-            "A gentle word turns away wrath, but harsh words stir up anger.",
-            "The wise speak because they have something to say; fools speak because they have to say something.",
-            "When you point a finger at others, three fingers point back at you."
-        ]
-        
-        import random
-        return random.choice(wisdom_options)
-    
     def create_discord_webhook(self, webhook_url: str, user_id: int) -> Dict:
         """Create Discord webhook integration"""
-        # In production, store webhook URLs in database
+        if not is_discord_webhook_url(webhook_url):
+            raise ValueError("Webhook URL must be an https://discord.com/api/webhooks/... URL")
+        
+        webhook = DiscordWebhook(user_id=user_id, url=webhook_url)
+        self.db.add(webhook)
+        self.db.commit()
+        self.db.refresh(webhook)
+        
         return {
-            'webhook_url': webhook_url,
-            'user_id': user_id,
-            'created_at': datetime.now().isoformat(),
+            'id': webhook.id,
+            'webhook_url': webhook.url,
+            'user_id': webhook.user_id,
+            'created_at': webhook.created_at.isoformat(),
             'status': 'active'
         }
     
-    def send_discord_notification(self, webhook_url: str, message: str, wisdom: str) -> bool:
-        """Send notification to Discord webhook"""
-        try:
-            payload = {
-                'content': f"**New Wisdom Generated**\n\n**Original:** {message}\n**Wisdom:** {wisdom}",
-                'username': 'WitMirror',
-                'avatar_url': 'https://example.com/witmirror-avatar.png'
-            }
-            
-            response = requests.post(webhook_url, json=payload)
-            return response.status_code == 204
-        except Exception as e:
-            print(f"Discord webhook error: {e}")
+    def send_discord_notification(self, webhook_id: int, message: str, wisdom: str) -> bool:
+        """Queue a notification for a Discord webhook; delivery happens in the background"""
+        enqueue_notification(self.db, webhook_id, message, wisdom)
+        self.db.commit()
+        delivery_worker.wake()
+        return True
+    
+    def notify_user_webhooks(self, user_id: int, message: str, wisdom: str) -> int:
+        """Queue a notification for each of the user's active Discord webhooks"""
+        webhook_ids = [
+            row.id for row in self.db.query(DiscordWebhook.id).filter(
+                DiscordWebhook.user_id == user_id,
+                DiscordWebhook.is_active == True
+            )
+        ]
+        for webhook_id in webhook_ids:
+            enqueue_notification(self.db, webhook_id, message, wisdom)
+        if webhook_ids:
+            self.db.commit()
+            delivery_worker.wake()
+        return len(webhook_ids)
+    
+    def add_monitored_source(self, user_id: int, platform: str, target: str, kind: str = "subreddit",
+                             style: str = "classic", ai_provider: str = "openai") -> Dict:
+        """Register a subreddit or account for background ingestion"""
+        if platform != 'reddit':
+            raise ValueError("Only reddit sources can be monitored")
+        if kind not in SOURCE_KINDS:
+            raise ValueError(f"kind must be one of: {', '.join(SOURCE_KINDS)}")
+        
+        source = MonitoredSource(
+            user_id=user_id,
+            platform=platform,
+            kind=kind,
+            target=target,
+            style=style,
+            ai_provider=ai_provider,
+            poll_interval=MIN_POLL_INTERVAL,
+            next_poll_at=datetime.utcnow()
+        )
+        self.db.add(source)
+        self.db.commit()
+        self.db.refresh(source)
+        return self._source_info(source)
+    
+    def list_monitored_sources(self, user_id: int) -> List[Dict]:
+        """List a user's monitored sources and their polling state"""
+        sources = self.db.query(MonitoredSource).filter(
+            MonitoredSource.user_id == user_id,
+            MonitoredSource.is_active == True
+        ).order_by(MonitoredSource.id).all()
+        return [self._source_info(source) for source in sources]
+    
+    def remove_monitored_source(self, user_id: int, source_id: int) -> bool:
+        """Stop monitoring a source"""
+        source = self.db.query(MonitoredSource).filter(
+            MonitoredSource.id == source_id,
+            MonitoredSource.user_id == user_id
+        ).first()
+        
+        if not source:
             return False
+        
+        source.is_active = False
+        self.db.commit()
+        return True
+    
+    def _source_info(self, source: MonitoredSource) -> Dict:
+        return {
+            'id': source.id,
+            'platform': source.platform,
+            'kind': source.kind,
+            'target': source.target,
+            'style': source.style,
+            'ai_provider': source.ai_provider or "openai",
+            'poll_interval': source.poll_interval,
+            'next_poll_at': source.next_poll_at.isoformat() if source.next_poll_at else None,
+            'last_polled_at': source.last_polled_at.isoformat() if source.last_polled_at else None,
+            'last_error': source.last_error,
+            'total_ingested': source.total_ingested or 0
+        }
     
     def get_integration_stats(self, user_id: int) -> Dict:
         """Get integration usage statistics for a user"""
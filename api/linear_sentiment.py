@@ -0,0 +1,237 @@
+from sentiment import EmotionAnalysis, SentimentBackend, lexicon_counts, lexicon_emotions
+from typing import Dict, Iterable, List, Optional, Tuple
+from datetime import datetime
+import json
+import os
+import re
+import zlib
+import numpy as np
+
+# Model files: weights.npy (features x outputs, float32) and meta.json
+SENTIMENT_MODEL_PATH = os.getenv("SENTIMENT_MODEL_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "sentiment_model"))
+
+CLASSES = ("negative", "neutral", "positive")
+TOXICITY_COLUMN = len(CLASSES)  # extra output predicting toxicity_score through a logistic link
+DEFAULT_FEATURES = 2 ** 18
+# Format of models written by train(); version 1 used raw counts and a clipped linear toxicity output
+MODEL_FORMAT = 2
+
+TOKEN_RE = re.compile(r"[a-z0-9']+")
+
+# Token hashes are memoized; vocabularies are small compared to traffic
+MAX_HASH_CACHE = 200000
+_token_hashes: Dict[str, int] = {}
+
+def _token_hash(token: str) -> int:
+    value = _token_hashes.get(token)
+    if value is None:
+        if len(_token_hashes) >= MAX_HASH_CACHE:
+            _token_hashes.clear()
+        value = _token_hashes[token] = zlib.crc32(token.encode("utf-8"))
+    return value
+
+def _featurize(texts: List[str], mask: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Hashed unigram and bigram indices for a batch, with the row each one belongs to"""
+    lookup = _token_hashes.get
+    hashes: List[int] = []
+    rows: List[int] = []
+    for row, text in enumerate(texts):
+        tokens = TOKEN_RE.findall(text.lower())
+        hashes.extend([lookup(token) or _token_hash(token) for token in tokens])
+        rows.extend([row] * len(tokens))
+
+    hashes = np.asarray(hashes, dtype=np.uint64)
+    rows = np.asarray(rows, dtype=np.int64)
+    # Bigrams combine adjacent token hashes within the same text
+    same_text = rows[1:] == rows[:-1]
+    bigrams = ((hashes[:-1] * np.uint64(0x01000193)) ^ hashes[1:])[same_text]
+    indices = np.concatenate([hashes, bigrams]) & np.uint64(mask)
+    return indices.astype(np.int64), np.concatenate([rows, rows[1:][same_text]])
+
+def _row_scale(rows: np.ndarray, n_rows: int) -> np.ndarray:
+    """Per-feature value 1/sqrt(features in its text), so every text has unit norm"""
+    counts = np.bincount(rows, minlength=n_rows)
+    return 1.0 / np.sqrt(np.maximum(counts[rows], 1))
+
+def _sigmoid(x: np.ndarray) -> np.ndarray:
+    return 1.0 / (1.0 + np.exp(-np.clip(x, -30.0, 30.0)))
+
+class LinearSentimentModel:
+    """Hashed-feature linear model: three sentiment logits plus a toxicity output"""
+
+    def __init__(self, weights: np.ndarray, bias: np.ndarray, meta: Dict):
+        self.weights = weights
+        self.bias = bias
+        self.meta = meta
+        self.mask = weights.shape[0] - 1
+        self.format = meta.get("format", 1)
+
+    @classmethod
+    def load(cls, path: str = SENTIMENT_MODEL_PATH) -> "LinearSentimentModel":
+        """Memory-map the weights so workers share pages and load instantly"""
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        weights = np.load(os.path.join(path, "weights.npy"), mmap_mode="r")
+        model = cls(weights, np.asarray(meta["bias"], dtype=np.float32), meta)
+        # A diverged model would answer NaN toxicity, which cannot be serialized to JSON
+        if not model.is_finite():
+            raise ValueError(f"Sentiment model at {path} has non-finite weights; retrain it")
+        return model
+
+    def is_finite(self) -> bool:
+        return bool(np.isfinite(self.bias).all() and np.isfinite(self.weights).all())
+
+    def save(self, path: str):
+        if not self.is_finite():
+            raise ValueError("Refusing to save a model with non-finite weights")
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, "weights.npy"), np.ascontiguousarray(self.weights, dtype=np.float32))
+        with open(os.path.join(path, "meta.json"), "w") as f:
+            json.dump({**self.meta, "bias": [float(b) for b in self.bias]}, f)
+
+    def scores(self, texts: List[str]) -> np.ndarray:
+        """Raw outputs for a batch, one row per text"""
+        indices, rows = _featurize(texts, self.mask)
+        out = np.tile(self.bias.astype(np.float64), (len(texts), 1))
+        if len(indices):
+            gathered = self.weights[indices]
+            if self.format >= 2:
+                gathered = gathered * _row_scale(rows, len(texts))[:, None]
+            for column in range(out.shape[1]):
+                out[:, column] += np.bincount(rows, weights=gathered[:, column], minlength=len(texts))
+        return out
+
+    def predict(self, texts: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """Class probabilities and toxicity estimates for a batch"""
+        out = self.scores(texts)
+        logits = out[:, :TOXICITY_COLUMN]
+        logits = logits - logits.max(axis=1, keepdims=True)
+        probs = np.exp(logits)
+        probs /= probs.sum(axis=1, keepdims=True)
+        if self.format >= 2:
+            return probs, _sigmoid(out[:, TOXICITY_COLUMN])
+        return probs, np.clip(out[:, TOXICITY_COLUMN], 0.0, 1.0)
+
+class LinearSentimentBackend(SentimentBackend):
+    """Batched NumPy inference over a model trained offline from stored analyses"""
+
+    name = "linear"
+
+    def __init__(self, path: str = SENTIMENT_MODEL_PATH):
+        self.model = LinearSentimentModel.load(path)
+
+    def analyze_batch(self, texts: List[str]) -> List[EmotionAnalysis]:
+        if not texts:
+            return []
+        probs, toxicity = self.model.predict(texts)
+        labels = probs.argmax(axis=1)
+
+        results = []
+        for i, text in enumerate(texts):
+            negative_count, toxic_count = lexicon_counts(text.lower())
+            sentiment = CLASSES[labels[i]]
+            emotions = lexicon_emotions(negative_count, toxic_count)
+            if probs[i, 0] > 0.85:
+                emotions.append('strongly_negative')
+            results.append(EmotionAnalysis(
+                sentiment=sentiment,
+                confidence=min(0.95, float(probs[i, labels[i]])),
+                detected_emotions=emotions,
+                toxicity_score=float(toxicity[i]) if sentiment == "negative" else 0.0
+            ))
+        return results
+
+def train(samples: Iterable[Tuple[str, str, float]], n_features: int = DEFAULT_FEATURES, epochs: int = 5,
+          learning_rate: float = 5.0, l2: float = 1e-6, batch_size: int = 512) -> LinearSentimentModel:
+    """Fit softmax sentiment and logistic toxicity outputs with mini-batch SGD
+
+    Features are scaled to unit norm per text, so the step size does not grow with text length.
+    """
+    texts, labels, toxicity = [], [], []
+    for text, sentiment, score in samples:
+        if sentiment in CLASSES and text:
+            texts.append(text)
+            labels.append(CLASSES.index(sentiment))
+            toxicity.append(min(max(score or 0.0, 0.0), 1.0))
+    if not texts:
+        raise ValueError("No labeled analyses to train on")
+
+    if n_features & (n_features - 1):
+        raise ValueError("n_features must be a power of two")
+    mask = n_features - 1
+    labels = np.asarray(labels)
+    toxicity = np.asarray(toxicity, dtype=np.float32)
+    weights = np.zeros((n_features, TOXICITY_COLUMN + 1), dtype=np.float32)
+    bias = np.zeros(TOXICITY_COLUMN + 1, dtype=np.float32)
+    model = LinearSentimentModel(weights, bias, {"format": MODEL_FORMAT})
+    rng = np.random.default_rng(0)
+
+    for epoch in range(epochs):
+        order = rng.permutation(len(texts))
+        for start in range(0, len(order), batch_size):
+            batch = order[start:start + batch_size]
+            batch_texts = [texts[i] for i in batch]
+            indices, rows = _featurize(batch_texts, mask)
+            scale = _row_scale(rows, len(batch))[:, None]
+
+            out = model.scores(batch_texts)
+            logits = out[:, :TOXICITY_COLUMN] - out[:, :TOXICITY_COLUMN].max(axis=1, keepdims=True)
+            probs = np.exp(logits)
+            probs /= probs.sum(axis=1, keepdims=True)
+
+            grad = np.empty_like(out)
+            grad[:, :TOXICITY_COLUMN] = probs
+            grad[np.arange(len(batch)), labels[batch]] -= 1.0
+            # Cross-entropy against the score keeps this gradient in [-1, 1] like the class outputs
+            grad[:, TOXICITY_COLUMN] = _sigmoid(out[:, TOXICITY_COLUMN]) - toxicity[batch]
+            grad /= len(batch)
+
+            step = learning_rate / (1 + epoch)
+            if len(indices):
+                np.add.at(weights, indices, -step * (grad[rows] * scale + l2 * weights[indices]))
+            bias -= step * grad.sum(axis=0)
+
+        if not model.is_finite():
+            raise ValueError(f"Training diverged in epoch {epoch + 1}; lower learning_rate")
+
+    model.meta = {
+        "format": MODEL_FORMAT,
+        "n_features": n_features,
+        "classes": list(CLASSES),
+        "samples": len(texts),
+        "epochs": epochs,
+        "trained_at": datetime.utcnow().isoformat()
+    }
+    return model
+
+def train_from_database(path: str = SENTIMENT_MODEL_PATH, limit: Optional[int] = None, **kwargs) -> LinearSentimentModel:
+    """Train on stored Analysis rows and write the model files"""
+    from database import SessionLocal
+    from models import Analysis
+
+    db = SessionLocal()
+    try:
+        query = db.query(Analysis.original_text, Analysis.sentiment, Analysis.toxicity_score).order_by(Analysis.id.desc())
+        if limit:
+            query = query.limit(limit)
+        model = train(query.yield_per(5000), **kwargs)
+    finally:
+        db.close()
+
+    model.save(path)
+    return model
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Train the linear sentiment model from stored analyses")
+    parser.add_argument("--out", default=SENTIMENT_MODEL_PATH)
+    parser.add_argument("--limit", type=int, default=None)
+    parser.add_argument("--features", type=int, default=DEFAULT_FEATURES)
+    parser.add_argument("--epochs", type=int, default=5)
+    parser.add_argument("--learning-rate", type=float, default=5.0)
+    args = parser.parse_args()
+
+    trained = train_from_database(args.out, args.limit, n_features=args.features, epochs=args.epochs,
+                                  learning_rate=args.learning_rate)
+    print(f"Trained on {trained.meta['samples']} analyses -> {args.out}")
@@ -1,27 +1,53 @@
-from fastapi import FastAPI, HTTPException, Depends, Request, BackgroundTasks
+from fastapi import FastAPI, HTTPException, Depends, Request, Response, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from fastapi.security import HTTPBearer
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, EmailStr
 from typing import List, Optional, Dict, Any
+import asyncio
 import os
 import time
 import json
 from datetime import datetime, timedelta
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 
 # Import our modules
-from database import get_db, init_database
-from models import User, Analysis, WisdomTemplate, ApiKey, RateLimit, Analytics
+from database import get_db, engine, SessionLocal
+from models import User, Analysis, WisdomTemplate, ApiKey, RateLimit, Analytics, WebhookDelivery, BulkJob
 from auth import (
     get_current_user, get_current_user_optional, verify_api_key, 
     check_rate_limit, create_access_token, get_password_hash, verify_password
 )
 from ai_services import ai_service
+from template_engine import analysis_context
+from generation_policy import generation_policy, user_plan
+from sentiment import EmotionAnalysis, analyze_sentiment_advanced
+from sentiment_pool import sentiment_pool
 from analytics import AnalyticsService
 from wisdom_styles import WisdomStyleManager
 from integrations import IntegrationManager
+from reddit_client import reddit_fetcher
+from webhook_outbox import delivery_worker
+from ingestion_scheduler import ingestion_scheduler
 from comment_history import CommentHistoryManager
+from columnar_export import ColumnarExporter, COLUMNAR_FORMATS
+from pagination import keyset_page, count_rows, CursorError, COUNT_MODES
+from topic_index import TopicIndex
+from response_cache import analytics_cache, cached_json_response
+from timeseries import BUCKETS
+from warmup import run_warmup, warmup_report
+from health_checks import health_monitor
+from emotion_window import emotion_window
+from bulk_jobs import (
+    bulk_job_worker, create_job, active_job_count, job_summary, job_results, iter_results_ndjson, cancel_job,
+    MAX_JOB_TEXTS, MAX_ACTIVE_JOBS
+)
+from template_catalog import template_catalog
+from metrics import registry, stage_seconds, http_seconds, CONTENT_TYPE
+from profiling import span, begin_request, request_profiler, SERVER_TIMING
 
 app = FastAPI(
     title="WitMirror Pro API",
@@ -44,10 +70,48 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "Server-Timing"],
 )
 
-# Initialize database
-init_database()
+@app.middleware("http")
+async def record_request_timing(request: Request, call_next):
+    timings = begin_request()
+    profiling = request_profiler.maybe_start()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+    finally:
+        # Label by route template so path parameters don't explode the series count
+        route = request.scope.get("route")
+        route_path = route.path if route else "unmatched"
+        http_seconds.observe(time.perf_counter() - timings.started, request.method, route_path, str(status))
+        profile = request_profiler.stop(f"{request.method} {route_path}") if profiling else None
+    
+    if SERVER_TIMING:
+        response.headers["Server-Timing"] = timings.server_timing({"profile": profile} if profile else None)
+    return response
+
+@app.on_event("startup")
+async def start_background_workers():
+    # Create tables and load models before serving, rather than at import time
+    await asyncio.to_thread(run_warmup)
+    await sentiment_pool.start()
+    await health_monitor.start()
+    await emotion_window.start()
+    await delivery_worker.start()
+    await ingestion_scheduler.start()
+    await bulk_job_worker.start()
+
+@app.on_event("shutdown")
+async def close_http_clients():
+    await bulk_job_worker.stop()
+    await ingestion_scheduler.stop()
+    await delivery_worker.stop()
+    await reddit_fetcher.close()
+    await emotion_window.stop()
+    await health_monitor.stop()
+    await sentiment_pool.stop()
 
 # Pydantic models
 class AnalysisRequest(BaseModel):
@@ -70,12 +134,6 @@ class Token(BaseModel):
     access_token: str
     token_type: str
 
-class EmotionAnalysis(BaseModel):
-    sentiment: str
-    confidence: float
-    detected_emotions: List[str]
-    toxicity_score: float
-
 class WisdomResponse(BaseModel):
     analysis: EmotionAnalysis
     wisdom: str
@@ -111,6 +169,12 @@ class BulkAnalysisRequest(BaseModel):
     style: Optional[str] = "classic"
     ai_provider: Optional[str] = "openai"
 
+class BulkJobRequest(BaseModel):
+    texts: List[str]
+    platform: Optional[str] = "general"
+    style: Optional[str] = "classic"
+    ai_provider: Optional[str] = "openai"
+
 class ExportRequest(BaseModel):
     start_date: Optional[datetime] = None
     end_date: Optional[datetime] = None
@@ -143,69 +207,6 @@ def check_rate_limit_middleware(request: Request, db: Session = Depends(get_db))
     
     return True
 
-# Advanced sentiment analysis
-def analyze_sentiment_advanced(text: str) -> EmotionAnalysis:
-    """Advanced sentiment analysis with multiple techniques"""
-    import re
-    import nltk
-    from textblob import TextBlob
-    
-    text_lower = text.lower()
-    
-    # Rule-based analysis
-    negative_words = [
-        'stupid', 'dumb', 'idiot', 'moron', 'garbage', 'trash', 'worthless',
-        'hate', 'terrible', 'awful', 'horrible', 'disgusting', 'pathetic',
-        'sucks', 'suck', 'screams', 'slop', 'dumbest', 'worst', 'hate',
-        'useless', 'pointless', 'ridiculous', 'absurd', 'nonsense'
-    ]
-    
-    toxic_words = [
-        'kill', 'die', 'death', 'murder', 'violence', 'attack', 'destroy',
-        'fuck', 'shit', 'damn', 'hell', 'bitch', 'asshole'
-    ]
-    
-    # Count occurrences
-    negative_count = sum(1 for word in negative_words if word in text_lower)
-    toxic_count = sum(1 for word in toxic_words if word in text_lower)
-    
-    # TextBlob sentiment analysis
-    blob = TextBlob(text)
-    polarity = blob.sentiment.polarity
-    subjectivity = blob.sentiment.subjectivity
-    
-    # Determine sentiment
-    if negative_count > 0 or toxic_count > 0 or polarity < -0.3:
-        sentiment = "negative"
-        confidence = min(0.95, 0.5 + (negative_count * 0.1) + (toxic_count * 0.15) + abs(polarity))
-        toxicity_score = min(1.0, toxic_count * 0.3 + abs(polarity) * 0.5)
-    elif polarity > 0.3:
-        sentiment = "positive"
-        confidence = min(0.95, 0.5 + polarity)
-        toxicity_score = 0.0
-    else:
-        sentiment = "neutral"
-        confidence = 0.5
-        toxicity_score = 0.0
-    
-    # Detect emotions
-    detected_emotions = []
-    if negative_count > 0:
-        detected_emotions.extend(['anger', 'contempt', 'disgust'])
-    if toxic_count > 0:
-        detected_emotions.extend(['hostility', 'aggression'])
-    if subjectivity > 0.7:
-        detected_emotions.append('subjective')
-    if polarity < -0.5:
-        detected_emotions.append('strongly_negative')
-    
-    return EmotionAnalysis(
-        sentiment=sentiment,
-        confidence=confidence,
-        detected_emotions=detected_emotions,
-        toxicity_score=toxicity_score
-    )
-
 # ===== CORE ENDPOINTS =====
 
 @app.get("/")
@@ -228,10 +229,12 @@ async def root():
             "auth": "/auth/*",
             "analyze": "/analyze",
             "bulk": "/bulk/analyze",
+            "jobs": "/jobs/*",
             "analytics": "/analytics/*",
             "admin": "/admin/*",
             "export": "/export/*",
             "health": "/health",
+            "metrics": "/metrics",
             "docs": "/docs"
         },
         "ai_providers": ai_service.get_available_providers()
@@ -239,16 +242,108 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    """Comprehensive health check"""
+    """Comprehensive health check from the cached dependency checks"""
+    ready, reasons = health_monitor.readiness()
+    checks = health_monitor.report()
     return {
-        "status": "healthy",
+        "status": "healthy" if ready else "degraded",
         "timestamp": datetime.now().isoformat(),
         "version": "2.0.0",
-        "database": "connected",
+        "database": checks.get("database", {}).get("status", "unknown"),
         "ai_providers": ai_service.get_available_providers(),
-        "uptime": "operational"
+        "uptime": "operational",
+        "warmup": warmup_report,
+        "checks": checks,
+        "reasons": reasons
     }
 
+@app.get("/health/live")
+async def liveness_probe():
+    """Liveness: the process is up and its event loop is serving requests"""
+    return {"status": "alive"}
+
+@app.get("/health/ready")
+async def readiness_probe(response: Response):
+    """Readiness: dependencies are reachable and there is capacity; 503 otherwise"""
+    ready, reasons = health_monitor.readiness()
+    if not ready:
+        response.status_code = 503
+    return {"status": "ready" if ready else "unready", "reasons": reasons, "checks": health_monitor.report()}
+
+@registry.collector
+def runtime_metrics():
+    """Cache hit ratios, provider load, queue depths and connection pool usage, read at scrape time"""
+    policy = generation_policy.stats()
+    policy_hits = policy["tiers"]["cache"]["served"]
+    policy_misses = sum(counts["chosen"] for tier, counts in policy["tiers"].items() if tier != "cache")
+    yield ("witmirror_cache_requests_total", "counter", "Cache lookups by cache and result", [
+        ({"cache": "analytics", "result": "hit"}, analytics_cache.hits),
+        ({"cache": "analytics", "result": "miss"}, analytics_cache.misses),
+        ({"cache": "wisdom", "result": "hit"}, policy_hits),
+        ({"cache": "wisdom", "result": "miss"}, policy_misses),
+        ({"cache": "template_catalog", "result": "hit"}, template_catalog.hits),
+        ({"cache": "template_catalog", "result": "miss"}, template_catalog.reloads)
+    ])
+    yield ("witmirror_generation_tier_total", "counter", "Wisdom generations served by each tier", [
+        ({"tier": tier}, counts["served"]) for tier, counts in policy["tiers"].items()
+    ])
+    yield ("witmirror_generation_degraded_total", "counter", "Generations served below the chosen tier",
+           [({}, policy["degraded"])])
+    yield ("witmirror_provider_inflight", "gauge", "Model provider calls in progress", [
+        ({"tier": tier}, count) for tier, count in policy["inflight"].items()
+    ])
+    yield ("witmirror_provider_inflight_limit", "gauge", "Maximum concurrent model provider calls", [
+        ({"tier": tier}, count) for tier, count in policy["max_inflight"].items()
+    ])
+    yield ("witmirror_queue_depth", "gauge", "Work waiting or in progress in background executors", [
+        ({"queue": "sentiment_pool"}, sentiment_pool.pending_chunks),
+        ({"queue": "ingestion_waiting"}, ingestion_scheduler.queued),
+        ({"queue": "ingestion_polling"}, ingestion_scheduler.polling),
+        ({"queue": "bulk_job_chunks"}, bulk_job_worker.running_chunks)
+    ])
+
+    # Each database-backed gauge is read separately so one failing query only drops its own gauge
+    counts = remaining = None
+    db = SessionLocal()
+    try:
+        try:
+            counts = dict(db.query(WebhookDelivery.status, func.count(WebhookDelivery.id)).filter(
+                WebhookDelivery.status.in_(["pending", "sending"])
+            ).group_by(WebhookDelivery.status).all())
+        except Exception as e:
+            print(f"Metrics outbox depth error: {e}")
+            db.rollback()
+        try:
+            remaining = db.query(func.sum(BulkJob.total - BulkJob.processed - BulkJob.failed)).filter(
+                BulkJob.status.in_(["queued", "running"])
+            ).scalar() or 0
+        except Exception as e:
+            print(f"Metrics bulk job backlog error: {e}")
+            db.rollback()
+    finally:
+        db.close()
+    if counts is not None:
+        yield ("witmirror_webhook_outbox_depth", "gauge", "Discord deliveries not yet delivered or failed", [
+            ({"status": status}, counts.get(status, 0)) for status in ("pending", "sending")
+        ])
+    if remaining is not None:
+        yield ("witmirror_bulk_job_items_remaining", "gauge", "Texts in queued or running bulk jobs not yet processed",
+               [({}, remaining)])
+
+    pool = engine.pool
+    if hasattr(pool, "checkedout"):
+        yield ("witmirror_db_pool_connections", "gauge", "Database connection pool usage", [
+            ({"state": "size"}, pool.size()),
+            ({"state": "checked_out"}, pool.checkedout()),
+            ({"state": "overflow"}, max(0, pool.overflow()))
+        ])
+
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus metrics"""
+    body = await asyncio.to_thread(registry.render)
+    return Response(content=body, headers={"Content-Type": CONTENT_TYPE})
+
 # ===== AUTHENTICATION ENDPOINTS =====
 
 @app.post("/auth/register", response_model=Token)
@@ -307,18 +402,27 @@ async def analyze_comment(
     try:
         # Check rate limiting
         client_ip = get_client_ip(request_obj)
-        if not check_rate_limit(client_ip, 100, db):
+        with span("rate_limit", stage_seconds):
+            allowed = check_rate_limit(client_ip, 100, db)
+        if not allowed:
             raise HTTPException(status_code=429, detail="Rate limit exceeded")
         
-        # Advanced sentiment analysis
-        analysis = analyze_sentiment_advanced(request.text)
+        # Advanced sentiment analysis, off the event loop for large texts
+        with span("sentiment", stage_seconds):
+            analysis = await sentiment_pool.analyze(request.text)
         
-        # Generate wisdom with AI
-        wisdom, confidence, model_used = ai_service.generate_wisdom(
-            request.text, 
-            request.style, 
-            request.ai_provider
-        )
+        # Generate wisdom through the cheapest tier that fits this comment and plan,
+        # on a worker thread so provider calls never block the event loop. The request
+        # session stays on this thread; the template tier opens its own when needed.
+        with span("generation", stage_seconds):
+            wisdom, confidence, model_used = await asyncio.to_thread(
+                generation_policy.generate,
+                request.text, 
+                request.style, 
+                request.ai_provider,
+                analysis_context(analysis, request.platform),
+                user_plan(current_user)
+            )
         
         processing_time = time.time() - start_time
         
@@ -338,8 +442,11 @@ async def analyze_comment(
             ip_address=client_ip,
             user_agent=request_obj.headers.get("User-Agent")
         )
-        db.add(db_analysis)
-        db.commit()
+        with span("db_commit", stage_seconds):
+            db.add(db_analysis)
+            if current_user:
+                TopicIndex(db).record(current_user.id, request.text)
+            db.commit()
         
         # Track analytics
         analytics_service = AnalyticsService(db)
@@ -348,12 +455,22 @@ async def analyze_comment(
             {
                 "sentiment": analysis.sentiment,
                 "detected_emotions": analysis.detected_emotions,
-                "platform": request.platform
+                "platform": request.platform,
+                "visitor": f"user:{current_user.id}" if current_user else f"ip:{client_ip}"
             },
             processing_time,
             True
         )
         
+        # Queue Discord notifications without delaying the response
+        if current_user:
+            background_tasks.add_task(
+                IntegrationManager(db).notify_user_webhooks,
+                current_user.id,
+                request.text,
+                wisdom
+            )
+        
         return WisdomResponse(
             analysis=analysis,
             wisdom=wisdom,
@@ -380,20 +497,39 @@ async def bulk_analyze(
     request: BulkAnalysisRequest,
     background_tasks: BackgroundTasks,
     request_obj: Request,
+    stream: bool = False,
     db: Session = Depends(get_db),
     current_user: Optional[User] = Depends(get_current_user_optional)
 ):
-    """Bulk analyze multiple texts"""
+    """Bulk analyze multiple texts
+    
+    With ``?stream=true`` or ``Accept: application/x-ndjson`` each result is sent as
+    one JSON line, tagged with its input index, as soon as it is ready.
+    """
     if len(request.texts) > 50:
         raise HTTPException(status_code=400, detail="Maximum 50 texts per bulk request")
     
+    # Score every text in one pass; fall back to per-text scoring if that fails
+    try:
+        with span("sentiment"):
+            analyses = await sentiment_pool.analyze_batch(request.texts)
+    except Exception as e:
+        print(f"Bulk sentiment error: {e}")
+        analyses = [None] * len(request.texts)
+    
+    plan = user_plan(current_user)
+    if stream or request_obj.headers.get("Accept", "").startswith("application/x-ndjson"):
+        return StreamingResponse(stream_bulk_results(request, analyses, plan), media_type="application/x-ndjson")
+    
     results = []
-    for text in request.texts:
+    for text, analysis in zip(request.texts, analyses):
         try:
-            analysis = analyze_sentiment_advanced(text)
-            wisdom, confidence, model_used = ai_service.generate_wisdom(
-                text, request.style, request.ai_provider
-            )
+            analysis = analysis or analyze_sentiment_advanced(text)
+            with span("generation"):
+                wisdom, confidence, model_used = await asyncio.to_thread(
+                    generation_policy.generate,
+                    text, request.style, request.ai_provider, analysis_context(analysis, request.platform), plan
+                )
             
             results.append({
                 "text": text,
@@ -412,19 +548,160 @@ async def bulk_analyze(
     
     return {"results": results, "total": len(request.texts), "successful": len([r for r in results if "error" not in r])}
 
+async def stream_bulk_results(request: BulkAnalysisRequest, analyses: List[Optional[EmotionAnalysis]], plan: str):
+    """NDJSON lines in completion order, then a summary line; results are written, not collected"""
+    def line(item: Dict) -> bytes:
+        return (json.dumps(jsonable_encoder(item)) + "\n").encode()
+    
+    successful = 0
+    scored, texts, contexts = [], [], []
+    for index, (text, analysis) in enumerate(zip(request.texts, analyses)):
+        try:
+            analysis = analysis or analyze_sentiment_advanced(text)
+        except Exception as e:
+            yield line({"index": index, "text": text, "error": str(e)})
+            continue
+        scored.append((index, analysis))
+        texts.append(text)
+        contexts.append(analysis_context(analysis, request.platform))
+    
+    # Generation runs without the request's session, which is not safe to share across threads
+    async for position, result, error in generation_policy.generate_as_completed(
+        texts, request.style, request.ai_provider, contexts, plan
+    ):
+        index, analysis = scored[position]
+        if error is not None:
+            yield line({"index": index, "text": texts[position], "error": str(error)})
+            continue
+        successful += 1
+        yield line({
+            "index": index,
+            "text": texts[position],
+            "analysis": analysis,
+            "wisdom": result[0],
+            "style": request.style,
+            "platform": request.platform,
+            "ai_provider": request.ai_provider,
+            "model_used": result[2]
+        })
+    
+    yield line({"done": True, "total": len(request.texts), "successful": successful})
+
+# ===== BULK JOB ENDPOINTS =====
+
+def get_owned_job(job_id: str, db: Session, current_user: User) -> BulkJob:
+    job = db.query(BulkJob).filter(BulkJob.id == job_id).first()
+    if job is None or (job.user_id != current_user.id and not current_user.is_admin):
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.post("/jobs/bulk-analyze", status_code=202)
+async def submit_bulk_job(
+    request: BulkJobRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Queue a large batch for background analysis; poll the returned job for progress"""
+    if not request.texts:
+        raise HTTPException(status_code=400, detail="No texts to analyze")
+    if len(request.texts) > MAX_JOB_TEXTS:
+        raise HTTPException(status_code=400, detail=f"Maximum {MAX_JOB_TEXTS} texts per job")
+    if active_job_count(db, current_user.id) >= MAX_ACTIVE_JOBS:
+        raise HTTPException(status_code=429, detail=f"At most {MAX_ACTIVE_JOBS} unfinished jobs per user")
+    
+    job = await asyncio.to_thread(
+        create_job, db, current_user.id, user_plan(current_user), request.texts,
+        request.style, request.platform, request.ai_provider
+    )
+    bulk_job_worker.wake()
+    return job_summary(job)
+
+@app.get("/jobs")
+async def list_bulk_jobs(
+    limit: int = 20,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """List the current user's bulk jobs, newest first"""
+    jobs = db.query(BulkJob).filter(BulkJob.user_id == current_user.id).order_by(
+        BulkJob.created_at.desc()
+    ).limit(min(limit, 100)).all()
+    return {"jobs": [job_summary(job) for job in jobs]}
+
+@app.get("/jobs/{job_id}")
+async def get_bulk_job(job_id: str, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    """Get a bulk job's status and progress"""
+    return job_summary(get_owned_job(job_id, db, current_user))
+
+@app.get("/jobs/{job_id}/results")
+async def get_bulk_job_results(
+    job_id: str,
+    after: int = -1,
+    limit: int = 100,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Page through finished results in input order; pass next_after to continue"""
+    job = get_owned_job(job_id, db, current_user)
+    results, next_after = job_results(db, job.id, after, max(1, min(limit, 1000)))
+    return {"job": job_summary(job), "results": results, "next_after": next_after}
+
+@app.get("/jobs/{job_id}/results.ndjson")
+async def download_bulk_job_results(
+    job_id: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Stream every finished result as newline-delimited JSON"""
+    job = get_owned_job(job_id, db, current_user)
+    return StreamingResponse(
+        iter_results_ndjson(job.id),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f"attachment; filename=witmirror-job-{job.id}.ndjson"}
+    )
+
+@app.delete("/jobs/{job_id}")
+async def cancel_bulk_job(job_id: str, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    """Cancel a queued or running job; finished results stay available"""
+    job = get_owned_job(job_id, db, current_user)
+    cancel_job(db, job)
+    return job_summary(job)
+
 # ===== ANALYTICS ENDPOINTS =====
 
 @app.get("/analytics/summary", response_model=AnalyticsResponse)
-async def get_analytics_summary(db: Session = Depends(get_db)):
+async def get_analytics_summary(request: Request, db: Session = Depends(get_db)):
     """Get comprehensive analytics summary"""
     analytics_service = AnalyticsService(db)
-    return analytics_service.get_usage_summary()
+    return cached_json_response(
+        analytics_cache, request,
+        lambda: AnalyticsResponse(**analytics_service.get_usage_summary())
+    )
 
 @app.get("/analytics/daily")
-async def get_daily_analytics(days: int = 30, db: Session = Depends(get_db)):
-    """Get daily analytics for the last N days"""
+async def get_daily_analytics(
+    request: Request,
+    days: int = 30,
+    bucket: Optional[str] = None,
+    hours: Optional[int] = None,
+    db: Session = Depends(get_db)
+):
+    """Get daily analytics for the last N days
+    
+    ``bucket`` (minute, hour, day, week or month) returns a downsampled series
+    instead; ``hours`` narrows the range for fine-grained buckets.
+    """
+    if bucket and bucket not in BUCKETS:
+        raise HTTPException(status_code=400, detail=f"bucket must be one of: {', '.join(BUCKETS)}")
+    
+    analytics_service = AnalyticsService(db)
+    return cached_json_response(analytics_cache, request, lambda: analytics_service.get_daily_stats(days, bucket, hours))
+
+@app.get("/analytics/unique-users")
+async def get_unique_users(request: Request, days: int = 30, platform: Optional[str] = None, db: Session = Depends(get_db)):
+    """Get estimated distinct users over the last N days"""
     analytics_service = AnalyticsService(db)
-    return analytics_service.get_daily_stats(days)
+    return cached_json_response(analytics_cache, request, lambda: analytics_service.get_unique_users(days, platform))
 
 @app.get("/analytics/user/{user_id}")
 async def get_user_analytics(user_id: int, db: Session = Depends(get_db)):
@@ -433,43 +710,85 @@ async def get_user_analytics(user_id: int, db: Session = Depends(get_db)):
     return analytics_service.get_user_analytics(user_id)
 
 @app.get("/analytics/trending")
-async def get_trending_emotions(days: int = 7, db: Session = Depends(get_db)):
+async def get_trending_emotions(request: Request, days: int = 7, db: Session = Depends(get_db)):
     """Get trending emotions"""
     analytics_service = AnalyticsService(db)
-    return analytics_service.get_trending_emotions(days)
+    return cached_json_response(analytics_cache, request, lambda: analytics_service.get_trending_emotions(days))
 
 # ===== ADMIN ENDPOINTS =====
 
+def validate_count_mode(count: str):
+    if count not in COUNT_MODES:
+        raise HTTPException(status_code=400, detail=f"count must be one of: {', '.join(COUNT_MODES)}")
+
 @app.get("/admin/users")
 async def get_users(
     skip: int = 0, 
     limit: int = 100, 
+    cursor: Optional[str] = None,
+    count: str = "cached",
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Get all users (admin only)"""
     if not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Admin access required")
+    validate_count_mode(count)
+    
+    query = db.query(User)
+    try:
+        if cursor or not skip:
+            users, next_cursor = keyset_page(query, User, limit, cursor)
+        else:
+            users = query.order_by(User.created_at.desc(), User.id.desc()).offset(skip).limit(limit).all()
+            next_cursor = None
+    except CursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    users = db.query(User).offset(skip).limit(limit).all()
-    return {"users": users, "total": db.query(User).count()}
+    return {"users": users, "total": count_rows(db, query, "users", count), "next_cursor": next_cursor}
 
 @app.get("/admin/analyses")
 async def get_all_analyses(
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
+    count: str = "cached",
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Get all analyses (admin only)"""
     if not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Admin access required")
+    validate_count_mode(count)
     
-    analyses = db.query(Analysis).offset(skip).limit(limit).all()
-    return {"analyses": analyses, "total": db.query(Analysis).count()}
+    query = db.query(Analysis)
+    try:
+        if cursor or not skip:
+            analyses, next_cursor = keyset_page(query, Analysis, limit, cursor)
+        else:
+            analyses = query.order_by(Analysis.created_at.desc(), Analysis.id.desc()).offset(skip).limit(limit).all()
+            next_cursor = None
+    except CursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return {"analyses": analyses, "total": count_rows(db, query, "analyses", count), "next_cursor": next_cursor}
 
 # ===== EXPORT ENDPOINTS =====
 
+def columnar_response(export, format: str, name: str, db: Session) -> StreamingResponse:
+    """Stream an Arrow IPC or Parquet export built by the columnar exporter"""
+    try:
+        exporter = ColumnarExporter(db)
+    except RuntimeError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    
+    extension = "parquet" if format == "parquet" else "arrows"
+    return StreamingResponse(
+        export(exporter),
+        media_type=COLUMNAR_FORMATS[format],
+        headers={"Content-Disposition": f"attachment; filename=witmirror-{name}.{extension}"}
+    )
+
 @app.post("/export/analytics")
 async def export_analytics(
     request: ExportRequest,
@@ -477,6 +796,12 @@ async def export_analytics(
     current_user: User = Depends(get_current_user)
 ):
     """Export analytics data"""
+    if request.format in COLUMNAR_FORMATS:
+        return columnar_response(
+            lambda exporter: exporter.export_analytics(request.start_date, request.end_date, request.format),
+            request.format, "analytics", db
+        )
+    
     analytics_service = AnalyticsService(db)
     data = analytics_service.export_data(request.start_date, request.end_date)
     
@@ -504,6 +829,14 @@ async def get_ai_providers():
         "details": {provider: ai_service.get_provider_info(provider) for provider in ai_service.get_available_providers()}
     }
 
+@app.get("/ai/policy")
+async def get_generation_policy(current_user: User = Depends(get_current_user)):
+    """Get generation tier counters and provider load (admin only)"""
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    return generation_policy.stats()
+
 # ===== WISDOM STYLES ENDPOINTS =====
 
 @app.get("/wisdom/styles")
@@ -549,7 +882,7 @@ async def get_reddit_comments(
 ):
     """Get recent comments from Reddit"""
     integration_manager = IntegrationManager(db)
-    return integration_manager.get_reddit_comments(subreddit, limit)
+    return await integration_manager.get_reddit_comments(subreddit, limit)
 
 @app.get("/integrations/twitter/{username}")
 async def get_twitter_mentions(
@@ -567,12 +900,16 @@ async def analyze_social_sentiment(
     platform: str,
     query: str,
     limit: int = 50,
+    style: str = "classic",
+    ai_provider: str = "openai",
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Analyze sentiment across social media platforms"""
     integration_manager = IntegrationManager(db)
-    return integration_manager.analyze_social_media_sentiment(platform, query, limit)
+    return await integration_manager.analyze_social_media_sentiment(
+        platform, query, limit, style, ai_provider, user_plan(current_user)
+    )
 
 @app.post("/integrations/discord/webhook")
 async def create_discord_webhook(
@@ -582,7 +919,46 @@ async def create_discord_webhook(
 ):
     """Create Discord webhook integration"""
     integration_manager = IntegrationManager(db)
-    return integration_manager.create_discord_webhook(webhook_url, current_user.id)
+    try:
+        return integration_manager.create_discord_webhook(webhook_url, current_user.id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.post("/integrations/monitors")
+async def create_monitored_source(
+    target: str,
+    platform: str = "reddit",
+    kind: str = "subreddit",
+    style: str = "classic",
+    ai_provider: str = "openai",
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Monitor a subreddit or account and analyze its new comments in the background"""
+    integration_manager = IntegrationManager(db)
+    try:
+        return integration_manager.add_monitored_source(current_user.id, platform, target, kind, style, ai_provider)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/integrations/monitors")
+async def list_monitored_sources(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """List monitored sources"""
+    integration_manager = IntegrationManager(db)
+    return integration_manager.list_monitored_sources(current_user.id)
+
+@app.delete("/integrations/monitors/{source_id}")
+async def delete_monitored_source(
+    source_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Stop monitoring a source"""
+    integration_manager = IntegrationManager(db)
+    return {"success": integration_manager.remove_monitored_source(current_user.id, source_id)}
 
 @app.get("/integrations/stats")
 async def get_integration_stats(
@@ -597,14 +973,29 @@ async def get_integration_stats(
 
 @app.get("/history")
 async def get_comment_history(
+    response: Response,
     limit: int = 50,
     offset: int = 0,
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Get user's comment analysis history"""
+    """Get user's comment analysis history
+    
+    Pass the X-Next-Cursor header of a page as ``cursor`` to fetch the next one.
+    """
     history_manager = CommentHistoryManager(db)
-    return history_manager.get_user_history(current_user.id, limit, offset)
+    if offset and not cursor:
+        return history_manager.get_user_history(current_user.id, limit, offset)
+    
+    try:
+        items, next_cursor = history_manager.get_user_history_page(current_user.id, limit, cursor)
+    except CursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return items
 
 @app.get("/history/stats")
 async def get_history_stats(
@@ -619,12 +1010,14 @@ async def get_history_stats(
 async def search_history(
     query: str,
     filters: Dict = None,
+    limit: int = 50,
+    offset: int = 0,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Search through user's comment history"""
     history_manager = CommentHistoryManager(db)
-    return history_manager.search_history(current_user.id, query, filters or {})
+    return history_manager.search_history(current_user.id, query, filters or {}, min(limit, 200), offset)
 
 @app.get("/history/favorites")
 async def get_favorite_responses(
@@ -653,6 +1046,12 @@ async def export_history(
     current_user: User = Depends(get_current_user)
 ):
     """Export user's complete analysis history"""
+    if format in COLUMNAR_FORMATS:
+        return columnar_response(
+            lambda exporter: exporter.export_history(current_user.id, format),
+            format, "history", db
+        )
+    
     history_manager = CommentHistoryManager(db)
     return history_manager.export_history(current_user.id, format)
 
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Text, Boolean, JSON
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, Text, Boolean, JSON, LargeBinary, Index, UniqueConstraint
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy import create_engine
@@ -19,6 +19,10 @@ class User(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     last_login = Column(DateTime)
     preferences = Column(JSON, default={})
+    
+    __table_args__ = (
+        Index("ix_users_created_at_id", "created_at", "id"),
+    )
 
 class Analysis(Base):
     __tablename__ = "analyses"
@@ -38,6 +42,12 @@ class Analysis(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     ip_address = Column(String(45))
     user_agent = Column(Text)
+    
+    # Keyset pagination indexes on (created_at, id)
+    __table_args__ = (
+        Index("ix_analyses_created_at_id", "created_at", "id"),
+        Index("ix_analyses_user_created_at_id", "user_id", "created_at", "id"),
+    )
 
 class WisdomTemplate(Base):
     __tablename__ = "wisdom_templates"
@@ -84,3 +94,131 @@ class Analytics(Base):
     unique_users = Column(Integer, default=0)
     top_emotions = Column(JSON, default={})
     platform_usage = Column(JSON, default={})
+    unique_users_sketch = Column(LargeBinary)  # HyperLogLog registers
+    platform_user_sketches = Column(JSON, default={})  # platform -> base64 HyperLogLog
+
+class TopicTerm(Base):
+    __tablename__ = "topic_terms"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, nullable=False)
+    bucket = Column(Date, nullable=False)  # UTC day the terms were seen
+    term = Column(String(64), nullable=False)
+    count = Column(Integer, default=0)
+    
+    __table_args__ = (
+        UniqueConstraint("user_id", "bucket", "term", name="uq_topic_terms_user_bucket_term"),
+    )
+
+class MetricBucket(Base):
+    __tablename__ = "metric_buckets"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    resolution = Column(String(10), nullable=False)  # minute, hour or day
+    bucket_start = Column(DateTime, nullable=False)
+    total_requests = Column(Integer, default=0)
+    successful_requests = Column(Integer, default=0)
+    failed_requests = Column(Integer, default=0)
+    processing_time_total = Column(Float, default=0.0)
+    top_emotions = Column(JSON, default={})
+    platform_usage = Column(JSON, default={})
+    
+    __table_args__ = (
+        UniqueConstraint("resolution", "bucket_start", name="uq_metric_buckets_resolution_start"),
+    )
+
+class DiscordWebhook(Base):
+    __tablename__ = "discord_webhooks"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, nullable=False, index=True)
+    url = Column(Text, nullable=False)
+    is_active = Column(Boolean, default=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class WebhookDelivery(Base):
+    __tablename__ = "webhook_deliveries"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    webhook_id = Column(Integer, nullable=False)
+    payload = Column(JSON, nullable=False)  # one Discord embed
+    status = Column(String(20), default="pending")  # pending, sending, delivered, failed
+    attempts = Column(Integer, default=0)
+    next_attempt_at = Column(DateTime, default=datetime.utcnow)
+    claim_token = Column(String(36))
+    last_error = Column(Text)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    delivered_at = Column(DateTime)
+    
+    __table_args__ = (
+        Index("ix_webhook_deliveries_status_next_attempt", "status", "next_attempt_at"),
+    )
+
+class MonitoredSource(Base):
+    __tablename__ = "monitored_sources"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, nullable=False, index=True)
+    platform = Column(String(20), nullable=False)  # reddit
+    kind = Column(String(20), default="subreddit")  # subreddit or account
+    target = Column(String(100), nullable=False)
+    style = Column(String(20), default="classic")
+    ai_provider = Column(String(20), default="openai")
+    is_active = Column(Boolean, default=True)
+    poll_interval = Column(Float, default=300.0)  # seconds, adapted after each poll
+    next_poll_at = Column(DateTime, default=datetime.utcnow)
+    high_water_mark = Column(String(32))  # newest comment id already analysed
+    last_polled_at = Column(DateTime)
+    last_error = Column(Text)
+    total_ingested = Column(Integer, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        Index("ix_monitored_sources_active_next_poll", "is_active", "next_poll_at"),
+    )
+
+class CatalogVersion(Base):
+    __tablename__ = "catalog_versions"
+    
+    name = Column(String(50), primary_key=True)
+    version = Column(Integer, default=0)
+
+class BulkJob(Base):
+    __tablename__ = "bulk_jobs"
+    
+    id = Column(String(36), primary_key=True)  # uuid4, so job ids cannot be guessed
+    user_id = Column(Integer, nullable=False, index=True)
+    style = Column(String(20), default="classic")
+    platform = Column(String(20), default="general")
+    ai_provider = Column(String(20), default="openai")
+    plan = Column(String(20), default="free")
+    status = Column(String(20), default="queued")  # queued, running, completed, cancelled
+    total = Column(Integer, default=0)
+    processed = Column(Integer, default=0)
+    failed = Column(Integer, default=0)
+    last_claimed_at = Column(DateTime)  # orders tenants for fair scheduling
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime)
+    completed_at = Column(DateTime)
+    
+    __table_args__ = (
+        Index("ix_bulk_jobs_status_user", "status", "user_id"),
+    )
+
+class BulkJobItem(Base):
+    __tablename__ = "bulk_job_items"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    job_id = Column(String(36), nullable=False)
+    position = Column(Integer, nullable=False)  # index of the text in the submitted batch
+    text = Column(Text, nullable=False)
+    status = Column(String(20), default="pending")  # pending, running, done, failed
+    claim_token = Column(String(36))
+    lease_expires_at = Column(DateTime)
+    result = Column(JSON)
+    error = Column(Text)
+    
+    __table_args__ = (
+        UniqueConstraint("job_id", "position", name="uq_bulk_job_items_job_position"),
+        Index("ix_bulk_job_items_job_status_position", "job_id", "status", "position"),
+    )
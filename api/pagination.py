@@ -0,0 +1,80 @@
+from sqlalchemy.orm import Session, Query
+from sqlalchemy import desc, and_, or_, text
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime
+import base64
+import json
+import os
+import time
+
+# Count modes accepted by paginated endpoints
+COUNT_MODES = ("exact", "cached", "estimate", "none")
+
+# How long cached totals stay valid (seconds)
+COUNT_CACHE_TTL = float(os.getenv("COUNT_CACHE_TTL", "60"))
+
+_count_cache: Dict[str, Tuple[int, float]] = {}
+
+class CursorError(ValueError):
+    """Raised when a pagination cursor cannot be decoded"""
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    """Encode a (created_at, id) position as an opaque cursor"""
+    raw = json.dumps([created_at.isoformat(), row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Decode an opaque cursor back into its (created_at, id) position"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (ValueError, TypeError):
+        raise CursorError("Invalid pagination cursor")
+
+def keyset_page(query: Query, model, limit: int, cursor: Optional[str] = None) -> Tuple[List, Optional[str]]:
+    """Fetch one page ordered by (created_at, id) descending, starting after the cursor"""
+    query = query.order_by(desc(model.created_at), desc(model.id))
+
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        query = query.filter(or_(
+            model.created_at < created_at,
+            and_(model.created_at == created_at, model.id < row_id)
+        ))
+
+    # Fetch one extra row to know whether another page exists
+    rows = query.limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+
+    last = rows[limit - 1]
+    return rows[:limit], encode_cursor(last.created_at, last.id)
+
+def count_rows(db: Session, query: Query, key: str, mode: str = "cached") -> Optional[int]:
+    """Count rows for a paginated listing using the requested count mode"""
+    if mode == "none":
+        return None
+    if mode == "estimate":
+        return _estimate_table_rows(db, query.column_descriptions[0]["entity"].__tablename__)
+    if mode == "cached":
+        cached = _count_cache.get(key)
+        if cached and time.time() - cached[1] < COUNT_CACHE_TTL:
+            return cached[0]
+
+    total = query.order_by(None).count()
+    _count_cache[key] = (total, time.time())
+    return total
+
+def _estimate_table_rows(db: Session, table: str) -> int:
+    """Cheap row estimate from planner statistics or the primary key range"""
+    if db.bind.dialect.name == "postgresql":
+        estimate = db.execute(
+            text("SELECT reltuples::bigint FROM pg_class WHERE relname = :table"),
+            {"table": table}
+        ).scalar()
+        if estimate is not None and estimate >= 0:
+            return int(estimate)
+
+    # Integer primary keys are monotonic, so max(id) is an index-only upper bound
+    return int(db.execute(text(f"SELECT COALESCE(MAX(id), 0) FROM {table}")).scalar())
@@ -0,0 +1,162 @@
+from typing import Dict, List, Optional, Sequence, Tuple
+from contextlib import contextmanager
+from contextvars import ContextVar
+from collections import Counter
+from metrics import Histogram
+import os
+import random
+import re
+import sys
+import threading
+import time
+
+# Server-Timing header on every response; set to 0 to hide stage timings from clients
+SERVER_TIMING = os.getenv("SERVER_TIMING", "1") == "1"
+
+# Sampled statistical profiling, off unless a sample rate is set
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL_MS", "5")) / 1000
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+
+# Leaf frames of threads that are merely waiting for work
+IDLE_FRAMES = {("threading.py", "wait"), ("queue.py", "get"), ("selectors.py", "select"), ("thread.py", "_worker")}
+
+class RequestTimings:
+    """Spans recorded while serving one request"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans: List[Tuple[str, float, Optional[str]]] = []
+
+    def add(self, name: str, seconds: float, description: Optional[str] = None):
+        self.spans.append((name, seconds, description))
+
+    def server_timing(self, extra: Optional[Dict[str, str]] = None) -> str:
+        """Server-Timing value with repeated spans summed, e.g. for every text of a bulk request"""
+        totals: Dict[str, List] = {}
+        for name, seconds, description in list(self.spans):
+            entry = totals.setdefault(name, [0.0, 0, description])
+            entry[0] += seconds
+            entry[1] += 1
+        parts = []
+        for name, (seconds, count, description) in totals.items():
+            if count > 1:
+                description = f"{description} x{count}" if description else f"x{count}"
+            parts.append(_metric(name, seconds, description))
+        parts.append(_metric("total", time.perf_counter() - self.started))
+        for name, description in (extra or {}).items():
+            parts.append(f'{name};desc="{description}"')
+        return ", ".join(parts)
+
+def _metric(name: str, seconds: float, description: Optional[str] = None) -> str:
+    value = f"{name};dur={seconds * 1000:.1f}"
+    if description:
+        value += f';desc="{_quote(description)}"'
+    return value
+
+def _quote(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"')
+
+_current: ContextVar[Optional[RequestTimings]] = ContextVar("request_timings", default=None)
+
+def begin_request() -> RequestTimings:
+    """Start collecting spans for the request running in this context"""
+    timings = RequestTimings()
+    _current.set(timings)
+    return timings
+
+def record(name: str, seconds: float, description: Optional[str] = None):
+    """Attach an already measured span to the current request, if there is one"""
+    timings = _current.get()
+    if timings is not None:
+        timings.add(name, seconds, description)
+
+@contextmanager
+def span(name: str, histogram: Optional[Histogram] = None, labels: Sequence[str] = (),
+         description: Optional[str] = None):
+    """Time the enclosed block as a span of the current request, optionally also into a histogram"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        record(name, seconds, description)
+        if histogram is not None:
+            histogram.observe(seconds, *(labels or (name,)))
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+class RequestProfiler:
+    """Samples every thread's stack while one sampled request is in flight
+
+    Output is in collapsed-stack format, one "frame;frame;frame count" line per stack,
+    ready for flamegraph.pl or speedscope. Concurrent requests share the process, so
+    their frames can appear in a profile too; compare several profiles before concluding.
+    """
+
+    def __init__(self, sample_rate: float = PROFILE_SAMPLE_RATE, interval: float = PROFILE_INTERVAL,
+                 directory: str = PROFILE_DIR):
+        self.sample_rate = sample_rate
+        self.interval = interval
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._active = False
+        self._stop = threading.Event()
+        self._stacks: Counter = Counter()
+        self._thread: Optional[threading.Thread] = None
+
+    def maybe_start(self) -> bool:
+        """Start sampling for this request if it is picked and no other profile is running"""
+        if self.sample_rate <= 0 or random.random() >= self.sample_rate:
+            return False
+        with self._lock:
+            if self._active:
+                return False
+            self._active = True
+        self._stacks = Counter()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._sample, name="request-profiler", daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self, label: str) -> Optional[str]:
+        """Stop sampling and write the collapsed stacks; returns the file name"""
+        self._stop.set()
+        self._thread.join()
+        try:
+            if not self._stacks:
+                return None
+            os.makedirs(self.directory, exist_ok=True)
+            name = f"{time.strftime('%Y%m%d-%H%M%S')}-{re.sub(r'[^A-Za-z0-9]+', '_', label).strip('_')}-{os.getpid()}.folded"
+            with open(os.path.join(self.directory, name), "w") as f:
+                for stack, count in self._stacks.most_common():
+                    f.write(f"{stack} {count}\n")
+            return name
+        except OSError as e:
+            print(f"Profile write error: {e}")
+            return None
+        finally:
+            with self._lock:
+                self._active = False
+
+    def _sample(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                leaf = (os.path.basename(frame.f_code.co_filename), frame.f_code.co_name)
+                if leaf in IDLE_FRAMES:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self._stacks[";".join(reversed(stack))] += 1
+
+# Process-wide profiler; at most one sampled request is profiled at a time
+request_profiler = RequestProfiler()
@@ -0,0 +1,177 @@
+from typing import Dict, List, Optional, Tuple
+from collections import OrderedDict
+import asyncio
+import os
+import time
+import httpx
+
+REDDIT_BASE_URL = os.getenv("REDDIT_BASE_URL", "https://www.reddit.com")
+REDDIT_USER_AGENT = os.getenv("REDDIT_USER_AGENT", "WitMirror/1.0")
+
+# Seconds a fetched listing is reused before asking Reddit again
+LISTING_TTL = float(os.getenv("REDDIT_CACHE_TTL", "30"))
+
+PAGE_SIZE = 100  # Reddit's maximum listing page
+MAX_VALIDATORS = 512
+MAX_LISTINGS = 512  # cached listings and their fetch locks
+
+def is_newer(comment_id: Optional[str], than: str) -> bool:
+    """Reddit ids are base36 and increase over time"""
+    try:
+        return int(comment_id, 36) > int(than, 36)
+    except (TypeError, ValueError):
+        return False
+
+class RedditFetcher:
+    """Async Reddit comment fetcher with a pooled client, paging and conditional requests"""
+
+    def __init__(self, base_url: str = REDDIT_BASE_URL, listing_ttl: float = LISTING_TTL,
+                 timeout: float = 10.0, max_connections: int = 20):
+        self.base_url = base_url.rstrip("/")
+        self.listing_ttl = listing_ttl
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self._client: Optional[httpx.AsyncClient] = None
+        # path -> (expires, comments, complete); complete means the listing ended before the limit
+        self._listings: "OrderedDict[str, Tuple[float, List[Dict], bool]]" = OrderedDict()
+        self._validators: "OrderedDict[str, Tuple[Optional[str], Optional[str], Dict]]" = OrderedDict()
+        self._locks: "OrderedDict[str, asyncio.Lock]" = OrderedDict()
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers={"User-Agent": REDDIT_USER_AGENT},
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections),
+                follow_redirects=True
+            )
+        return self._client
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def fetch_comments(self, subreddit: str, limit: int = 10) -> List[Dict]:
+        """Fetch up to limit recent comments from a subreddit"""
+        return await self.fetch_listing(f"/r/{subreddit}/comments.json", limit)
+
+    async def fetch_user_comments(self, username: str, limit: int = 10) -> List[Dict]:
+        """Fetch up to limit recent comments written by a Reddit account"""
+        return await self.fetch_listing(f"/user/{username}/comments.json", limit)
+
+    async def fetch_listing(self, path: str, limit: int = 10, newer_than: Optional[str] = None) -> List[Dict]:
+        """Fetch a comment listing, following `after` cursors across pages
+
+        With newer_than (a base36 comment id) paging stops at the first comment
+        that is not newer, and the listing cache is bypassed.
+        """
+        key = path.lower()
+        if newer_than is None:
+            cached = self._fresh_listing(key, limit)
+            if cached is not None:
+                return cached
+
+        # One upstream fetch per listing at a time; waiters reuse its result
+        lock = self._lock_for(key)
+        async with lock:
+            if newer_than is None:
+                cached = self._fresh_listing(key, limit)
+                if cached is not None:
+                    return cached
+
+            comments: List[Dict] = []
+            after = None
+            complete = False
+            while len(comments) < limit:
+                page, after = await self._fetch_page(path, min(PAGE_SIZE, limit - len(comments)), after)
+                if newer_than is not None:
+                    fresh = [c for c in page if is_newer(c['id'], newer_than)]
+                    comments.extend(fresh)
+                    if len(fresh) < len(page):
+                        break
+                else:
+                    comments.extend(page)
+                if not after or not page:
+                    complete = True
+                    break
+
+            if newer_than is None:
+                self._listings[key] = (time.monotonic() + self.listing_ttl, comments, complete)
+                self._listings.move_to_end(key)
+                if len(self._listings) > MAX_LISTINGS:
+                    self._listings.popitem(last=False)
+            return comments[:limit]
+
+    def _fresh_listing(self, key: str, limit: int) -> Optional[List[Dict]]:
+        entry = self._listings.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            return None
+        expires, comments, complete = entry
+        # A listing that ran out before its limit holds everything Reddit has for any larger limit
+        if len(comments) < limit and not complete:
+            return None
+        self._listings.move_to_end(key)
+        return comments[:limit]
+
+    def _lock_for(self, key: str) -> asyncio.Lock:
+        lock = self._locks.get(key)
+        if lock is None:
+            lock = self._locks[key] = asyncio.Lock()
+            if len(self._locks) > MAX_LISTINGS:
+                # Only idle locks are dropped; a held lock may have waiters
+                for old_key in [k for k, l in self._locks.items() if not l.locked() and k != key]:
+                    del self._locks[old_key]
+                    if len(self._locks) <= MAX_LISTINGS:
+                        break
+        self._locks.move_to_end(key)
+        return lock
+
+    async def _fetch_page(self, url: str, limit: int, after: Optional[str]) -> Tuple[List[Dict], Optional[str]]:
+        params = {"limit": limit, "raw_json": 1}
+        if after:
+            params["after"] = after
+        validator_key = f"{url}?limit={limit}&after={after or ''}"
+
+        headers = {}
+        validator = self._validators.get(validator_key)
+        if validator:
+            etag, last_modified, _ = validator
+            if etag:
+                headers["If-None-Match"] = etag
+            if last_modified:
+                headers["If-Modified-Since"] = last_modified
+
+        response = await self.client.get(url, params=params, headers=headers)
+        if response.status_code == 304 and validator:
+            data = validator[2]
+            self._validators.move_to_end(validator_key)
+        else:
+            response.raise_for_status()
+            data = response.json()
+            etag = response.headers.get("ETag")
+            last_modified = response.headers.get("Last-Modified")
+            if etag or last_modified:
+                self._validators[validator_key] = (etag, last_modified, data)
+                if len(self._validators) > MAX_VALIDATORS:
+                    self._validators.popitem(last=False)
+
+        listing = data.get("data", {})
+        comments = []
+        for child in listing.get("children", []):
+            post_data = child.get("data", {})
+            comments.append({
+                'id': post_data.get('id'),
+                'text': post_data.get('body', ''),
+                'author': post_data.get('author'),
+                'score': post_data.get('score', 0),
+                'created_utc': post_data.get('created_utc'),
+                'subreddit': post_data.get('subreddit'),
+                'platform': 'reddit'
+            })
+        return comments, listing.get("after")
+
+# Shared fetcher so every request reuses the same connection pool
+reddit_fetcher = RedditFetcher()
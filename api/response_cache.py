@@ -0,0 +1,77 @@
+from typing import Callable, Dict, Optional, Tuple
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+import hashlib
+import json
+import os
+import threading
+import time
+
+class ResponseCache:
+    """Short-lived cache of serialized JSON bodies keyed by endpoint and parameters"""
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        # key -> (body, etag, expires_at, write generation when computed)
+        self._entries: Dict[str, Tuple[bytes, str, float, int]] = {}
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._dirtied_at = float("-inf")
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Tuple[bytes, str]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            # Always recompute after the TTL; other workers' writes never reach this process
+            if entry[2] < time.monotonic() or entry[3] != self._generation:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return entry[0], entry[1]
+
+    def set(self, key: str, body: bytes, etag: str):
+        with self._lock:
+            self._entries[key] = (body, etag, time.monotonic() + self.ttl, self._generation)
+
+    def mark_dirty(self):
+        """Drop entries early after a local write, at most once per TTL so busy writers keep the cache useful"""
+        with self._lock:
+            now = time.monotonic()
+            if now - self._dirtied_at >= self.ttl:
+                self._generation += 1
+                self._dirtied_at = now
+
+    def invalidate(self):
+        """Drop every entry, e.g. after the underlying data changed"""
+        with self._lock:
+            self._entries.clear()
+
+# Analytics endpoints, at most one TTL stale; local writes mark it dirty to refresh sooner
+analytics_cache = ResponseCache(ttl=float(os.getenv("ANALYTICS_CACHE_TTL", "5")))
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("If-None-Match")
+    if not header:
+        return False
+    return header.strip() == "*" or etag in [tag.strip() for tag in header.split(",")]
+
+def cached_json_response(cache: ResponseCache, request: Request, compute: Callable[[], object]) -> Response:
+    """Serve a JSON body from cache with a strong ETag, answering If-None-Match with 304"""
+    key = f"{request.url.path}?{request.url.query}"
+    entry = cache.get(key)
+
+    if entry is None:
+        body = json.dumps(jsonable_encoder(compute()), separators=(",", ":")).encode()
+        etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+        cache.set(key, body, etag)
+    else:
+        body, etag = entry
+
+    headers = {"ETag": etag, "Cache-Control": f"private, max-age={int(cache.ttl)}"}
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
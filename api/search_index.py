@@ -0,0 +1,120 @@
+from sqlalchemy.orm import Session, Query
+from sqlalchemy import text, func, desc, literal_column, table, column, false
+from sqlalchemy.exc import OperationalError, ProgrammingError
+from models import Analysis
+from typing import Optional
+import re
+
+# Full-text index over analyses.original_text and analyses.wisdom_response.
+# SQLite uses an external-content FTS5 table kept in sync by triggers;
+# Postgres uses a generated tsvector column with a GIN index.
+
+SQLITE_FTS_TABLE = "analyses_fts"
+
+SQLITE_SETUP = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {SQLITE_FTS_TABLE} USING fts5(
+        original_text, wisdom_response,
+        content='analyses', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS analyses_fts_insert AFTER INSERT ON analyses BEGIN
+        INSERT INTO {SQLITE_FTS_TABLE}(rowid, original_text, wisdom_response)
+        VALUES (new.id, new.original_text, new.wisdom_response);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS analyses_fts_delete AFTER DELETE ON analyses BEGIN
+        INSERT INTO {SQLITE_FTS_TABLE}({SQLITE_FTS_TABLE}, rowid, original_text, wisdom_response)
+        VALUES ('delete', old.id, old.original_text, old.wisdom_response);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS analyses_fts_update AFTER UPDATE OF original_text, wisdom_response ON analyses BEGIN
+        INSERT INTO {SQLITE_FTS_TABLE}({SQLITE_FTS_TABLE}, rowid, original_text, wisdom_response)
+        VALUES ('delete', old.id, old.original_text, old.wisdom_response);
+        INSERT INTO {SQLITE_FTS_TABLE}(rowid, original_text, wisdom_response)
+        VALUES (new.id, new.original_text, new.wisdom_response);
+    END"""
+]
+
+POSTGRES_SETUP = [
+    """ALTER TABLE analyses ADD COLUMN IF NOT EXISTS search_vector tsvector
+        GENERATED ALWAYS AS (
+            to_tsvector('english', coalesce(original_text, '') || ' ' || coalesce(wisdom_response, ''))
+        ) STORED""",
+    "CREATE INDEX IF NOT EXISTS ix_analyses_search_vector ON analyses USING GIN (search_vector)"
+]
+
+_fts_table = table(SQLITE_FTS_TABLE, column("rowid"), column("rank"))
+_available = {}
+
+def ensure_search_index(engine):
+    """Create the full-text index for the engine's dialect and backfill it"""
+    dialect = engine.dialect.name
+    try:
+        with engine.begin() as conn:
+            if dialect == "sqlite":
+                existed = conn.execute(
+                    text("SELECT 1 FROM sqlite_master WHERE name = :name"),
+                    {"name": SQLITE_FTS_TABLE}
+                ).first() is not None
+                for statement in SQLITE_SETUP:
+                    conn.execute(text(statement))
+                if not existed:
+                    conn.execute(text(f"INSERT INTO {SQLITE_FTS_TABLE}({SQLITE_FTS_TABLE}) VALUES ('rebuild')"))
+            elif dialect == "postgresql":
+                for statement in POSTGRES_SETUP:
+                    conn.execute(text(statement))
+            else:
+                return False
+    except (OperationalError, ProgrammingError) as e:
+        print(f"Full-text index unavailable, falling back to LIKE search: {e}")
+        _available[dialect] = False
+        return False
+
+    _available[dialect] = True
+    return True
+
+def _index_available(db: Session) -> bool:
+    dialect = db.bind.dialect.name
+    if dialect not in _available:
+        if dialect == "sqlite":
+            found = db.execute(
+                text("SELECT 1 FROM sqlite_master WHERE name = :name"),
+                {"name": SQLITE_FTS_TABLE}
+            ).first()
+        elif dialect == "postgresql":
+            found = db.execute(text(
+                "SELECT 1 FROM information_schema.columns "
+                "WHERE table_name = 'analyses' AND column_name = 'search_vector'"
+            )).first()
+        else:
+            found = None
+        _available[dialect] = found is not None
+    return _available[dialect]
+
+def _fts5_match(query: str) -> Optional[str]:
+    """Turn free text into a safe FTS5 expression (all terms, last one as prefix)"""
+    terms = re.findall(r"\w+", query.lower())
+    if not terms:
+        return None
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += "*"
+    return " ".join(quoted)
+
+def apply_text_search(db: Session, query_obj: Query, query: str) -> Query:
+    """Filter and rank a query on Analysis by full-text relevance"""
+    if not _index_available(db):
+        return query_obj.filter(Analysis.original_text.contains(query)).order_by(desc(Analysis.created_at))
+
+    if db.bind.dialect.name == "sqlite":
+        match = _fts5_match(query)
+        if match is None:
+            # Nothing searchable, e.g. only punctuation; match nothing rather than everything
+            return query_obj.filter(false())
+        return query_obj.join(
+            _fts_table, _fts_table.c.rowid == Analysis.id
+        ).filter(
+            text(f"{SQLITE_FTS_TABLE} MATCH :fts_match").bindparams(fts_match=match)
+        ).order_by(_fts_table.c.rank, desc(Analysis.created_at))
+
+    vector = literal_column("analyses.search_vector")
+    tsquery = func.websearch_to_tsquery("english", query)
+    return query_obj.filter(vector.op("@@")(tsquery)).order_by(
+        desc(func.ts_rank_cd(vector, tsquery)), desc(Analysis.created_at)
+    )
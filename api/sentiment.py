@@ -0,0 +1,121 @@
+from pydantic import BaseModel
+from typing import List, Optional, Tuple
+import os
+
+class EmotionAnalysis(BaseModel):
+    sentiment: str
+    confidence: float
+    detected_emotions: List[str]
+    toxicity_score: float
+
+# Rule-based lexicons
+NEGATIVE_WORDS = [
+    'stupid', 'dumb', 'idiot', 'moron', 'garbage', 'trash', 'worthless',
+    'hate', 'terrible', 'awful', 'horrible', 'disgusting', 'pathetic',
+    'sucks', 'suck', 'screams', 'slop', 'dumbest', 'worst', 'hate',
+    'useless', 'pointless', 'ridiculous', 'absurd', 'nonsense'
+]
+
+TOXIC_WORDS = [
+    'kill', 'die', 'death', 'murder', 'violence', 'attack', 'destroy',
+    'fuck', 'shit', 'damn', 'hell', 'bitch', 'asshole'
+]
+
+# Backend used for every analysis: "textblob" or "linear"
+SENTIMENT_BACKEND = os.getenv("SENTIMENT_BACKEND", "textblob")
+
+def lexicon_counts(text_lower: str) -> Tuple[int, int]:
+    """Negative and toxic lexicon hits in lowercased text"""
+    negative_count = sum(1 for word in NEGATIVE_WORDS if word in text_lower)
+    toxic_count = sum(1 for word in TOXIC_WORDS if word in text_lower)
+    return negative_count, toxic_count
+
+def lexicon_emotions(negative_count: int, toxic_count: int) -> List[str]:
+    detected_emotions = []
+    if negative_count > 0:
+        detected_emotions.extend(['anger', 'contempt', 'disgust'])
+    if toxic_count > 0:
+        detected_emotions.extend(['hostility', 'aggression'])
+    return detected_emotions
+
+class SentimentBackend:
+    """Interface for sentiment engines; implement analyze or analyze_batch"""
+
+    name = "base"
+
+    def analyze(self, text: str) -> EmotionAnalysis:
+        return self.analyze_batch([text])[0]
+
+    def analyze_batch(self, texts: List[str]) -> List[EmotionAnalysis]:
+        return [self.analyze(text) for text in texts]
+
+class TextBlobBackend(SentimentBackend):
+    """Lexicon counts combined with TextBlob pattern polarity"""
+
+    name = "textblob"
+
+    def analyze(self, text: str) -> EmotionAnalysis:
+        from textblob import TextBlob
+
+        text_lower = text.lower()
+
+        # Count occurrences
+        negative_count, toxic_count = lexicon_counts(text_lower)
+
+        # TextBlob sentiment analysis
+        blob = TextBlob(text)
+        polarity = blob.sentiment.polarity
+        subjectivity = blob.sentiment.subjectivity
+
+        # Determine sentiment
+        if negative_count > 0 or toxic_count > 0 or polarity < -0.3:
+            sentiment = "negative"
+            confidence = min(0.95, 0.5 + (negative_count * 0.1) + (toxic_count * 0.15) + abs(polarity))
+            toxicity_score = min(1.0, toxic_count * 0.3 + abs(polarity) * 0.5)
+        elif polarity > 0.3:
+            sentiment = "positive"
+            confidence = min(0.95, 0.5 + polarity)
+            toxicity_score = 0.0
+        else:
+            sentiment = "neutral"
+            confidence = 0.5
+            toxicity_score = 0.0
+
+        # Detect emotions
+        detected_emotions = lexicon_emotions(negative_count, toxic_count)
+        if subjectivity > 0.7:
+            detected_emotions.append('subjective')
+        if polarity < -0.5:
+            detected_emotions.append('strongly_negative')
+
+        return EmotionAnalysis(
+            sentiment=sentiment,
+            confidence=confidence,
+            detected_emotions=detected_emotions,
+            toxicity_score=toxicity_score
+        )
+
+_backend: Optional[SentimentBackend] = None
+
+def get_backend() -> SentimentBackend:
+    """Configured backend, loaded on first use; falls back to TextBlob if the linear model is missing"""
+    global _backend
+    if _backend is None:
+        if SENTIMENT_BACKEND == "linear":
+            try:
+                from linear_sentiment import LinearSentimentBackend
+                _backend = LinearSentimentBackend()
+            except (OSError, ValueError) as e:
+                print(f"Linear sentiment model unavailable, using TextBlob: {e}")
+                _backend = TextBlobBackend()
+        else:
+            _backend = TextBlobBackend()
+    return _backend
+
+def analyze_sentiment_advanced(text: str) -> EmotionAnalysis:
+    """Advanced sentiment analysis with multiple techniques"""
+    return get_backend().analyze(text)
+
+def analyze_sentiment_batch(texts: List[str]) -> List[EmotionAnalysis]:
+    """Score many texts in one pass through the sentiment engine"""
+    return get_backend().analyze_batch(texts)
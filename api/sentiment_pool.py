@@ -0,0 +1,87 @@
+from sentiment import EmotionAnalysis, analyze_sentiment_batch, get_backend
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+import asyncio
+import math
+import multiprocessing
+import os
+
+# Process pool configuration; 0 workers keeps scoring in this process
+_workers = os.getenv("SENTIMENT_WORKERS", "0")
+SENTIMENT_WORKERS = (os.cpu_count() or 1) if _workers == "auto" else int(_workers)
+CHUNK_SIZE = int(os.getenv("SENTIMENT_CHUNK_SIZE", "64"))
+INLINE_MAX_CHARS = int(os.getenv("SENTIMENT_INLINE_MAX_CHARS", "2000"))  # smaller inputs skip IPC entirely
+
+def _init_worker():
+    # Load the sentiment engine once per worker process
+    get_backend().analyze("Warming up the sentiment engine.")
+
+def _ping() -> int:
+    return os.getpid()
+
+def _score_chunk(texts: List[str]) -> List[Tuple[str, float, List[str], float]]:
+    return [
+        (a.sentiment, a.confidence, a.detected_emotions, a.toxicity_score)
+        for a in analyze_sentiment_batch(texts)
+    ]
+
+class SentimentPool:
+    """Scores sentiment in worker processes so CPU-bound analysis stays off the event loop"""
+
+    def __init__(self, workers: int = SENTIMENT_WORKERS, chunk_size: int = CHUNK_SIZE,
+                 inline_max_chars: int = INLINE_MAX_CHARS):
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.inline_max_chars = inline_max_chars
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self.pending_chunks = 0
+
+    async def start(self):
+        if self.workers <= 0 or self._executor is not None:
+            return
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker
+        )
+        # Spawn every worker now instead of on the first request
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(self._executor, _ping) for _ in range(self.workers)))
+
+    async def stop(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def analyze(self, text: str) -> EmotionAnalysis:
+        """Score one text"""
+        return (await self.analyze_batch([text]))[0]
+
+    async def analyze_batch(self, texts: List[str]) -> List[EmotionAnalysis]:
+        """Score texts in order, inline when tiny and in chunks across workers otherwise"""
+        if not texts:
+            return []
+        if sum(len(text) for text in texts) <= self.inline_max_chars:
+            return analyze_sentiment_batch(texts)
+        if self._executor is None:
+            return await asyncio.to_thread(analyze_sentiment_batch, texts)
+
+        # Enough chunks to occupy every worker, each large enough to amortize IPC
+        size = max(1, min(self.chunk_size, math.ceil(len(texts) / self.workers)))
+        loop = asyncio.get_running_loop()
+        starts = range(0, len(texts), size)
+        self.pending_chunks += len(starts)
+        try:
+            chunks = await asyncio.gather(*(
+                loop.run_in_executor(self._executor, _score_chunk, texts[i:i + size])
+                for i in starts
+            ))
+        finally:
+            self.pending_chunks -= len(starts)
+        return [
+            EmotionAnalysis(sentiment=s, confidence=c, detected_emotions=e, toxicity_score=t)
+            for chunk in chunks for s, c, e, t in chunk
+        ]
+
+# Process-wide pool, started and stopped with the app
+sentiment_pool = SentimentPool()
@@ -0,0 +1,98 @@
+from sqlalchemy.orm import Session
+from models import WisdomTemplate, CatalogVersion
+from typing import Dict, List, Optional
+import json
+import os
+import threading
+import time
+
+CATALOG_NAME = "wisdom_templates"
+
+# Seconds between checks of the shared version row
+VERSION_CHECK_INTERVAL = float(os.getenv("TEMPLATE_VERSION_CHECK_SECONDS", "1"))
+
+def bump_catalog_version(db: Session):
+    """Mark the template catalog as changed (caller commits)"""
+    updated = db.query(CatalogVersion).filter(CatalogVersion.name == CATALOG_NAME).update(
+        {CatalogVersion.version: CatalogVersion.version + 1}, synchronize_session=False
+    )
+    if not updated:
+        db.add(CatalogVersion(name=CATALOG_NAME, version=1))
+
+def _decode_variables(value) -> List[str]:
+    if not value:
+        return []
+    return json.loads(value) if isinstance(value, str) else list(value)
+
+class TemplateCatalog:
+    """Process-wide snapshot of active wisdom templates, reloaded when the version row changes"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version: Optional[int] = None
+        self._checked_at = 0.0
+        self._by_style: Dict[str, List[Dict]] = {}
+        self._styles: List[Dict] = []
+        self.hits = 0  # served from the snapshot, with or without a version check
+        self.reloads = 0
+
+    @property
+    def version(self) -> Optional[int]:
+        return self._version
+
+    @property
+    def fresh(self) -> bool:
+        """True while the snapshot can be served without touching the database"""
+        return self._version is not None and time.monotonic() - self._checked_at < VERSION_CHECK_INTERVAL
+
+    def invalidate(self):
+        with self._lock:
+            self._version = None
+
+    def styles(self, db: Session) -> List[Dict]:
+        """All active templates grouped by style"""
+        self._refresh(db)
+        return self._styles
+
+    def templates(self, db: Session, style: str) -> List[Dict]:
+        """Active templates for one style"""
+        self._refresh(db)
+        return self._by_style.get(style, [])
+
+    def _refresh(self, db: Optional[Session]):
+        # Without a session, a snapshot that just went stale is still served
+        if self.fresh or (db is None and self._version is not None):
+            self.hits += 1
+            return
+        now = time.monotonic()
+
+        current = db.query(CatalogVersion.version).filter(CatalogVersion.name == CATALOG_NAME).scalar() or 0
+        if current == self._version:
+            self._checked_at = now
+            self.hits += 1
+            return
+        self.reloads += 1
+
+        templates = db.query(WisdomTemplate).filter(WisdomTemplate.is_active == True).order_by(WisdomTemplate.id).all()
+
+        by_style: Dict[str, List[Dict]] = {}
+        for t in templates:
+            by_style.setdefault(t.style, []).append({
+                "id": t.id,
+                "name": t.name,
+                "template": t.template,
+                "variables": _decode_variables(t.variables)
+            })
+        styles = [
+            {"name": style.title(), "templates": entries}
+            for style, entries in by_style.items()
+        ]
+
+        with self._lock:
+            self._by_style = by_style
+            self._styles = styles
+            self._version = current
+            self._checked_at = now
+
+# Shared by every request in this worker
+template_catalog = TemplateCatalog()
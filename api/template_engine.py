@@ -0,0 +1,125 @@
+from sqlalchemy.orm import Session
+from database import SessionLocal
+from template_catalog import template_catalog
+from typing import Dict, List, Optional, Tuple
+from string import Formatter
+import os
+import threading
+import zlib
+
+# Quality rules for template answers
+TEMPLATE_MAX_TOXICITY = float(os.getenv("TEMPLATE_MAX_TOXICITY", "0.6"))
+TEMPLATE_MAX_CHARS = int(os.getenv("TEMPLATE_MAX_CHARS", "280"))
+TEMPLATE_CONFIDENCE = float(os.getenv("TEMPLATE_CONFIDENCE", "0.6"))
+
+# Variables a template may use
+TEMPLATE_VARIABLES = ("emotion", "sentiment", "platform", "toxicity", "style")
+
+# Most telling emotion first
+EMOTION_PRIORITY = ["hostility", "aggression", "contempt", "anger", "disgust", "strongly_negative", "subjective"]
+
+def toxicity_band(score: float) -> str:
+    if score >= 0.6:
+        return "high"
+    if score >= 0.3:
+        return "moderate"
+    return "low"
+
+def dominant_emotion(emotions: List[str]) -> Optional[str]:
+    for emotion in EMOTION_PRIORITY:
+        if emotion in emotions:
+            return emotion
+    return emotions[0] if emotions else None
+
+def analysis_context(analysis, platform: Optional[str] = None) -> Dict:
+    """Generation context derived from a sentiment result"""
+    return {
+        "sentiment": analysis.sentiment,
+        "detected_emotions": list(analysis.detected_emotions),
+        "toxicity_score": analysis.toxicity_score,
+        "platform": platform
+    }
+
+def template_values(context: Dict, style: str) -> Dict[str, str]:
+    """Values for template variables; unknown facts are left out"""
+    values = {"style": style, "toxicity": toxicity_band(context.get("toxicity_score") or 0.0)}
+    emotion = dominant_emotion(context.get("detected_emotions") or [])
+    if emotion:
+        values["emotion"] = emotion.replace("_", " ")
+    if context.get("sentiment"):
+        values["sentiment"] = context["sentiment"]
+    if context.get("platform") and context["platform"] != "web":
+        values["platform"] = context["platform"]
+    return values
+
+class CompiledTemplate:
+    """A template parsed once into literal and variable parts"""
+
+    __slots__ = ("id", "parts", "fields")
+
+    def __init__(self, template_id: int, text: str):
+        parts = []
+        for literal, field, spec, conversion in Formatter().parse(text):
+            if field is not None and (not field.isidentifier() or field not in TEMPLATE_VARIABLES):
+                raise ValueError(f"Unsupported template variable: {{{field}}}")
+            parts.append((literal, field))
+        self.id = template_id
+        self.parts = tuple(parts)
+        self.fields = frozenset(field for _, field in parts if field)
+
+    def render(self, values: Dict[str, str]) -> str:
+        return "".join(literal + (values[field] if field else "") for literal, field in self.parts)
+
+class TemplateEngine:
+    """Renders stored wisdom templates without calling a model"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version: Optional[int] = None
+        self._compiled: Dict[str, List[CompiledTemplate]] = {}
+
+    def render(self, text: str, style: str, context: Dict, db: Optional[Session] = None) -> Optional[Tuple[str, float, str]]:
+        """Template wisdom for this comment, or None when no template qualifies"""
+        if (context.get("toxicity_score") or 0.0) > TEMPLATE_MAX_TOXICITY:
+            return None
+
+        values = template_values(context, style)
+        eligible = [t for t in self._templates(style, db) if t.fields <= values.keys()]
+        if not eligible:
+            return None
+
+        # Same comment, same answer
+        template = eligible[zlib.crc32(text.encode("utf-8")) % len(eligible)]
+        wisdom = template.render(values).strip()
+        if not wisdom or len(wisdom) > TEMPLATE_MAX_CHARS:
+            return None
+        return wisdom, TEMPLATE_CONFIDENCE, "template"
+
+    def _templates(self, style: str, db: Optional[Session]) -> List[CompiledTemplate]:
+        # Only open a session when the catalog has to check its version
+        own_session = db is None and not template_catalog.fresh
+        if own_session:
+            db = SessionLocal()
+        try:
+            entries = template_catalog.templates(db, style)
+        finally:
+            if own_session:
+                db.close()
+
+        with self._lock:
+            if template_catalog.version != self._version:
+                self._compiled = {}
+                self._version = template_catalog.version
+            compiled = self._compiled.get(style)
+            if compiled is None:
+                compiled = []
+                for entry in entries:
+                    try:
+                        compiled.append(CompiledTemplate(entry["id"], entry["template"]))
+                    except ValueError as e:
+                        print(f"Skipping template {entry['id']}: {e}")
+                self._compiled[style] = compiled
+            return compiled
+
+# Shared engine; compiled templates follow the catalog version
+template_engine = TemplateEngine()
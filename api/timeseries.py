@@ -0,0 +1,272 @@
+from sqlalchemy.orm import Session
+from sqlalchemy.exc import SQLAlchemyError
+from models import Analysis, Analytics, MetricBucket
+from typing import Dict, List, Optional
+from datetime import datetime, timedelta
+import os
+import time
+
+# Buckets accepted by the analytics API, finest first
+BUCKETS = ("minute", "hour", "day", "week", "month")
+
+# Resolutions stored in metric_buckets; week and month roll up from days
+STORED_RESOLUTIONS = ("minute", "hour", "day")
+
+# How long each stored tier is kept before pruning (None keeps forever)
+RETENTION = {
+    "minute": timedelta(hours=float(os.getenv("METRICS_MINUTE_RETENTION_HOURS", "48"))),
+    "hour": timedelta(days=float(os.getenv("METRICS_HOUR_RETENTION_DAYS", "90"))),
+    "day": None
+}
+
+PRUNE_INTERVAL = 600  # seconds between prune passes per process
+_last_prune = 0.0
+
+def bucket_start(moment: datetime, bucket: str) -> datetime:
+    """Truncate a timestamp to the start of its bucket"""
+    if bucket == "minute":
+        return moment.replace(second=0, microsecond=0)
+    if bucket == "hour":
+        return moment.replace(minute=0, second=0, microsecond=0)
+    day = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    if bucket == "day":
+        return day
+    if bucket == "week":
+        return day - timedelta(days=day.weekday())
+    if bucket == "month":
+        return day.replace(day=1)
+    raise ValueError(f"Unknown bucket: {bucket}")
+
+def _source_resolution(bucket: str) -> str:
+    return bucket if bucket in STORED_RESOLUTIONS else "day"
+
+def _merge_counts(target: Dict[str, int], counts: Dict[str, int]) -> Dict[str, int]:
+    merged = dict(target or {})
+    for key, count in (counts or {}).items():
+        merged[key] = merged.get(key, 0) + count
+    return merged
+
+class TimeSeriesStore:
+    """Tiered request metrics: every request lands in its minute, hour and day bucket"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def record(self, analysis_data: Dict, processing_time: float, success: bool = True,
+               at: Optional[datetime] = None):
+        """Add one request to each stored tier (caller commits)"""
+        at = at or datetime.utcnow()
+        emotions = {}
+        for emotion in analysis_data.get('detected_emotions', []):
+            emotions[emotion] = emotions.get(emotion, 0) + 1
+        platforms = {analysis_data.get('platform', 'general'): 1}
+
+        starts = {resolution: bucket_start(at, resolution) for resolution in STORED_RESOLUTIONS}
+        try:
+            # Savepoint so a failed bucket write never takes the caller's daily counters with it
+            with self.db.begin_nested():
+                self._upsert(starts, processing_time, success, emotions, platforms)
+        except SQLAlchemyError as e:
+            print(f"Metric bucket write error: {e}")
+            return
+
+        self._maybe_prune()
+
+    def _upsert(self, starts: Dict[str, datetime], processing_time: float, success: bool,
+                emotions: Dict[str, int], platforms: Dict[str, int]):
+        dialect = self.db.bind.dialect.name
+
+        if dialect in ("sqlite", "postgresql"):
+            if dialect == "sqlite":
+                from sqlalchemy.dialects.sqlite import insert
+            else:
+                from sqlalchemy.dialects.postgresql import insert
+            # Counters are incremented in the database, so concurrent first writers cannot collide
+            statement = insert(MetricBucket).values([
+                {
+                    "resolution": resolution,
+                    "bucket_start": start,
+                    "total_requests": 1,
+                    "successful_requests": 1 if success else 0,
+                    "failed_requests": 0 if success else 1,
+                    "processing_time_total": processing_time,
+                    "top_emotions": {},
+                    "platform_usage": {}
+                }
+                for resolution, start in starts.items()
+            ])
+            statement = statement.on_conflict_do_update(
+                index_elements=["resolution", "bucket_start"],
+                set_={
+                    "total_requests": MetricBucket.total_requests + statement.excluded.total_requests,
+                    "successful_requests": MetricBucket.successful_requests + statement.excluded.successful_requests,
+                    "failed_requests": MetricBucket.failed_requests + statement.excluded.failed_requests,
+                    "processing_time_total": MetricBucket.processing_time_total + statement.excluded.processing_time_total
+                }
+            )
+            self.db.execute(statement)
+            # The upsert holds the row locks until commit, so merging the JSON counts here is safe
+            rows = self.db.query(MetricBucket).populate_existing().filter(
+                MetricBucket.bucket_start.in_(list(set(starts.values()))),
+                MetricBucket.resolution.in_(STORED_RESOLUTIONS)
+            ).all()
+            for row in rows:
+                if starts.get(row.resolution) == row.bucket_start:
+                    # Reassign so SQLAlchemy sees the JSON columns change
+                    row.top_emotions = _merge_counts(row.top_emotions, emotions)
+                    row.platform_usage = _merge_counts(row.platform_usage, platforms)
+            self.db.flush()
+            return
+
+        existing = {
+            (b.resolution, b.bucket_start): b
+            for b in self.db.query(MetricBucket).filter(
+                MetricBucket.bucket_start.in_(list(set(starts.values()))),
+                MetricBucket.resolution.in_(STORED_RESOLUTIONS)
+            )
+        }
+        for resolution, start in starts.items():
+            row = existing.get((resolution, start))
+            if row is None:
+                row = MetricBucket(
+                    resolution=resolution,
+                    bucket_start=start,
+                    total_requests=0,
+                    successful_requests=0,
+                    failed_requests=0,
+                    processing_time_total=0.0,
+                    top_emotions={},
+                    platform_usage={}
+                )
+                self.db.add(row)
+            row.total_requests += 1
+            if success:
+                row.successful_requests += 1
+            else:
+                row.failed_requests += 1
+            row.processing_time_total += processing_time
+            row.top_emotions = _merge_counts(row.top_emotions, emotions)
+            row.platform_usage = _merge_counts(row.platform_usage, platforms)
+        self.db.flush()
+
+    def series(self, bucket: str, start: datetime, end: Optional[datetime] = None) -> List[Dict]:
+        """Aggregated metrics per bucket between start and end, newest first"""
+        if bucket not in BUCKETS:
+            raise ValueError(f"bucket must be one of: {', '.join(BUCKETS)}")
+        end = end or datetime.utcnow()
+        resolution = _source_resolution(bucket)
+
+        rows = self.db.query(MetricBucket).filter(
+            MetricBucket.resolution == resolution,
+            MetricBucket.bucket_start >= bucket_start(start, resolution),
+            MetricBucket.bucket_start <= end
+        ).order_by(MetricBucket.bucket_start.desc()).all()
+
+        grouped: Dict[datetime, Dict] = {}
+        for row in rows:
+            key = bucket_start(row.bucket_start, bucket)
+            entry = grouped.setdefault(key, {
+                "total_requests": 0,
+                "successful_requests": 0,
+                "failed_requests": 0,
+                "processing_time_total": 0.0,
+                "top_emotions": {},
+                "platform_usage": {}
+            })
+            entry["total_requests"] += row.total_requests
+            entry["successful_requests"] += row.successful_requests
+            entry["failed_requests"] += row.failed_requests
+            entry["processing_time_total"] += row.processing_time_total
+            entry["top_emotions"] = _merge_counts(entry["top_emotions"], row.top_emotions)
+            entry["platform_usage"] = _merge_counts(entry["platform_usage"], row.platform_usage)
+
+        return [
+            {
+                "bucket": bucket,
+                "date": key.isoformat(),
+                "total_requests": entry["total_requests"],
+                "successful_requests": entry["successful_requests"],
+                "failed_requests": entry["failed_requests"],
+                "avg_processing_time": (
+                    entry["processing_time_total"] / entry["total_requests"] if entry["total_requests"] else 0.0
+                ),
+                "top_emotions": entry["top_emotions"],
+                "platform_usage": entry["platform_usage"]
+            }
+            for key, entry in grouped.items()
+        ]
+
+    def prune(self, now: Optional[datetime] = None) -> int:
+        """Delete fine-grained buckets older than their tier's retention"""
+        now = now or datetime.utcnow()
+        deleted = 0
+        for resolution, retention in RETENTION.items():
+            if retention is None:
+                continue
+            deleted += self.db.query(MetricBucket).filter(
+                MetricBucket.resolution == resolution,
+                MetricBucket.bucket_start < now - retention
+            ).delete(synchronize_session=False)
+        return deleted
+
+    def _maybe_prune(self):
+        global _last_prune
+        if time.monotonic() - _last_prune >= PRUNE_INTERVAL:
+            _last_prune = time.monotonic()
+            self.prune()
+
+def ensure_metric_buckets(db: Session):
+    """Backfill buckets once for databases that predate them
+
+    Day buckets come from the daily analytics rows. Minute and hour buckets are rebuilt
+    from stored analyses within their retention, so they miss failed requests.
+    """
+    if db.query(MetricBucket.id).first() is not None or db.query(Analytics.id).first() is None:
+        return
+
+    buckets: Dict = {}
+
+    def bucket(resolution: str, start: datetime) -> Dict:
+        return buckets.setdefault((resolution, start), {
+            "total_requests": 0,
+            "successful_requests": 0,
+            "failed_requests": 0,
+            "processing_time_total": 0.0,
+            "top_emotions": {},
+            "platform_usage": {}
+        })
+
+    for day in db.query(Analytics).yield_per(500):
+        entry = bucket("day", bucket_start(day.date, "day"))
+        entry["total_requests"] += day.total_requests or 0
+        entry["successful_requests"] += day.successful_requests or 0
+        entry["failed_requests"] += day.failed_requests or 0
+        entry["processing_time_total"] += (day.avg_processing_time or 0.0) * (
+            (day.successful_requests or 0) + (day.failed_requests or 0)
+        )
+        entry["top_emotions"] = _merge_counts(entry["top_emotions"], day.top_emotions)
+        entry["platform_usage"] = _merge_counts(entry["platform_usage"], day.platform_usage)
+
+    now = datetime.utcnow()
+    since = {resolution: now - RETENTION[resolution] for resolution in ("minute", "hour")}
+    analyses = db.query(
+        Analysis.created_at, Analysis.processing_time, Analysis.detected_emotions, Analysis.platform
+    ).filter(Analysis.created_at >= min(since.values()))
+    for created_at, processing_time, detected_emotions, platform in analyses.yield_per(1000):
+        for resolution, cutoff in since.items():
+            if created_at < cutoff:
+                continue
+            entry = bucket(resolution, bucket_start(created_at, resolution))
+            entry["total_requests"] += 1
+            entry["successful_requests"] += 1
+            entry["processing_time_total"] += processing_time or 0.0
+            for emotion in detected_emotions or []:
+                entry["top_emotions"][emotion] = entry["top_emotions"].get(emotion, 0) + 1
+            key = platform or "general"
+            entry["platform_usage"][key] = entry["platform_usage"].get(key, 0) + 1
+
+    db.add_all(
+        MetricBucket(resolution=resolution, bucket_start=start, **entry)
+        for (resolution, start), entry in buckets.items()
+    )
+    db.commit()
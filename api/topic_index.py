@@ -0,0 +1,128 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import func, desc
+from models import Analysis, TopicTerm
+from typing import Dict, List, Optional
+from datetime import datetime, date, timedelta
+from collections import Counter
+import re
+
+# Words too common to say anything about a topic
+STOPWORDS = frozenset("""
+    about above after again against also among another anyone anything around because been before
+    being below between both cant could couldnt didnt does doesnt doing dont down during each either
+    else even ever every from further gonna have havent having here hers herself himself into isnt
+    itself just know like many maybe more most much must myself never only other others ought ours
+    ourselves over really same shall should shouldnt since some something still such than that thats
+    their theirs them themselves then there these they theyre thing things this those though through
+    today together under until upon very want wasnt were what whatever when where whether which while
+    whom whose will with within without wont would wouldnt yeah your youre yours yourself yourselves
+""".split())
+
+MAX_TERM_LENGTH = 64
+UPSERT_CHUNK = 200
+
+_token_pattern = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+
+def tokenize(text: str) -> Counter:
+    """Extract topic terms from text with their in-text frequencies"""
+    terms = Counter()
+    for token in _token_pattern.findall(text.lower()):
+        token = token.replace("'", "")
+        if len(token) > 3 and token not in STOPWORDS and not token.isdigit():
+            terms[token[:MAX_TERM_LENGTH]] += 1
+    return terms
+
+class TopicIndex:
+    """Per-user, per-day term counts maintained at ingest time"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def record(self, user_id: int, text: str, created_at: Optional[datetime] = None):
+        """Add an analysed text's terms to the user's bucket (caller commits)"""
+        self._apply(user_id, text, created_at, 1)
+
+    def forget(self, user_id: int, text: str, created_at: Optional[datetime] = None):
+        """Remove a deleted text's terms from the user's bucket (caller commits)"""
+        self._apply(user_id, text, created_at, -1)
+
+    def top_terms(self, user_id: int, days: int = 30, limit: int = 10) -> List[Dict]:
+        """Most frequent terms over the trailing window of days"""
+        start_bucket = datetime.utcnow().date() - timedelta(days=days)
+        total = func.sum(TopicTerm.count).label("frequency")
+
+        rows = self.db.query(TopicTerm.term, total).filter(
+            TopicTerm.user_id == user_id,
+            TopicTerm.bucket >= start_bucket
+        ).group_by(TopicTerm.term).having(total > 0).order_by(desc(total), TopicTerm.term).limit(limit).all()
+
+        return [{'topic': row.term, 'frequency': row.frequency} for row in rows]
+
+    def rebuild(self, user_id: Optional[int] = None, batch_size: int = 1000):
+        """Recompute term counts from stored analyses"""
+        delete_query = self.db.query(TopicTerm)
+        source = self.db.query(Analysis.user_id, Analysis.original_text, Analysis.created_at).filter(
+            Analysis.user_id.isnot(None)
+        )
+        if user_id is not None:
+            delete_query = delete_query.filter(TopicTerm.user_id == user_id)
+            source = source.filter(Analysis.user_id == user_id)
+        delete_query.delete(synchronize_session=False)
+
+        pending: Dict[tuple, Counter] = {}
+        for row in source.yield_per(batch_size):
+            key = (row.user_id, row.created_at.date())
+            pending.setdefault(key, Counter()).update(tokenize(row.original_text))
+
+        for (uid, bucket), terms in pending.items():
+            self._upsert(uid, bucket, terms)
+        self.db.commit()
+
+    def _apply(self, user_id: int, text: str, created_at: Optional[datetime], sign: int):
+        terms = tokenize(text)
+        if not terms:
+            return
+        if sign < 0:
+            terms = Counter({term: -count for term, count in terms.items()})
+        bucket = (created_at or datetime.utcnow()).date()
+        self._upsert(user_id, bucket, terms)
+
+    def _upsert(self, user_id: int, bucket: date, terms: Counter):
+        rows = [
+            {"user_id": user_id, "bucket": bucket, "term": term, "count": count}
+            for term, count in terms.items()
+        ]
+        dialect = self.db.bind.dialect.name
+
+        if dialect in ("sqlite", "postgresql"):
+            if dialect == "sqlite":
+                from sqlalchemy.dialects.sqlite import insert
+            else:
+                from sqlalchemy.dialects.postgresql import insert
+            # Chunked to stay under the driver's bound-parameter limit
+            for start in range(0, len(rows), UPSERT_CHUNK):
+                statement = insert(TopicTerm).values(rows[start:start + UPSERT_CHUNK])
+                statement = statement.on_conflict_do_update(
+                    index_elements=["user_id", "bucket", "term"],
+                    set_={"count": TopicTerm.count + statement.excluded.count}
+                )
+                self.db.execute(statement)
+            return
+
+        existing = {
+            t.term: t for t in self.db.query(TopicTerm).filter(
+                TopicTerm.user_id == user_id,
+                TopicTerm.bucket == bucket,
+                TopicTerm.term.in_(list(terms))
+            )
+        }
+        for row in rows:
+            if row["term"] in existing:
+                existing[row["term"]].count += row["count"]
+            else:
+                self.db.add(TopicTerm(**row))
+
+def ensure_topic_index(db: Session):
+    """Backfill the term index once for databases created before it existed"""
+    if db.query(TopicTerm.id).first() is None and db.query(Analysis.id).filter(Analysis.user_id.isnot(None)).first():
+        TopicIndex(db).rebuild()
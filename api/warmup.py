@@ -0,0 +1,71 @@
+from typing import Callable, Dict, List, Tuple
+from datetime import datetime
+import os
+import time
+
+# Optional phases run after the database is ready; the database phase always runs
+WARMUP_PHASES = [p.strip() for p in os.getenv("WARMUP_PHASES", "templates,emotions,sentiment,providers").split(",") if p.strip()]
+
+warmup_report: Dict = {"phases": {}, "total_ms": None, "completed_at": None}
+
+def _warm_database():
+    from database import init_database
+    init_database()
+
+def _warm_templates():
+    from database import SessionLocal
+    from template_catalog import template_catalog
+
+    db = SessionLocal()
+    try:
+        template_catalog.styles(db)
+    finally:
+        db.close()
+
+def _warm_emotions():
+    # Trending emotions are answered from memory; load the last week before serving
+    from emotion_window import emotion_window
+    emotion_window.warm_up()
+
+def _warm_sentiment():
+    # Loads TextBlob's lexicon or maps the linear model's weights
+    from sentiment import get_backend
+    get_backend().analyze("Warming up the sentiment engine.")
+
+def _warm_providers():
+    from ai_services import ai_service
+    ai_service.warm_up()
+
+PHASES: Dict[str, Callable[[], None]] = {
+    "database": _warm_database,
+    "templates": _warm_templates,
+    "emotions": _warm_emotions,
+    "sentiment": _warm_sentiment,
+    "providers": _warm_providers
+}
+
+def run_warmup(phases: List[str] = None) -> Dict:
+    """Run startup phases in order, timing each one"""
+    phases = ["database"] + [p for p in (phases if phases is not None else WARMUP_PHASES) if p != "database"]
+    timings: List[Tuple[str, float]] = []
+    started = time.perf_counter()
+
+    for name in phases:
+        phase = PHASES.get(name)
+        if phase is None:
+            print(f"Unknown warm-up phase: {name}")
+            continue
+        phase_start = time.perf_counter()
+        try:
+            phase()
+        except Exception as e:
+            if name == "database":
+                raise
+            print(f"Warm-up phase {name} failed: {e}")
+        timings.append((name, (time.perf_counter() - phase_start) * 1000))
+
+    warmup_report["phases"] = {name: round(ms, 1) for name, ms in timings}
+    warmup_report["total_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    warmup_report["completed_at"] = datetime.utcnow().isoformat()
+    print("Warm-up: " + ", ".join(f"{name} {ms:.0f}ms" for name, ms in timings) + f" (total {warmup_report['total_ms']:.0f}ms)")
+    return warmup_report
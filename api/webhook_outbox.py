@@ -0,0 +1,316 @@
+from sqlalchemy.orm import Session
+from models import DiscordWebhook, WebhookDelivery
+from database import SessionLocal
+from typing import Callable, Dict, List, Optional, Set, Tuple
+from datetime import datetime, timedelta
+import asyncio
+import os
+import random
+import threading
+import uuid
+import httpx
+
+# Delivery worker configuration
+DELIVERY_WORKERS = int(os.getenv("DISCORD_DELIVERY_WORKERS", "2"))
+POLL_INTERVAL = float(os.getenv("DISCORD_POLL_INTERVAL", "1"))
+MAX_ATTEMPTS = int(os.getenv("DISCORD_MAX_ATTEMPTS", "8"))
+BACKOFF_BASE = 2.0  # seconds, doubled per failed attempt
+BACKOFF_MAX = 600.0
+LEASE_SECONDS = 60  # claimed rows become due again if a worker dies mid-send
+
+# Discord limits: 10 embeds and 6000 embed characters per message
+MAX_EMBEDS = 10
+MAX_MESSAGE_CHARS = 6000
+MAX_FIELD_CHARS = 1000
+
+def build_embed(message: str, wisdom: str) -> Dict:
+    """Discord embed for one generated wisdom"""
+    return {
+        "title": "New Wisdom Generated",
+        "fields": [
+            {"name": "Original", "value": message[:MAX_FIELD_CHARS] or "\u200b"},
+            {"name": "Wisdom", "value": wisdom[:MAX_FIELD_CHARS] or "\u200b"}
+        ]
+    }
+
+def enqueue_notification(db: Session, webhook_id: int, message: str, wisdom: str) -> WebhookDelivery:
+    """Add a notification to the outbox (caller commits)"""
+    delivery = WebhookDelivery(
+        webhook_id=webhook_id,
+        payload=build_embed(message, wisdom),
+        status="pending",
+        attempts=0,
+        next_attempt_at=datetime.utcnow()
+    )
+    db.add(delivery)
+    return delivery
+
+def _embed_chars(embed: Dict) -> int:
+    return len(embed.get("title", "")) + sum(len(f["name"]) + len(f["value"]) for f in embed.get("fields", []))
+
+def _chunk_embeds(deliveries: List[Tuple[int, Dict, int]]) -> List[List[Tuple[int, Dict, int]]]:
+    """Split claimed deliveries into messages that fit Discord's limits"""
+    chunks, current, chars = [], [], 0
+    for delivery in deliveries:
+        size = _embed_chars(delivery[1])
+        if current and (len(current) == MAX_EMBEDS or chars + size > MAX_MESSAGE_CHARS):
+            chunks.append(current)
+            current, chars = [], 0
+        current.append(delivery)
+        chars += size
+    if current:
+        chunks.append(current)
+    return chunks
+
+def _backoff(attempts: int) -> float:
+    return min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempts) * random.uniform(0.5, 1.0)
+
+class DeliveryWorker:
+    """Background pool draining the webhook outbox, one webhook per send"""
+
+    def __init__(self, session_factory: Callable[[], Session], workers: int = DELIVERY_WORKERS,
+                 poll_interval: float = POLL_INTERVAL):
+        self.session_factory = session_factory
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self._tasks: List[asyncio.Task] = []
+        self._client: Optional[httpx.AsyncClient] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._active: Set[int] = set()  # webhooks this process holds a lease on
+        self._active_lock = threading.Lock()
+
+    async def start(self):
+        if self._tasks:
+            return
+        self._client = httpx.AsyncClient(timeout=10.0)
+        self._wake = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._run()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def wake(self):
+        """Nudge idle workers after enqueueing from this process"""
+        if self._wake is not None:
+            self._wake.set()
+
+    async def _run(self):
+        while True:
+            try:
+                claim = await asyncio.to_thread(self._claim)
+            except Exception as e:
+                print(f"Discord outbox claim error: {e}")
+                claim = None
+
+            if claim is None:
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            webhook_id, url, deliveries = claim
+            try:
+                if url:
+                    await self._deliver(webhook_id, url, deliveries)
+            except Exception as e:
+                # Leased rows are picked up again once their lease expires
+                print(f"Discord outbox delivery error: {e}")
+            finally:
+                self._active.discard(webhook_id)
+
+    def _claim(self) -> Optional[Tuple[int, Optional[str], List[Tuple[int, Dict, int]]]]:
+        """Lease up to MAX_EMBEDS due deliveries for a single webhook"""
+        db = self.session_factory()
+        try:
+            now = datetime.utcnow()
+            due = db.query(WebhookDelivery).filter(
+                WebhookDelivery.status.in_(["pending", "sending"]),
+                WebhookDelivery.next_attempt_at <= now
+            )
+            if self._active:
+                due = due.filter(WebhookDelivery.webhook_id.notin_(list(self._active)))
+
+            first = due.with_entities(WebhookDelivery.webhook_id).order_by(WebhookDelivery.next_attempt_at).first()
+            if first is None:
+                return None
+            webhook_id = first.webhook_id
+            # Claims run on worker threads; only one may take a given webhook
+            with self._active_lock:
+                if webhook_id in self._active:
+                    return None
+                self._active.add(webhook_id)
+            try:
+                claim = self._lease(db, webhook_id, due, now)
+            except Exception:
+                self._active.discard(webhook_id)
+                raise
+            if claim is None:
+                # Another process leased these rows first; its sender owns the webhook
+                self._active.discard(webhook_id)
+            return claim
+        finally:
+            db.close()
+
+    def _lease(self, db: Session, webhook_id: int, due, now: datetime
+               ) -> Optional[Tuple[int, Optional[str], List[Tuple[int, Dict, int]]]]:
+        """Conditionally mark due rows of one webhook as sending under a fresh claim token"""
+        ids = [row.id for row in due.with_entities(WebhookDelivery.id).filter(
+            WebhookDelivery.webhook_id == webhook_id
+        ).order_by(WebhookDelivery.id).limit(MAX_EMBEDS * 3)]
+
+        # Conditional update so two processes never lease the same row
+        token = str(uuid.uuid4())
+        db.query(WebhookDelivery).filter(
+            WebhookDelivery.id.in_(ids),
+            WebhookDelivery.next_attempt_at <= now
+        ).update({
+            WebhookDelivery.status: "sending",
+            WebhookDelivery.claim_token: token,
+            WebhookDelivery.next_attempt_at: now + timedelta(seconds=LEASE_SECONDS)
+        }, synchronize_session=False)
+        db.commit()
+
+        claimed = db.query(WebhookDelivery).filter(
+            WebhookDelivery.claim_token == token
+        ).order_by(WebhookDelivery.id).all()
+        if not claimed:
+            return None
+
+        webhook = db.query(DiscordWebhook).filter(DiscordWebhook.id == webhook_id).first()
+        if webhook is None or not webhook.is_active:
+            for delivery in claimed:
+                delivery.status = "failed"
+                delivery.last_error = "Webhook removed or inactive"
+            db.commit()
+            return webhook_id, None, []
+
+        return webhook_id, webhook.url, [(d.id, d.payload, d.attempts) for d in claimed]
+
+    async def _deliver(self, webhook_id: int, url: str, deliveries: List[Tuple[int, Dict, int]]):
+        chunks = _chunk_embeds(deliveries)
+        for index, chunk in enumerate(chunks):
+            payload = {
+                "username": "WitMirror",
+                "avatar_url": "https://example.com/witmirror-avatar.png",
+                "embeds": [embed for _, embed, _ in chunk]
+            }
+            try:
+                response = await self._client.post(url, json=payload)
+            except httpx.InvalidURL as e:
+                # Retrying cannot fix a malformed stored URL
+                await asyncio.to_thread(self._fail, chunk, f"{type(e).__name__}: {e}")
+                continue
+            except Exception as e:
+                await asyncio.to_thread(self._retry, chunk, f"{type(e).__name__}: {e}")
+                continue
+
+            if response.status_code in (200, 204):
+                await asyncio.to_thread(self._delivered, chunk)
+            elif response.status_code == 429:
+                retry_after = self._retry_after(response)
+                # Hold this and every later chunk until Discord's window reopens
+                remaining = [d for c in chunks[index:] for d in c]
+                await asyncio.to_thread(self._rate_limited, webhook_id, remaining, retry_after)
+                return
+            elif response.status_code in (401, 403, 404):
+                await asyncio.to_thread(self._webhook_gone, webhook_id, chunk, f"HTTP {response.status_code}")
+                return
+            elif response.status_code >= 500:
+                await asyncio.to_thread(self._retry, chunk, f"HTTP {response.status_code}")
+            else:
+                await asyncio.to_thread(self._fail, chunk, f"HTTP {response.status_code}: {response.text[:200]}")
+
+    def _retry_after(self, response: httpx.Response) -> float:
+        try:
+            return float(response.json().get("retry_after", 1.0))
+        except (ValueError, AttributeError):
+            return float(response.headers.get("Retry-After", "1"))
+
+    def _update(self, ids: List[int], values: Dict):
+        db = self.session_factory()
+        try:
+            db.query(WebhookDelivery).filter(WebhookDelivery.id.in_(ids)).update(values, synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+    def _delivered(self, chunk):
+        self._update([d[0] for d in chunk], {
+            WebhookDelivery.status: "delivered",
+            WebhookDelivery.claim_token: None,
+            WebhookDelivery.delivered_at: datetime.utcnow()
+        })
+
+    def _fail(self, chunk, error: str):
+        self._update([d[0] for d in chunk], {
+            WebhookDelivery.status: "failed",
+            WebhookDelivery.claim_token: None,
+            WebhookDelivery.last_error: error
+        })
+
+    def _retry(self, chunk, error: str):
+        db = self.session_factory()
+        try:
+            now = datetime.utcnow()
+            for delivery in db.query(WebhookDelivery).filter(WebhookDelivery.id.in_([d[0] for d in chunk])):
+                delivery.attempts += 1
+                delivery.last_error = error
+                delivery.claim_token = None
+                if delivery.attempts >= MAX_ATTEMPTS:
+                    delivery.status = "failed"
+                else:
+                    delivery.status = "pending"
+                    delivery.next_attempt_at = now + timedelta(seconds=_backoff(delivery.attempts))
+            db.commit()
+        finally:
+            db.close()
+
+    def _rate_limited(self, webhook_id: int, chunk, retry_after: float):
+        until = datetime.utcnow() + timedelta(seconds=retry_after)
+        db = self.session_factory()
+        try:
+            # Rate-limited sends do not count as failed attempts
+            db.query(WebhookDelivery).filter(
+                WebhookDelivery.id.in_([d[0] for d in chunk])
+            ).update({
+                WebhookDelivery.status: "pending",
+                WebhookDelivery.claim_token: None,
+                WebhookDelivery.next_attempt_at: until
+            }, synchronize_session=False)
+            db.query(WebhookDelivery).filter(
+                WebhookDelivery.webhook_id == webhook_id,
+                WebhookDelivery.status == "pending",
+                WebhookDelivery.next_attempt_at < until
+            ).update({WebhookDelivery.next_attempt_at: until}, synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+    def _webhook_gone(self, webhook_id: int, chunk, error: str):
+        db = self.session_factory()
+        try:
+            db.query(DiscordWebhook).filter(DiscordWebhook.id == webhook_id).update(
+                {DiscordWebhook.is_active: False}, synchronize_session=False
+            )
+            db.query(WebhookDelivery).filter(
+                WebhookDelivery.webhook_id == webhook_id,
+                WebhookDelivery.status.in_(["pending", "sending"])
+            ).update({
+                WebhookDelivery.status: "failed",
+                WebhookDelivery.claim_token: None,
+                WebhookDelivery.last_error: error
+            }, synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+# Process-wide worker pool, started and stopped with the app
+delivery_worker = DeliveryWorker(SessionLocal)
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""Fail when importing the API gets slower than its budget or pulls in deferred libraries.
+
+Usage: python scripts/check_import_time.py [--budget-ms 2500] [--top 15]
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+API_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "api")
+
+# Loaded on demand or during the startup warm-up, never at import
+DEFERRED_MODULES = ["openai", "anthropic", "requests", "textblob", "nltk", "numpy", "pyarrow"]
+
+def measure(module: str):
+    """Run `python -X importtime` in a fresh interpreter and parse its report"""
+    env = {**os.environ, "PYTHONPATH": API_DIR}
+    env.setdefault("DATABASE_URL", "sqlite:///:memory:")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=API_DIR, env=env, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        print(result.stderr[-2000:])
+        sys.exit(f"Importing {module} failed")
+
+    timings = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|")
+        if not cumulative_us.strip().isdigit():
+            continue
+        timings[name.strip()] = int(cumulative_us) / 1000
+    return timings
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--budget-ms", type=float, default=float(os.getenv("IMPORT_TIME_BUDGET_MS", "2500")))
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    timings = measure(args.module)
+    total = timings.get(args.module)
+    if total is None:
+        sys.exit(f"No import time reported for {args.module}")
+
+    print(f"import {args.module}: {total:.0f}ms (budget {args.budget_ms:.0f}ms)")
+    for name, ms in sorted(timings.items(), key=lambda item: item[1], reverse=True)[1:args.top + 1]:
+        print(f"  {ms:8.1f}ms  {name}")
+
+    failures = []
+    if total > args.budget_ms:
+        failures.append(f"import took {total:.0f}ms, over the {args.budget_ms:.0f}ms budget")
+    eager = [name for name in DEFERRED_MODULES if name in timings]
+    if eager:
+        failures.append(f"deferred modules imported eagerly: {', '.join(eager)}")
+
+    if failures:
+        for failure in failures:
+            print(f"FAIL: {failure}")
+        sys.exit(1)
+    print("OK")
+
+if __name__ == "__main__":
+    main()